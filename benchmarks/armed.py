@@ -0,0 +1,154 @@
+"""
+Armed close benchmark: compares trigger-to-exchange latency of closing every position the usual way
+(read positions, sign, post) with firing orders that were signed in advance, and checks that a position
+change on the exchange re-arms the wallet.
+
+Run from the project root:
+    python -m benchmarks.armed --wallets 200 --aevo-latency 0.05
+"""
+import statistics
+import argparse
+import tempfile
+import asyncio
+import random
+import time
+import sys
+import os
+
+from loguru import logger
+
+import config
+
+from benchmarks.snapshot import seed
+from benchmarks.mock_aevo import MockAevo
+
+
+def configure(args: argparse.Namespace, aevo_url: str, ws_url: str) -> None:
+    """Points the tool at the mock server, must run before anything from src is imported"""
+    config.AEVO_API = aevo_url
+    config.AEVO_WS = ws_url
+    config.API_KEYS_FILE = os.path.join(tempfile.mkdtemp(), 'api_keys.json')
+    config.HTTP_POOL_SIZE = args.concurrency
+    config.HTTP_LIMIT_PER_HOST = args.concurrency
+    config.HTTP_PREWARM_CONNECTIONS = min(args.concurrency, 20)
+    config.SIGNING_PROCESSES = args.signing_processes
+    if not args.rate_limits:
+        config.RATE_LIMITS = {'default': (10 ** 6, 10 ** 6)}
+
+
+def describe(name: str, seconds: list[float]) -> None:
+    seconds = sorted(seconds)
+    print(f'{name:34} p50 {statistics.median(seconds) * 1000:8.1f} ms | '
+          f'p95 {seconds[int(0.95 * (len(seconds) - 1))] * 1000:8.1f} ms | max {seconds[-1] * 1000:8.1f} ms')
+
+
+def received_since(mock_aevo: MockAevo, orders_before: int, triggered_at: float) -> list[float]:
+    """Seconds from the trigger until each order reached the exchange"""
+    return [received - triggered_at for received in mock_aevo.order_times[orders_before:]]
+
+
+async def wait_until(predicate, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        await asyncio.sleep(0.01)
+    return True
+
+
+async def main(args: argparse.Namespace) -> int:
+    mock_aevo = MockAevo(latency=args.aevo_latency)
+    aevo_url = await mock_aevo.start()
+    configure(args, aevo_url, mock_aevo.ws_url)
+    from src.aevo.session import (
+        prewarm_session,
+        close_session,
+    )
+    from src.client.signing import shutdown_signing_executor
+    from src.aevo.orderbook import order_books
+    from src.aevo.markets import instruments
+    from src.bot.armed import (
+        arm_fleet,
+        flatten,
+    )
+    from main import create_trader
+
+    failures = []
+    wallets = []
+    try:
+        await prewarm_session()
+        await instruments.load()
+
+        # The usual way: every wallet reads its positions, signs and posts once triggered
+        traders = [create_trader(private_key) for private_key in await seed(mock_aevo, args.wallets, 2)]
+        await asyncio.gather(*[trader.authorize() for trader in traders])
+        orders_before = len(mock_aevo.order_times)
+        triggered_at, triggered = time.time(), time.perf_counter()
+        await asyncio.gather(*[trader.close_all_positions(trader.headers) for trader in traders])
+        unarmed_total = time.perf_counter() - triggered
+        unarmed = received_since(mock_aevo, orders_before, triggered_at)
+
+        # Armed: orders are signed in advance, the trigger only sends them
+        private_keys = await seed(mock_aevo, args.wallets, 2)
+        started = time.perf_counter()
+        wallets = await arm_fleet(private_keys, create_trader, args.concurrency)
+        arming = time.perf_counter() - started
+
+        # A position that changes on the exchange has to be re-armed before the trigger
+        changed = next(wallet for wallet in wallets if wallet.orders)
+        mock_account = mock_aevo.account(changed.trader.wallet_address)
+        asset = changed.orders[0].asset
+        mock_account.positions[asset]['size'] *= 2
+        new_amount = round(abs(mock_account.positions[asset]['size']), 6)
+        changed_at = time.perf_counter()
+        await mock_aevo._push(mock_account.address, {"positions": len(mock_account.positions)})
+        rearmed = await wait_until(
+            lambda: any(order.asset == asset and abs(order.amount - new_amount) < 1e-6 for order in changed.orders), 5
+        )
+        rearm_seconds = time.perf_counter() - changed_at
+        if not rearmed:
+            failures.append('a changed position was not re-armed within 5s')
+
+        await asyncio.sleep(random.uniform(0.1, 0.2))
+        orders_before = len(mock_aevo.order_times)
+        triggered_at, triggered = time.time(), time.perf_counter()
+        acks = await flatten(wallets, triggered)
+        armed = received_since(mock_aevo, orders_before, triggered_at)
+        left = sum(len(account.positions) for account in mock_aevo.accounts.values())
+        if left:
+            failures.append(f'{left} positions are still open on the mock')
+    finally:
+        await asyncio.gather(*[wallet.stop() for wallet in wallets])
+        await instruments.stop()
+        await order_books.stop()
+        await close_session()
+        shutdown_signing_executor()
+        await mock_aevo.stop()
+
+    print(f'{args.wallets} wallets | {len(unarmed)} orders closed the usual way, {len(acks)} armed orders acked')
+    print(f'Unarmed: everything closed {unarmed_total * 1000:.0f} ms after the trigger')
+    describe('Unarmed trigger -> order received', unarmed)
+    print(f'Armed: {len(wallets)} wallets armed in {arming:.2f}s, re-armed a changed position in '
+          f'{rearm_seconds * 1000:.0f} ms')
+    describe('Armed trigger -> order received', armed[:len(acks)])
+    describe('Armed trigger -> ack', acks)
+    for failure in failures:
+        print(f'FAILED | {failure}')
+    return 1 if failures else 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--wallets', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=100, help='Wallets armed at the same time')
+    parser.add_argument('--aevo-latency', type=float, default=0.05, help='Mean AEVO response delay, seconds')
+    parser.add_argument('--signing-processes', type=int, default=None,
+                        help='Processes that sign orders in batches (default: SIGNING_PROCESSES, 1 - signing threads)')
+    parser.add_argument('--rate-limits', action='store_true', help='Keep RATE_LIMITS from config.py')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    logger.remove()
+    logger.add(sys.stderr, level=os.environ.get('LOG_LEVEL', 'WARNING'))
+    sys.exit(asyncio.run(main(parse_args())))
@@ -0,0 +1,61 @@
+"""
+Batch signing throughput with 1 process vs N processes.
+
+Run from the project root: python -m benchmarks.batch_signing [jobs] [processes]
+"""
+import random
+import time
+import sys
+import os
+
+from eth_account import Account
+
+from src.bot.utils.signing_pool import (
+    BatchSigner,
+    sign_job,
+)
+
+
+def make_jobs(count: int) -> list[tuple]:
+    accounts = [Account.create() for _ in range(50)]
+    jobs = []
+    for index in range(count):
+        account = accounts[index % len(accounts)]
+        private_key = account.key.hex()
+        kind = random.choice(['order', 'order', 'order', 'staking', 'withdraw'])
+        if kind == 'order':
+            payload = (account.address, True, random.randint(1, 10 ** 9), 0,
+                       random.randint(0, 10 ** 10), time.time(), 1)
+        elif kind == 'staking':
+            payload = ('0x643aaB1618c600229785A5E06E4b2d13946F7a1A', '0xceB3d89ed0fBF2acEBFf36E2FB23DACb79BaF9e7',
+                       random.randint(1, 10 ** 9), random.randint(0, 10 ** 10))
+        else:
+            payload = ('0x643aaB1618c600229785A5E06E4b2d13946F7a1A', '0xE3EF8bEE5c378D4D3DB6FEC96518e49AE2D2b957',
+                       random.randint(1, 10 ** 9), random.randint(0, 10 ** 10), 4326304606198636, 2000000,
+                       '0x73019b64e31e699fFd27d54E91D686313C14191C')
+        jobs.append((kind, private_key, payload))
+    return jobs
+
+
+def measure(processes: int, jobs: list[tuple]) -> tuple[float, list]:
+    signer = BatchSigner(processes)
+    signer.sign(jobs[:processes])  # start the workers outside of the measurement
+    start = time.perf_counter()
+    signatures = signer.sign(jobs)
+    elapsed = time.perf_counter() - start
+    signer.close()
+    return len(jobs) / elapsed, signatures
+
+
+def main(count: int = 2000, processes: int = os.cpu_count() or 1) -> None:
+    jobs = make_jobs(count)
+    single, signatures = measure(1, jobs)
+    multi, parallel_signatures = measure(processes, jobs)
+    assert signatures == parallel_signatures
+    assert signatures[:20] == [sign_job(job) for job in jobs[:20]]
+    print(f'1 process:    {single:8.0f} signatures/sec')
+    print(f'{processes} processes: {multi:8.0f} signatures/sec ({multi / single:.2f}x)')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,173 @@
+"""
+Response decode benchmark: time and retained memory per AEVO response for aiohttp's default json.loads
+into dicts, orjson into dicts, and orjson into the slotted models the tool keeps.
+
+Run from the project root:
+    python -m benchmarks.decode --positions 20 --api-keys 50 --repeat 2000
+"""
+import tracemalloc
+import argparse
+import secrets
+import random
+import json
+import time
+import sys
+import gc
+
+from typing import (
+    Callable,
+    Any,
+)
+
+import orjson
+
+from benchmarks.mock_aevo import MARKETS
+from src.aevo.models import (
+    Portfolio,
+    OrderAck,
+    Account,
+    Market,
+)
+
+
+def account_body(positions: int, api_keys: int) -> bytes:
+    assets = [f'{asset}{number}' for number in range(positions // len(MARKETS) + 1) for asset in MARKETS][:positions]
+    return json.dumps({
+        "account": '0x' + secrets.token_hex(20),
+        "username": "benchmark",
+        "equity": "10234.55",
+        "available_balance": "8123.10",
+        "balance": "10000.00",
+        "leverage": "3.2",
+        "positions": [
+            {
+                "asset": asset,
+                "instrument_id": str(random.randint(1, 10 ** 4)),
+                "instrument_name": f'{asset}-PERP',
+                "instrument_type": "PERPETUAL",
+                "side": random.choice(("buy", "sell")),
+                "amount": f'{random.uniform(0.01, 5):.4f}',
+                "avg_entry_price": f'{random.uniform(1, 50000):.2f}',
+                "mark_price": f'{random.uniform(1, 50000):.2f}',
+                "unrealized_pnl": f'{random.uniform(-500, 500):.6f}',
+                "maintenance_margin": f'{random.uniform(1, 100):.6f}',
+                "margin_type": "CROSS",
+                "liquidation_price": f'{random.uniform(1, 50000):.2f}',
+                "leverage": "3",
+            } for asset in assets
+        ],
+        "collaterals": [
+            {
+                "collateral_asset": asset,
+                "collateral_value": f'{random.uniform(0, 10 ** 4):.6f}',
+                "balance": f'{random.uniform(0, 10 ** 4):.6f}',
+                "available_balance": f'{random.uniform(0, 10 ** 4):.6f}',
+                "withdrawable_balance": f'{random.uniform(0, 10 ** 4):.6f}',
+                "margin_value": f'{random.uniform(0, 10 ** 4):.6f}',
+                "yield_value": "0",
+            } for asset in ('USDC', 'aeUSD', 'WETH')
+        ],
+        "api_keys": [
+            {"api_key": secrets.token_hex(16), "read_only": False, "created_timestamp": str(time.time_ns())}
+            for _ in range(api_keys)
+        ],
+        "signing_keys": [{"signing_key": '0x' + secrets.token_hex(20), "expiry": str(time.time_ns())}],
+    }).encode()
+
+
+def markets_body() -> bytes:
+    return json.dumps([
+        {
+            "instrument_id": str(instrument_id),
+            "instrument_name": f'{asset}-PERP',
+            "instrument_type": "PERPETUAL",
+            "underlying_asset": asset,
+            "quote_asset": "USDC",
+            "price_step": "0.01",
+            "amount_step": amount_step,
+            "min_order_value": "10",
+            "max_order_value": "1000000",
+            "max_notional_value": "10000000",
+            "mark_price": str(price),
+            "index_price": str(price),
+            "is_active": True,
+            "max_leverage": "20",
+        } for asset, (instrument_id, amount_step, price) in MARKETS.items()
+    ]).encode()
+
+
+def order_body() -> bytes:
+    return json.dumps({
+        "order_id": '0x' + secrets.token_hex(32),
+        "account": '0x' + secrets.token_hex(20),
+        "instrument_id": "1",
+        "instrument_name": "ETH-PERP",
+        "instrument_type": "PERPETUAL",
+        "order_type": "limit",
+        "side": "buy",
+        "amount": "0.5",
+        "price": "2020.1",
+        "avg_price": "2000.1",
+        "filled": "0.5",
+        "order_status": "filled",
+        "reduce_only": False,
+        "initial_margin": "333.35",
+        "created_timestamp": str(time.time_ns()),
+        "timestamp": str(time.time_ns()),
+        "system_type": "API",
+    }).encode()
+
+
+def measure(decode: Callable[[bytes], Any], body: bytes, repeat: int) -> tuple[float, float]:
+    """Microseconds per decode, best of five rounds, and bytes still held by one decoded response"""
+    rounds = []
+    for _ in range(5):
+        started = time.perf_counter()
+        for _ in range(max(1, repeat // 5)):
+            decode(body)
+        rounds.append((time.perf_counter() - started) / max(1, repeat // 5))
+    seconds = min(rounds)
+
+    gc.collect()
+    tracemalloc.start()
+    kept = [decode(body) for _ in range(min(repeat, 1000))]
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds * 10 ** 6, retained / len(kept)
+
+
+def main(args: argparse.Namespace) -> int:
+    random.seed(args.seed)
+    responses = {
+        f'/account ({args.positions} positions, {args.api_keys} keys)': (
+            account_body(args.positions, args.api_keys), Account.from_json
+        ),
+        '/portfolio': (json.dumps({"balance": "10000.00", "user_pnl": "12.5"}).encode(), Portfolio.from_json),
+        f'/markets ({len(MARKETS)} markets)': (
+            markets_body(), lambda body: [Market.from_json(market) for market in body]
+        ),
+        '/orders': (order_body(), OrderAck.from_json),
+    }
+    for name, (body, model) in responses.items():
+        print(f'{name} | {len(body)} bytes')
+        for codec, decode in (
+                ('json.loads -> dicts', json.loads),
+                ('orjson -> dicts', orjson.loads),
+                ('orjson -> models', lambda data, model=model: model(orjson.loads(data))),
+        ):
+            microseconds, retained = measure(decode, body, args.repeat)
+            print(f'  {codec:22} {microseconds:9.2f} us | {retained / 1024:8.2f} KiB kept per response')
+    return 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--positions', type=int, default=20, help='Positions in the /account response')
+    parser.add_argument('--api-keys', type=int, default=50, help='API keys in the /account response')
+    parser.add_argument('--repeat', type=int, default=2000, help='Decodes timed per response and codec')
+    parser.add_argument('--seed', type=int, default=1)
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    sys.exit(main(parse_args()))
@@ -0,0 +1,240 @@
+"""
+End-to-end benchmark: drives Aevo.run for synthetic wallets against in-process mock AEVO and
+Arbitrum JSON-RPC servers and reports wallets/sec, per-stage latency percentiles and peak RSS.
+
+Run from the project root:
+    python -m benchmarks.e2e --wallets 1 100 1000 --stages register open close
+    python -m benchmarks.e2e --wallets 1000 --aevo-latency 0.02 --error-rate 0.01 --save-baseline
+
+Results are written to benchmarks/results/e2e_latest.json. When a baseline exists for the same
+parameters, a drop in wallets/sec or a rise in total p95 above --tolerance fails the run.
+"""
+from collections import defaultdict
+import argparse
+import tempfile
+import resource
+import asyncio
+import time
+import json
+import sys
+import os
+
+from eth_account import Account
+from loguru import logger
+
+import config
+
+from benchmarks.mock_aevo import MockAevo
+from benchmarks.mock_rpc import MockRpc
+
+STAGES = ['register', 'deposit', 'stake', 'withdraw_staking', 'open', 'close', 'withdraw', 'delete_keys']
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+# Aevo method timed for each stage
+STAGE_METHODS = {
+    'register': 'authorize',
+    'deposit': 'deposit',
+    'deposit_wait': 'wait_for_balance',
+    'stake': 'stake_usdc',
+    'withdraw_staking': 'withdraw_staking',
+    'open': 'open_position',
+    'close': 'close_all_positions',
+    'withdraw': 'withdraw_from_aevo',
+    'withdraw_wait': 'wait_for_withdraw',
+    'delete_keys': 'delete_api_keys',
+}
+
+
+def configure(args: argparse.Namespace, aevo_url: str, ws_url: str, rpc_url: str) -> None:
+    """Points the tool at the mock servers, must run before anything from src is imported"""
+    stages = set(args.stages)
+    config.AEVO_API = aevo_url
+    config.AEVO_WS = ws_url
+    config.RPC = rpc_url
+    config.API_KEYS_FILE = os.path.join(tempfile.mkdtemp(), 'api_keys.json')
+    config.JOURNAL_FILE = os.path.join(tempfile.mkdtemp(), 'journal.sqlite3')
+    config.DEPOSIT = 'deposit' in stages
+    config.USE_PERCENTAGE = False
+    config.DEPOSIT_AMOUNT = 10
+    config.STAKE = 'stake' in stages
+    config.WITHDRAW_STAKING = 'withdraw_staking' in stages
+    config.WITHDRAW = 'withdraw' in stages
+    config.delete_api_keys = 'delete_keys' in stages
+    config.OPEN_POSITIONS = 'open' in stages
+    config.CLOSE_POSITIONS = 'close' in stages
+    config.MAX_CONCURRENT_WALLETS = args.concurrency
+    config.STAGE_CONCURRENCY = dict(args.stage_concurrency)
+    config.HTTP_POOL_SIZE = args.concurrency
+    config.HTTP_LIMIT_PER_HOST = args.concurrency
+    config.HTTP_PREWARM_CONNECTIONS = min(args.concurrency, 20)
+    config.BALANCE_POLL_MIN_DELAY = 0.2
+    if not args.rate_limits:
+        config.RATE_LIMITS = {'default': (10 ** 6, 10 ** 6)}
+
+
+def percentile(values: list[float], share: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))] if values else 0.0
+
+
+def timed_trader_factory(timings: dict):
+    from main import create_trader
+
+    def timed(stage: str, method):
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await method(*args, **kwargs)
+            finally:
+                timings[stage].append(time.perf_counter() - start)
+        return wrapper
+
+    def factory(private_key: str):
+        trader = create_trader(private_key)
+        for stage, name in STAGE_METHODS.items():
+            setattr(trader, name, timed(stage, getattr(trader, name)))
+        return trader
+
+    return factory
+
+
+async def run_once(count: int, mock_aevo: MockAevo) -> dict:
+    from main import run_fleet
+
+    private_keys = [Account.create().key.hex() for _ in range(count)]
+    timings = defaultdict(list)
+    requests_before = dict(mock_aevo.requests)
+    partial_fills_before = mock_aevo.partial_fills
+    start = time.perf_counter()
+    results = await run_fleet(private_keys, timed_trader_factory(timings), fresh=True)
+    elapsed = time.perf_counter() - start
+
+    totals = [result.duration for result in results]
+    report = {
+        'wallets': count,
+        'failed': sum(not result.success for result in results),
+        'seconds': round(elapsed, 3),
+        'wallets_per_sec': round(count / elapsed, 2),
+        'aevo_requests': sum(mock_aevo.requests.values()) - sum(requests_before.values()),
+        'aevo_requests_by_path': {
+            path: count - requests_before.get(path, 0) for path, count in sorted(mock_aevo.requests.items())
+        },
+        'partial_fills': mock_aevo.partial_fills - partial_fills_before,
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'stages': {},
+    }
+    for stage, values in [('total', totals), *timings.items()]:
+        report['stages'][stage] = {
+            name: round(percentile(values, share) * 1000, 1)
+            for name, share in (('p50_ms', 0.5), ('p95_ms', 0.95), ('p99_ms', 0.99))
+        }
+    return report
+
+
+def print_report(report: dict) -> None:
+    print(
+        f"\n{report['wallets']} wallets | {report['wallets_per_sec']} wallets/sec | {report['seconds']}s | "
+        f"failed {report['failed']} | {report['aevo_requests']} AEVO requests | peak RSS {report['peak_rss_mb']} MB"
+    )
+    print('  requests: ' + ' | '.join(f'{path} {count}' for path, count in report['aevo_requests_by_path'].items()) +
+          f" | orders filled in part {report.get('partial_fills', 0)}")
+    for stage, values in report['stages'].items():
+        print(f"  {stage:16} p50 {values['p50_ms']:9.1f} ms | p95 {values['p95_ms']:9.1f} ms | p99 {values['p99_ms']:9.1f} ms")
+
+
+def compare(reports: list[dict], baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    previous = {report['wallets']: report for report in baseline['runs']}
+    for report in reports:
+        before = previous.get(report['wallets'])
+        if before is None:
+            continue
+        if report['wallets_per_sec'] < before['wallets_per_sec'] * (1 - tolerance):
+            regressions.append(
+                f"{report['wallets']} wallets: {report['wallets_per_sec']} wallets/sec, "
+                f"baseline {before['wallets_per_sec']}"
+            )
+        p95, p95_before = report['stages']['total']['p95_ms'], before['stages']['total']['p95_ms']
+        if p95 > p95_before * (1 + tolerance):
+            regressions.append(f"{report['wallets']} wallets: total p95 {p95} ms, baseline {p95_before} ms")
+    return regressions
+
+
+async def main(args: argparse.Namespace) -> int:
+    mock_aevo = MockAevo(latency=args.aevo_latency, error_rate=args.error_rate, deposit_delay=args.deposit_delay)
+    aevo_url = await mock_aevo.start()
+    mock_rpc = MockRpc(latency=args.rpc_latency, error_rate=args.error_rate, on_deposit=mock_aevo.credit)
+    rpc_url = await mock_rpc.start()
+    mock_aevo.on_withdraw = mock_rpc.credit_usdc
+    configure(args, aevo_url, mock_aevo.ws_url, rpc_url)
+    if args.metrics_port is not None:
+        from src.metrics import metrics
+        metrics.start(args.metrics_port)
+
+    reports = []
+    try:
+        for count in args.wallets:
+            report = await run_once(count, mock_aevo)
+            print_report(report)
+            reports.append(report)
+    finally:
+        await mock_aevo.stop()
+        await mock_rpc.stop()
+
+    parameters = {key: value for key, value in vars(args).items() if key not in ('wallets', 'save_baseline', 'tolerance', 'metrics_port')}
+    result = {'parameters': parameters, 'runs': reports, 'created_at': time.time()}
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(os.path.join(RESULTS_DIR, 'e2e_latest.json'), 'w') as file:
+        json.dump(result, file, indent=2)
+
+    baseline_path = os.path.join(RESULTS_DIR, 'e2e_baseline.json')
+    if args.save_baseline:
+        with open(baseline_path, 'w') as file:
+            json.dump(result, file, indent=2)
+        print(f'\nBaseline saved to {baseline_path}')
+        return 0
+
+    if os.path.exists(baseline_path):
+        with open(baseline_path) as file:
+            baseline = json.load(file)
+        if baseline['parameters'] != parameters:
+            print('\nBaseline was recorded with different parameters, skipping the comparison')
+            return 0
+        regressions = compare(reports, baseline, args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION | {regression}')
+        return 1 if regressions else 0
+    return 0
+
+
+def stage_limit(value: str) -> tuple[str, int]:
+    stage, _, limit = value.partition('=')
+    if stage not in STAGES or not limit.isdigit():
+        raise argparse.ArgumentTypeError(f'expected STAGE=N with a stage from {", ".join(STAGES)}')
+    return stage, int(limit)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--wallets', type=int, nargs='+', default=[1, 100, 1000])
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=['register', 'open', 'close'])
+    parser.add_argument('--concurrency', type=int, default=100, help='Wallets in progress at the same time')
+    parser.add_argument(
+        '--stage-concurrency', nargs='+', type=stage_limit, default=[], metavar='STAGE=N',
+        help='Workers of a stage, the rest get --concurrency'
+    )
+    parser.add_argument('--aevo-latency', type=float, default=0.0, help='Mean AEVO response delay, seconds')
+    parser.add_argument('--rpc-latency', type=float, default=0.0, help='Mean JSON-RPC response delay, seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with 429/503')
+    parser.add_argument('--deposit-delay', type=float, default=0.5, help='Seconds until a deposit reaches AEVO')
+    parser.add_argument('--rate-limits', action='store_true', help='Keep RATE_LIMITS from config.py')
+    parser.add_argument('--metrics-port', type=int, help='Serve Prometheus metrics while the benchmark runs')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed relative regression')
+    parser.add_argument('--save-baseline', action='store_true')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    logger.remove()
+    logger.add(sys.stderr, level=os.environ.get('LOG_LEVEL', 'WARNING'))
+    sys.exit(asyncio.run(main(parse_args())))
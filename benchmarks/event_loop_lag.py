@@ -0,0 +1,74 @@
+"""
+Event loop lag while many wallets sign at the same time, inline vs run_signing.
+
+Every simulated wallet registers an API key and signs an order between short
+network waits, while a monitor task measures how late its 10 ms timer fires.
+
+Run from the project root: python -m benchmarks.event_loop_lag [wallets]
+"""
+import asyncio
+import time
+import sys
+
+from eth_account import Account
+from web3 import AsyncWeb3
+
+from src.bot.utils.data_exctractor import (
+    get_signatures,
+    sign_order,
+)
+from src.client.signing import (
+    shutdown_signing_executor,
+    run_signing,
+)
+
+web3 = AsyncWeb3()
+
+
+async def inline(func, *args):
+    return func(*args)
+
+
+async def wallet(account, sign) -> None:
+    await asyncio.sleep(0.01)
+    await sign(get_signatures, web3, account.address, account, int(time.time() + 10000))
+    await asyncio.sleep(0.01)
+    await sign(sign_order, account.address, account.key.hex(), True, 10 ** 6, 0, 1, time.time(), 1)
+
+
+async def monitor(lags: list[float], interval: float = 0.01) -> None:
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+def percentile(values: list[float], share: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+async def measure(accounts: list, sign) -> tuple[float, list[float]]:
+    lags = []
+    monitor_task = asyncio.create_task(monitor(lags))
+    start = time.perf_counter()
+    await asyncio.gather(*[wallet(account, sign) for account in accounts])
+    elapsed = time.perf_counter() - start
+    monitor_task.cancel()
+    return elapsed, lags
+
+
+async def main(count: int = 500) -> None:
+    accounts = [Account.create() for _ in range(count)]
+    for name, sign in (('inline', inline), ('run_signing', run_signing)):
+        elapsed, lags = await measure(accounts, sign)
+        print(
+            f'{name:12} | {count} wallets in {elapsed:5.1f}s | loop lag '
+            f'p50 {percentile(lags, 0.5) * 1000:7.1f} ms, p99 {percentile(lags, 0.99) * 1000:7.1f} ms, '
+            f'max {max(lags) * 1000:7.1f} ms'
+        )
+    shutdown_signing_executor()
+
+
+if __name__ == '__main__':
+    asyncio.run(main(*map(int, sys.argv[1:])))
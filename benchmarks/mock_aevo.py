@@ -0,0 +1,409 @@
+"""
+In-process stand-in for the AEVO REST and WebSocket API with configurable latency and error injection.
+"""
+from dataclasses import (
+    dataclass,
+    field,
+)
+import secrets
+import asyncio
+import random
+import json
+import time
+
+from typing import (
+    Callable,
+    Optional,
+    Dict,
+    List,
+    Set,
+)
+
+from aiohttp import web
+
+MARKETS = {
+    'ETH': (1, '0.01', 2000.0),
+    'BTC': (2, '0.001', 40000.0),
+}
+PRICE_STEPS = {
+    'ETH': 0.1,
+    'BTC': 1.0,
+}
+
+
+class MockBook:
+    """L2 book of one market with random updates, in the format of the AEVO orderbook channel"""
+
+    def __init__(self, asset: str, levels: int = 50, rng: Optional[random.Random] = None) -> None:
+        self.asset = asset
+        self.rng = rng or random.Random()
+        self.price = MARKETS[asset][2]
+        self.tick = PRICE_STEPS[asset]
+        self.levels = levels
+        self.bids: Dict[float, float] = {}
+        self.asks: Dict[float, float] = {}
+        for level in range(1, levels + 1):
+            self.bids[round(self.price - level * self.tick, 8)] = self._size()
+            self.asks[round(self.price + level * self.tick, 8)] = self._size()
+
+    def _size(self) -> float:
+        # Up to $400k per level, deep enough for a fleet that closes at once
+        return round(self.rng.uniform(1, 200) * 2000 / self.price, 3)
+
+    def _message(self, kind: str, bids: Dict[float, float], asks: Dict[float, float]) -> dict:
+        return {"channel": f'orderbook:{self.asset}-PERP', "data": {
+            "type": kind,
+            "instrument_id": str(MARKETS[self.asset][0]),
+            "instrument_name": f'{self.asset}-PERP',
+            "instrument_type": "PERPETUAL",
+            "bids": [[str(price), str(size), "0"] for price, size in sorted(bids.items(), reverse=True)],
+            "asks": [[str(price), str(size), "0"] for price, size in sorted(asks.items())],
+            "last_updated": str(time.time_ns()),
+        }}
+
+    def snapshot(self) -> dict:
+        return self._message('snapshot', self.bids, self.asks)
+
+    def update(self, changes: int = 3) -> dict:
+        """Refills levels near the top that orders took, then resizes, removes or adds a few levels"""
+        bids, asks = {}, {}
+        for book, changed, sign in ((self.bids, bids, -1), (self.asks, asks, 1)):
+            for level in range(1, self.levels + 1):
+                price = round(self.price + sign * level * self.tick, 8)
+                if price not in book:
+                    book[price] = changed[price] = self._size()
+        for _ in range(changes):
+            book, changed, sign = (self.bids, bids, -1) if self.rng.random() < 0.5 else (self.asks, asks, 1)
+            price = round(self.price + sign * self.rng.randint(1, self.levels * 2) * self.tick, 8)
+            size = 0.0 if price in book and self.rng.random() < 0.3 else self._size()
+            if size:
+                book[price] = size
+            else:
+                book.pop(price, None)
+            changed[price] = size
+        return self._message('update', bids, asks)
+
+    def fill(self, is_buy: bool, amount: float, limit_price: Optional[float]) -> tuple[float, Optional[float], dict]:
+        """
+        Takes liquidity up to the limit price. Returns the filled amount, the average price and the update
+        of the levels it took, the rest of the order is cancelled as the mock keeps no resting orders
+        """
+        book = self.asks if is_buy else self.bids
+        changed = {}
+        filled, notional = 0.0, 0.0
+        for price in sorted(book, reverse=not is_buy):
+            if filled >= amount - 1e-12:
+                break
+            if limit_price is not None and (price > limit_price if is_buy else price < limit_price):
+                break
+            take = min(book[price], amount - filled)
+            filled += take
+            notional += take * price
+            size = round(book[price] - take, 8)
+            if size > 0:
+                book[price] = size
+            else:
+                del book[price]
+            changed[price] = max(size, 0.0)
+        message = self._message('update', {} if is_buy else changed, changed if is_buy else {})
+        return filled, (notional / filled if filled else None), message
+
+
+@dataclass
+class MockAccount:
+    address: str
+    balance: float = 1000.0
+    staked: float = 0.0
+    positions: Dict[str, dict] = field(default_factory=dict)
+    api_keys: Dict[str, str] = field(default_factory=dict)
+
+
+class MockAevo:
+    def __init__(
+            self,
+            latency: float = 0.0,
+            error_rate: float = 0.0,
+            deposit_delay: float = 0.5,
+            on_withdraw: Optional[Callable[[str, float], None]] = None
+    ) -> None:
+        self.latency = latency
+        self.on_withdraw = on_withdraw
+        self.error_rate = error_rate
+        self.deposit_delay = deposit_delay
+        self.accounts: Dict[str, MockAccount] = {}
+        self.keys: Dict[str, str] = {}
+        self.requests: Dict[str, int] = {}
+        self.sockets: Dict[str, Set[web.WebSocketResponse]] = {}
+        self.price_sockets: Set[web.WebSocketResponse] = set()
+        self.books = {asset: MockBook(asset) for asset in MARKETS}
+        self.book_sockets: Dict[web.WebSocketResponse, Set[str]] = {}
+        self.runner: Optional[web.AppRunner] = None
+        self.url = ''
+        self.order_times: List[float] = []
+        self.partial_fills = 0
+        self._ticker: Optional[asyncio.Task] = None
+
+    def account(self, address: str) -> MockAccount:
+        address = address.lower()
+        if address not in self.accounts:
+            self.accounts[address] = MockAccount(address)
+        return self.accounts[address]
+
+    def credit(self, address: str, amount: float) -> None:
+        async def later() -> None:
+            await asyncio.sleep(self.deposit_delay)
+            account = self.account(address)
+            account.balance += amount
+            await self._push(address, {"balance": str(account.balance)})
+
+        asyncio.create_task(later())
+
+    async def _send_book(self, asset: str, message: dict) -> None:
+        message = json.dumps(message)
+        for websocket, assets in list(self.book_sockets.items()):
+            if asset in assets and not websocket.closed:
+                await websocket.send_str(message)
+
+    async def _push(self, address: str, data: dict) -> None:
+        message = json.dumps({"channel": "account", "data": data})
+        for websocket in list(self.sockets.get(address.lower(), ())):
+            if not websocket.closed:
+                await websocket.send_str(message)
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler) -> web.StreamResponse:
+        if request.path == '/ws':
+            return await handler(request)
+        self.requests[request.path] = self.requests.get(request.path, 0) + 1
+        if self.latency:
+            await asyncio.sleep(random.uniform(0.5, 1.5) * self.latency)
+        if self.error_rate and random.random() < self.error_rate:
+            if random.random() < 0.5:
+                return web.json_response({"error": "RATE_LIMIT_EXCEEDED"}, status=429, headers={'Retry-After': '0.1'})
+            return web.json_response({"error": "INTERNAL_ERROR"}, status=503)
+        return await handler(request)
+
+    def _authorized(self, request: web.Request) -> MockAccount:
+        address = self.keys.get(request.headers.get('AEVO-KEY', ''))
+        if address is None:
+            raise web.HTTPUnauthorized(text=json.dumps({"error": "UNAUTHORIZED"}), content_type='application/json')
+        return self.account(address)
+
+    async def time(self, request: web.Request) -> web.Response:
+        return web.json_response({"timestamp": str(time.time_ns())})
+
+    async def register(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        api_key, api_secret = secrets.token_hex(16), secrets.token_hex(32)
+        self.keys[api_key] = payload['account'].lower()
+        self.account(payload['account']).api_keys[api_key] = api_secret
+        return web.json_response({"api_key": api_key, "api_secret": api_secret})
+
+    async def markets(self, request: web.Request) -> web.Response:
+        return web.json_response([
+            {
+                "instrument_id": str(instrument_id),
+                "instrument_name": f'{asset}-PERP',
+                "instrument_type": "PERPETUAL",
+                "underlying_asset": asset,
+                "amount_step": amount_step,
+                "price_step": str(PRICE_STEPS[asset]),
+                "index_price": str(price),
+                "mark_price": str(price),
+            } for asset, (instrument_id, amount_step, price) in MARKETS.items()
+        ])
+
+    async def index(self, request: web.Request) -> web.Response:
+        price = MARKETS[request.query['asset'].upper()][2]
+        return web.json_response({"price": str(price), "timestamp": str(time.time_ns())})
+
+    async def orders(self, request: web.Request) -> web.Response:
+        account = self._authorized(request)
+        payload = await request.json()
+        asset = next(name for name, market in MARKETS.items() if market[0] == int(payload['instrument']))
+        amount = int(payload['amount']) / 10 ** 6
+        is_buy = payload['is_buy']
+        # An unbounded limit (0 or 2 ** 256 - 1) walks the whole book
+        limit_price = int(payload['limit_price']) / 10 ** 6
+        if limit_price == 0 or limit_price > 10 ** 60:
+            limit_price = None
+        self.order_times.append(time.time())
+        position = account.positions.get(asset)
+        ordered = amount
+        if payload.get('reduce_only'):
+            # Only the part that shrinks the position is filled, nothing when there is none to shrink
+            reducible = abs(position['size']) if position and (position['size'] < 0) == is_buy else 0.0
+            amount = min(amount, reducible)
+        filled, avg_price, update = self.books[asset].fill(is_buy, amount, limit_price)
+        await self._send_book(asset, update)
+        if filled:
+            signed = filled if is_buy else -filled
+            size = (position['size'] if position else 0) + signed
+            if abs(size) < 1e-9:
+                account.positions.pop(asset, None)
+            else:
+                # Adding to a position keeps its entry, a new or flipped position starts at the fill price
+                same_side = position is not None and (position['size'] > 0) == (size > 0)
+                account.positions[asset] = {"size": size, "entry": position['entry'] if same_side else avg_price}
+            await self._push(account.address, {"positions": len(account.positions)})
+        if filled < ordered - 1e-9:
+            self.partial_fills += 1
+        return web.json_response({
+            "order_id": secrets.token_hex(16),
+            "amount": str(ordered),
+            "filled": str(round(filled, 8)),
+            "avg_price": str(avg_price) if avg_price is not None else None,
+            "time_in_force": payload.get('time_in_force', 'GTC'),
+            "reduce_only": bool(payload.get('reduce_only')),
+            "order_status": "filled" if filled >= ordered - 1e-9 else ("partial" if filled else "cancelled"),
+        })
+
+    async def account_info(self, request: web.Request) -> web.Response:
+        account = self._authorized(request)
+        return web.json_response({
+            "account": account.address,
+            "positions": [
+                {
+                    "asset": asset,
+                    "instrument_id": str(MARKETS[asset][0]),
+                    "instrument_name": f'{asset}-PERP',
+                    "side": "buy" if position['size'] > 0 else "sell",
+                    "amount": str(abs(position['size'])),
+                    "avg_entry_price": str(position['entry']),
+                    "unrealized_pnl": str(position['size'] * (MARKETS[asset][2] - position['entry'])),
+                    "maintenance_margin": str(abs(position['size']) * position['entry'] * 0.03),
+                } for asset, position in account.positions.items()
+            ],
+            "collaterals": [
+                {"collateral_asset": "USDC", "balance": str(account.balance)},
+                {"collateral_asset": "aeUSD", "balance": str(account.staked)},
+            ],
+            "api_keys": [{"api_key": api_key} for api_key in account.api_keys],
+        })
+
+    async def portfolio(self, request: web.Request) -> web.Response:
+        account = self._authorized(request)
+        return web.json_response({"balance": str(account.balance), "user_pnl": "0"})
+
+    async def transfer(self, request: web.Request) -> web.Response:
+        account = self._authorized(request)
+        payload = await request.json()
+        amount = int(payload['amount']) / 10 ** 6
+        if payload['label'] == 'YV_DEPOSIT':
+            account.balance -= amount
+            account.staked += amount
+        else:
+            account.staked -= amount
+            account.balance += amount
+        return web.json_response({"success": True})
+
+    async def withdraw(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        account = self.account(payload['account'])
+        account.balance -= int(payload['amount']) / 10 ** 6
+        if self.on_withdraw is not None:
+            self.on_withdraw(payload['account'], int(payload['amount']) / 10 ** 6)
+        return web.json_response({"success": True})
+
+    async def delete_api_key(self, request: web.Request) -> web.Response:
+        account = self._authorized(request)
+        payload = await request.json()
+        account.api_keys.pop(payload['api_key'], None)
+        self.keys.pop(payload['api_key'], None)
+        return web.json_response({"success": True})
+
+    async def websocket(self, request: web.Request) -> web.WebSocketResponse:
+        websocket = web.WebSocketResponse()
+        await websocket.prepare(request)
+        address = None
+        try:
+            async for message in websocket:
+                message = json.loads(message.data)
+                if message['op'] == 'auth':
+                    address = self.keys.get(message['data']['key'])
+                    if address is not None:
+                        self.sockets.setdefault(address, set()).add(websocket)
+                elif message['op'] == 'subscribe':
+                    if any(channel.startswith('index:') for channel in message['data']):
+                        self.price_sockets.add(websocket)
+                        for price_message in self._price_messages():
+                            await websocket.send_str(price_message)
+                    books = [channel.split(':')[1].split('-')[0] for channel in message['data']
+                             if channel.startswith('orderbook:')]
+                    for asset in books:
+                        self.book_sockets.setdefault(websocket, set()).add(asset)
+                        await websocket.send_str(json.dumps(self.books[asset].snapshot()))
+        finally:
+            self.price_sockets.discard(websocket)
+            self.book_sockets.pop(websocket, None)
+            if address is not None:
+                self.sockets.get(address, set()).discard(websocket)
+        return websocket
+
+    @staticmethod
+    def _price_messages() -> List[str]:
+        messages = []
+        for asset, (_, _, price) in MARKETS.items():
+            messages.append(json.dumps({"channel": f'index:{asset}', "data": {
+                "price": str(price), "timestamp": str(time.time_ns()),
+            }}))
+            messages.append(json.dumps({"channel": f'ticker:{asset}-PERP', "data": {
+                "timestamp": str(time.time_ns()),
+                "tickers": [{"instrument_name": f'{asset}-PERP', "mark": {"price": str(price)}}],
+            }}))
+        return messages
+
+    async def _tick_prices(self) -> None:
+        while True:
+            messages = self._price_messages()
+            for websocket in list(self.price_sockets):
+                if not websocket.closed:
+                    for message in messages:
+                        await websocket.send_str(message)
+            updates = {asset: json.dumps(book.update()) for asset, book in self.books.items()}
+            for websocket, assets in list(self.book_sockets.items()):
+                if not websocket.closed:
+                    for asset in assets:
+                        await websocket.send_str(updates[asset])
+            await asyncio.sleep(0.5)
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_get('/time', self.time)
+        app.router.add_post('/register', self.register)
+        app.router.add_get('/markets', self.markets)
+        app.router.add_get('/index', self.index)
+        app.router.add_post('/orders', self.orders)
+        app.router.add_get('/account', self.account_info)
+        app.router.add_get('/portfolio', self.portfolio)
+        app.router.add_post('/transfer', self.transfer)
+        app.router.add_post('/withdraw', self.withdraw)
+        app.router.add_delete('/api-key', self.delete_api_key)
+        app.router.add_get('/ws', self.websocket)
+        return app
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        self.runner = web.AppRunner(self.app())
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f'http://{host}:{port}'
+        self._ticker = asyncio.create_task(self._tick_prices())
+        return self.url
+
+    @property
+    def ws_url(self) -> str:
+        return self.url.replace('http', 'ws', 1) + '/ws'
+
+    async def stop(self) -> None:
+        if self._ticker is not None:
+            self._ticker.cancel()
+        for websocket in [*self.price_sockets, *self.book_sockets,
+                          *[ws for sockets in self.sockets.values() for ws in sockets]]:
+            await websocket.close()
+        if self.runner is not None:
+            await self.runner.cleanup()
+
+    def positions(self) -> List[dict]:
+        return [position for account in self.accounts.values() for position in account.positions.values()]
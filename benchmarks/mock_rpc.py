@@ -0,0 +1,183 @@
+"""
+In-process stand-in for an Arbitrum JSON-RPC node with configurable latency and error injection.
+
+Knows just enough of the chain for this tool: balances, Multicall3, allowance, the AEVO deposit
+contract and transaction receipts. Deposits are forwarded to the mock AEVO API.
+"""
+import secrets
+import asyncio
+import random
+
+from typing import (
+    Callable,
+    Optional,
+    Dict,
+    Any,
+)
+
+from eth_account._utils.typed_transactions import TypedTransaction
+from eth_account import Account
+from eth_abi import (
+    decode,
+    encode,
+)
+from eth_utils import keccak
+from hexbytes import HexBytes
+from aiohttp import web
+
+CHAIN_ID = 42161
+DEPOSIT_SELECTOR = bytes.fromhex('864f6a7a')
+
+
+class MockRpc:
+    def __init__(
+            self,
+            latency: float = 0.0,
+            error_rate: float = 0.0,
+            on_deposit: Optional[Callable[[str, float], None]] = None,
+            allowance: int = 2 ** 256 - 1
+    ) -> None:
+        self.latency = latency
+        self.error_rate = error_rate
+        self.on_deposit = on_deposit
+        self.allowance = allowance
+        self.block_number = 1000
+        self.eth_balances: Dict[str, int] = {}
+        self.usdc_balances: Dict[str, int] = {}
+        self.nonces: Dict[str, int] = {}
+        self.transactions: Dict[str, dict] = {}
+        self.receipts: Dict[str, dict] = {}
+        self.calls: Dict[str, int] = {}
+        self.runner: Optional[web.AppRunner] = None
+        self.url = ''
+
+    def eth_balance(self, address: str) -> int:
+        return self.eth_balances.get(address.lower(), 10 ** 18)
+
+    def usdc_balance(self, address: str) -> int:
+        return self.usdc_balances.get(address.lower(), 1000 * 10 ** 6)
+
+    def credit_usdc(self, address: str, amount: float) -> None:
+        self.usdc_balances[address.lower()] = self.usdc_balance(address) + int(amount * 10 ** 6)
+
+    def _eth_call(self, to: str, data: bytes) -> bytes:
+        selector, arguments = bytes(data[:4]).hex(), bytes(data[4:])
+        if selector == '82ad56cb':
+            (calls,) = decode(['(address,bool,bytes)[]'], arguments)
+            return encode(['(bool,bytes)[]'], [[(True, self._eth_call(target, call)) for target, _, call in calls]])
+        if selector == '42cbb15c':
+            return encode(['uint256'], [self.block_number])
+        if selector == '4d2301cc':
+            return encode(['uint256'], [self.eth_balance(decode(['address'], arguments)[0])])
+        if selector == '70a08231':
+            return encode(['uint256'], [self.usdc_balance(decode(['address'], arguments)[0])])
+        if selector == 'dd62ed3e':
+            return encode(['uint256'], [self.allowance])
+        if selector == '8367080f':
+            return encode(['uint256'], [10 ** 14])
+        raise ValueError(f'Unknown eth_call selector 0x{selector}')
+
+    def _send_raw_transaction(self, raw: str) -> str:
+        raw = HexBytes(raw)
+        sender = Account.recover_transaction(raw)
+        tx_hash = '0x' + keccak(raw).hex()
+        self.nonces[sender.lower()] = self.nonces.get(sender.lower(), 0) + 1
+        self.block_number += 1
+        if raw[0] < 0x80:
+            transaction = TypedTransaction.from_bytes(raw).as_dict()
+            data = HexBytes(transaction.get('data', b''))
+            if data[:4] == DEPOSIT_SELECTOR:
+                (_, amount, _, _) = decode(['address', 'uint256', 'uint256', 'address'], data[4:])
+                self.usdc_balances[sender.lower()] = self.usdc_balance(sender) - amount
+                if self.on_deposit is not None:
+                    self.on_deposit(sender, amount / 10 ** 6)
+        self.transactions[tx_hash] = {
+            "hash": tx_hash,
+            "blockHash": None,
+            "blockNumber": None,
+            "transactionIndex": None,
+            "from": sender,
+            "nonce": hex(self.nonces[sender.lower()] - 1),
+            "input": '0x',
+            "value": "0x0",
+            "gas": "0x5208",
+            "gasPrice": "0x5f5e100",
+            "type": "0x2",
+        }
+        self.receipts[tx_hash] = {
+            "transactionHash": tx_hash,
+            "blockHash": '0x' + secrets.token_hex(32),
+            "blockNumber": hex(self.block_number),
+            "transactionIndex": "0x0",
+            "from": sender,
+            "to": None,
+            "contractAddress": None,
+            "cumulativeGasUsed": "0x5208",
+            "effectiveGasPrice": "0x5f5e100",
+            "gasUsed": "0x5208",
+            "logs": [],
+            "logsBloom": '0x' + '00' * 256,
+            "status": "0x1",
+            "type": "0x2",
+        }
+        return tx_hash
+
+    def _dispatch(self, method: str, params: list) -> Any:
+        if method == 'eth_chainId':
+            return hex(CHAIN_ID)
+        if method == 'eth_blockNumber':
+            return hex(self.block_number)
+        if method == 'eth_getTransactionCount':
+            return hex(self.nonces.get(params[0].lower(), 0))
+        if method == 'eth_getBalance':
+            return hex(self.eth_balance(params[0]))
+        if method in ('eth_gasPrice', 'eth_maxPriorityFeePerGas'):
+            return hex(10 ** 8)
+        if method == 'eth_feeHistory':
+            return {"oldestBlock": hex(self.block_number), "baseFeePerGas": [hex(10 ** 8), hex(10 ** 8)],
+                    "gasUsedRatio": [0.5], "reward": [["0x0"]]}
+        if method == 'eth_estimateGas':
+            return hex(500000)
+        if method == 'eth_call':
+            return '0x' + bytes(self._eth_call(params[0]['to'], HexBytes(params[0]['data']))).hex()
+        if method == 'eth_sendRawTransaction':
+            return self._send_raw_transaction(params[0])
+        if method == 'eth_getTransactionByHash':
+            return self.transactions.get(params[0])
+        if method == 'eth_getTransactionReceipt':
+            return self.receipts.get(params[0])
+        raise ValueError(f'Unsupported method {method}')
+
+    async def _handle_one(self, request: dict) -> dict:
+        method = request['method']
+        self.calls[method] = self.calls.get(method, 0) + 1
+        try:
+            result = self._dispatch(method, request.get('params', []))
+        except Exception as ex:
+            return {"jsonrpc": "2.0", "id": request.get('id'), "error": {"code": -32000, "message": str(ex)}}
+        return {"jsonrpc": "2.0", "id": request.get('id'), "result": result}
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if self.latency:
+            await asyncio.sleep(random.uniform(0.5, 1.5) * self.latency)
+        if self.error_rate and random.random() < self.error_rate:
+            return web.json_response({"error": "upstream unavailable"}, status=503)
+        payload = await request.json()
+        if isinstance(payload, list):
+            return web.json_response([await self._handle_one(item) for item in payload])
+        return web.json_response(await self._handle_one(payload))
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        app = web.Application()
+        app.router.add_post('/', self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f'http://{host}:{port}'
+        return self.url
+
+    async def stop(self) -> None:
+        if self.runner is not None:
+            await self.runner.cleanup()
@@ -0,0 +1,226 @@
+"""
+Order book replay harness: feeds recorded or synthetic AEVO orderbook messages through OrderBookFeed,
+checks impact price, average price and fillable size against a naive book rebuilt by sorting, and
+measures the cost of updates, of queries and of updates with a query after each of them.
+
+Run from the project root:
+    python -m benchmarks.orderbook_replay --updates 200000 --levels 500
+    python -m benchmarks.orderbook_replay --record feed.jsonl --url wss://ws.aevo.xyz --assets ETH BTC --seconds 60
+    python -m benchmarks.orderbook_replay --file feed.jsonl
+"""
+from collections import defaultdict
+import argparse
+import asyncio
+import random
+import json
+import time
+import sys
+
+from typing import (
+    Iterator,
+    Optional,
+    Dict,
+)
+
+from websockets import connect
+
+from benchmarks.mock_aevo import (
+    MockBook,
+    MARKETS,
+)
+from src.aevo.orderbook import OrderBookFeed
+
+
+class NaiveSide:
+    """Reference side: a dict of levels that is sorted on every query"""
+
+    def __init__(self, descending: bool) -> None:
+        self.descending = descending
+        self.levels: Dict[float, float] = {}
+
+    def levels_from_best(self) -> list[tuple[float, float]]:
+        return sorted(self.levels.items(), reverse=self.descending)
+
+    def impact_price(self, size: float) -> Optional[float]:
+        filled = 0.0
+        for price, level_size in self.levels_from_best():
+            filled += level_size
+            if filled >= size:
+                return price
+        return None
+
+    def average_price(self, size: float) -> Optional[float]:
+        filled, notional = 0.0, 0.0
+        for price, level_size in self.levels_from_best():
+            take = min(level_size, size - filled)
+            filled += take
+            notional += take * price
+            if filled >= size:
+                return notional / size
+        return None
+
+    def fillable(self, limit_price: float) -> float:
+        return sum(
+            size for price, size in self.levels.items()
+            if (price >= limit_price if self.descending else price <= limit_price)
+        )
+
+
+def apply_naive(books: Dict[str, Dict[str, NaiveSide]], message: dict) -> None:
+    asset = message['channel'].split(':')[1].split('-')[0]
+    data = message['data']
+    book = books[asset]
+    if data.get('type') == 'snapshot':
+        book['bids'].levels.clear()
+        book['asks'].levels.clear()
+    for name in ('bids', 'asks'):
+        for price, size, *_ in data.get(name) or ():
+            if float(size) > 0:
+                book[name].levels[float(price)] = float(size)
+            else:
+                book[name].levels.pop(float(price), None)
+
+
+def synthetic_feed(assets: list[str], levels: int, updates: int, seed: int) -> Iterator[dict]:
+    rng = random.Random(seed)
+    books = {asset: MockBook(asset, levels, rng) for asset in assets}
+    for book in books.values():
+        yield book.snapshot()
+    for _ in range(updates):
+        yield books[rng.choice(assets)].update(rng.randint(1, 5))
+
+
+def recorded_feed(path: str) -> Iterator[dict]:
+    with open(path) as file:
+        for line in file:
+            message = json.loads(line)
+            if message.get('channel', '').startswith('orderbook:'):
+                yield message
+
+
+async def record(args: argparse.Namespace) -> int:
+    channels = [f'orderbook:{asset.upper()}-PERP' for asset in args.assets]
+    count = 0
+    deadline = time.monotonic() + args.seconds
+    async with connect(args.url) as websocket:
+        await websocket.send(json.dumps({"op": "subscribe", "data": channels}))
+        with open(args.record, 'w') as file:
+            while time.monotonic() < deadline:
+                try:
+                    message = await asyncio.wait_for(websocket.recv(), deadline - time.monotonic())
+                except asyncio.TimeoutError:
+                    break
+                file.write(message.strip() + '\n')
+                count += 1
+    print(f'Recorded {count} messages from {", ".join(channels)} to {args.record}')
+    return 0
+
+
+async def replay(args: argparse.Namespace) -> int:
+    if args.file:
+        messages = list(recorded_feed(args.file))
+    else:
+        messages = list(synthetic_feed(args.assets, args.levels, args.updates, args.seed))
+    feed = OrderBookFeed()
+    # Replayed messages do not come over a socket, the feed is treated as connected
+    feed.connected.set()
+
+    started = time.perf_counter()
+    for message in messages:
+        await feed._handle(message)
+    updates_seconds = time.perf_counter() - started
+
+    # Orders read the book between updates, so every message is followed by a query on the book it changed
+    rng = random.Random(args.seed)
+    depths = {}
+    interleaved = []
+    for message in messages:
+        asset = message['channel'].split(':')[1].split('-')[0]
+        if message['data'].get('type') == 'snapshot':
+            depths[asset] = sum(float(size) for _, size, *_ in message['data'].get('asks') or ())
+        interleaved.append((message, asset, rng.random() < 0.5, rng.uniform(0, depths.get(asset, 0.0))))
+    feed = OrderBookFeed()
+    feed.connected.set()
+    started = time.perf_counter()
+    for message, asset, is_buy, size in interleaved:
+        await feed._handle(message)
+        feed.limit_price(asset, is_buy, size)
+    interleaved_seconds = time.perf_counter() - started
+
+    naive = defaultdict(lambda: {'bids': NaiveSide(descending=True), 'asks': NaiveSide(descending=False)})
+    feed = OrderBookFeed()
+    feed.connected.set()
+    rng = random.Random(args.seed)
+    mismatches, checks = 0, 0
+    check_every = max(1, len(messages) // args.checks)
+    for number, message in enumerate(messages):
+        await feed._handle(message)
+        apply_naive(naive, message)
+        if number % check_every:
+            continue
+        for asset, reference in naive.items():
+            book = feed.book(asset)
+            if book is None:
+                continue
+            for name, is_buy in (('asks', True), ('bids', False)):
+                side, expected = book.side(is_buy), reference[name]
+                size = rng.uniform(0, sum(expected.levels.values()) * 1.1)
+                best = side.best or 0.0
+                limit = best * rng.uniform(0.99, 1.01)
+                results = [
+                    (side.impact_price(size), expected.impact_price(size)),
+                    (side.average_price(size), expected.average_price(size)),
+                    (side.fillable(limit), expected.fillable(limit)),
+                ]
+                checks += len(results)
+                for actual, wanted in results:
+                    if (actual is None) != (wanted is None) or (
+                            actual is not None and abs(actual - wanted) > 1e-6 * max(1.0, abs(wanted))):
+                        mismatches += 1
+
+    # Query cost on the final books, the trees are already built by the checks above
+    queries = []
+    for asset in naive:
+        book = feed.book(asset)
+        if book is not None:
+            total = sum(naive[asset]['asks'].levels.values())
+            queries.extend((book, naive[asset]['asks'], rng.uniform(0, total)) for _ in range(args.queries))
+    started = time.perf_counter()
+    for book, _, size in queries:
+        book.asks.impact_price(size)
+    query_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    for _, reference, size in queries[:max(1, len(queries) // 100)]:
+        reference.impact_price(size)
+    naive_seconds = (time.perf_counter() - started) * len(queries) / max(1, len(queries) // 100)
+
+    levels = {asset: (len(feed.books[asset].bids), len(feed.books[asset].asks)) for asset in feed.books}
+    print(f'Replayed {len(messages)} messages from {args.file or "a synthetic feed"} | levels (bids, asks): {levels}')
+    print(f'Updates: {updates_seconds:.2f}s | {updates_seconds / len(messages) * 1e6:.1f} us per message')
+    print(f'Updates with a limit price query after each: {interleaved_seconds:.2f}s | '
+          f'{interleaved_seconds / len(messages) * 1e6:.1f} us per message')
+    if queries:
+        print(f'Impact price: {query_seconds / len(queries) * 1e6:.2f} us per query | '
+              f'sorting the levels on every query: {naive_seconds / len(queries) * 1e6:.1f} us')
+    print(f'{checks} queries compared with the naive book, {mismatches} mismatches')
+    return 1 if mismatches else 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--file', help='Recorded feed, one WebSocket message per line')
+    parser.add_argument('--record', metavar='PATH', help='Record a live feed to PATH instead of replaying')
+    parser.add_argument('--url', default='wss://ws.aevo.xyz', help='WebSocket to record from')
+    parser.add_argument('--seconds', type=float, default=60, help='How long to record')
+    parser.add_argument('--assets', nargs='+', default=list(MARKETS), type=str.upper)
+    parser.add_argument('--levels', type=int, default=200, help='Levels per side of the synthetic book')
+    parser.add_argument('--updates', type=int, default=100000, help='Messages of the synthetic feed after the snapshots')
+    parser.add_argument('--checks', type=int, default=2000, help='Points of the replay where queries are compared')
+    parser.add_argument('--queries', type=int, default=100000, help='Impact price queries timed per book')
+    parser.add_argument('--seed', type=int, default=1)
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    arguments = parse_args()
+    sys.exit(asyncio.run(record(arguments) if arguments.record else replay(arguments)))
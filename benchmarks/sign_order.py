@@ -0,0 +1,98 @@
+"""
+Orders signed per second: eip712_structs path vs precompiled OrderHasher.
+
+Run from the project root: python -m benchmarks.sign_order [orders]
+"""
+import random
+import time
+import sys
+
+from eth_account import Account
+from web3 import AsyncWeb3
+
+from eip712_structs import make_domain
+
+from src.bot.utils.data_exctractor import sign_order
+from src.bot.utils.order_signer import hash_order
+from src.aevo.order import Order
+
+MAX_LIMIT_PRICE = 2 ** 256 - 1
+
+
+def legacy_sign_order(wallet_address, private_key, is_buy, amount, limit_price, salt, timestamp, instrument_id):
+    order_struct = Order(
+        maker=wallet_address,
+        isBuy=is_buy,
+        limitPrice=int(limit_price),
+        amount=int(amount),
+        salt=salt,
+        instrument=instrument_id,
+        timestamp=int(timestamp)
+    )
+    domain = make_domain(name='Aevo Mainnet', version='1', chainId=1)
+    signable_bytes = AsyncWeb3.keccak(order_struct.signable_bytes(domain=domain))
+    return Account._sign_hash(signable_bytes, private_key).signature.hex()
+
+
+def legacy_hash_order(wallet_address, private_key, is_buy, amount, limit_price, salt, timestamp, instrument_id):
+    order_struct = Order(
+        maker=wallet_address,
+        isBuy=is_buy,
+        limitPrice=int(limit_price),
+        amount=int(amount),
+        salt=salt,
+        instrument=instrument_id,
+        timestamp=int(timestamp)
+    )
+    domain = make_domain(name='Aevo Mainnet', version='1', chainId=1)
+    return AsyncWeb3.keccak(order_struct.signable_bytes(domain=domain))
+
+
+def current_hash_order(wallet_address, private_key, is_buy, amount, limit_price, salt, timestamp, instrument_id):
+    return hash_order(wallet_address, is_buy, int(limit_price), int(amount), salt, instrument_id, int(timestamp))
+
+
+def make_orders(count: int) -> list[tuple]:
+    accounts = [Account.create() for _ in range(10)]
+    orders = []
+    for _ in range(count):
+        account = random.choice(accounts)
+        orders.append((
+            account.address,
+            account.key.hex(),
+            random.random() < 0.5,
+            random.randint(1, 10 ** 12),
+            random.choice([0, MAX_LIMIT_PRICE, random.randint(1, 10 ** 12)]),
+            random.randint(0, 10 ** 10),
+            time.time(),
+            random.randint(1, 10 ** 4),
+        ))
+    return orders
+
+
+def measure(sign, orders: list[tuple]) -> float:
+    start = time.perf_counter()
+    for order in orders:
+        sign(*order)
+    return len(orders) / (time.perf_counter() - start)
+
+
+def main(count: int = 2000) -> None:
+    orders = make_orders(count)
+    for order in orders[:200]:
+        assert sign_order(*order) == legacy_sign_order(*order), order
+    print('Signatures are byte-identical')
+
+    legacy = measure(legacy_hash_order, orders)
+    current = measure(current_hash_order, orders)
+    print(f'Hashing  | eip712_structs: {legacy:10.0f} orders/sec')
+    print(f'Hashing  | OrderHasher:    {current:10.0f} orders/sec ({current / legacy:.2f}x)')
+
+    legacy = measure(legacy_sign_order, orders)
+    current = measure(sign_order, orders)
+    print(f'Signing  | eip712_structs: {legacy:10.0f} orders/sec')
+    print(f'Signing  | OrderHasher:    {current:10.0f} orders/sec ({current / legacy:.2f}x)')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
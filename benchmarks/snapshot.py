@@ -0,0 +1,138 @@
+"""
+Fleet snapshot benchmark: seeds the mock AEVO with wallets holding random positions and stored API keys,
+runs main.snapshot_fleet over all of them and checks the per-asset totals against the mock's own state.
+
+Run from the project root:
+    python -m benchmarks.snapshot --wallets 10000 --aevo-latency 0.02
+"""
+from collections import defaultdict
+import argparse
+import tempfile
+import asyncio
+import secrets
+import random
+import time
+import sys
+import os
+
+from eth_account import Account
+from loguru import logger
+
+import config
+
+from benchmarks.mock_aevo import (
+    MockAevo,
+    MARKETS,
+)
+
+
+def configure(args: argparse.Namespace, aevo_url: str) -> None:
+    """Points the tool at the mock server, must run before anything from src is imported"""
+    config.AEVO_API = aevo_url
+    config.API_KEYS_FILE = os.path.join(tempfile.mkdtemp(), 'api_keys.json')
+    config.SNAPSHOT_CONCURRENCY = args.concurrency
+    config.HTTP_POOL_SIZE = args.concurrency
+    config.HTTP_LIMIT_PER_HOST = args.concurrency
+    config.HTTP_PREWARM_CONNECTIONS = min(args.concurrency, 20)
+    if not args.rate_limits:
+        config.RATE_LIMITS = {'default': (10 ** 6, 10 ** 6)}
+
+
+async def seed(mock_aevo: MockAevo, count: int, max_positions: int) -> list[str]:
+    """Creates wallets with positions on the mock and stores their API keys, as an earlier run would"""
+    from src.aevo.credentials import (
+        ApiCredentials,
+        api_key_store,
+    )
+
+    private_keys, stored = [], []
+    expiry = int(time.time() + 86400)
+    for _ in range(count):
+        account = Account.create()
+        private_key = account.key.hex()
+        api_key, api_secret = secrets.token_hex(16), secrets.token_hex(32)
+        mock_account = mock_aevo.account(account.address)
+        mock_aevo.keys[api_key] = mock_account.address
+        mock_account.api_keys[api_key] = api_secret
+        for asset in random.sample(list(MARKETS), random.randint(0, min(max_positions, len(MARKETS)))):
+            _, amount_step, price = MARKETS[asset]
+            mock_account.positions[asset] = {
+                "size": random.choice((1, -1)) * round(random.uniform(0.01, 2), len(amount_step) - 2),
+                "entry": price * random.uniform(0.95, 1.05),
+            }
+        private_keys.append(private_key)
+        stored.append((account.address, private_key, ApiCredentials(api_key, api_secret, expiry)))
+    # Puts that wait together share one write of the file
+    await asyncio.gather(*[api_key_store.put(*record) for record in stored])
+    return private_keys
+
+
+def expected_totals(mock_aevo: MockAevo) -> dict[str, tuple[float, float]]:
+    totals = defaultdict(lambda: [0.0, 0.0])
+    for account in mock_aevo.accounts.values():
+        for asset, position in account.positions.items():
+            totals[asset][0] += position['size']
+            totals[asset][1] += position['size'] * (MARKETS[asset][2] - position['entry'])
+    return {asset: (net, pnl) for asset, (net, pnl) in totals.items()}
+
+
+async def main(args: argparse.Namespace) -> int:
+    mock_aevo = MockAevo(latency=args.aevo_latency, error_rate=args.error_rate)
+    aevo_url = await mock_aevo.start()
+    configure(args, aevo_url)
+    from main import snapshot_fleet
+
+    try:
+        started = time.perf_counter()
+        private_keys = await seed(mock_aevo, args.wallets, args.max_positions)
+        seeded = time.perf_counter() - started
+        requests_before = sum(mock_aevo.requests.values())
+        output = os.path.join(tempfile.mkdtemp(), f'snapshot.{args.format}')
+
+        started = time.perf_counter()
+        portfolio = await snapshot_fleet(private_keys, output)
+        elapsed = time.perf_counter() - started
+        requests = sum(mock_aevo.requests.values()) - requests_before
+    finally:
+        await mock_aevo.stop()
+
+    print(f'Seeded {args.wallets} wallets in {seeded:.1f}s')
+    print(
+        f'Snapshot of {len(portfolio.wallets)} wallets | {elapsed:.2f}s | {args.wallets / elapsed:.0f} wallets/sec | '
+        f'{len(portfolio.asset)} positions | failed {len(portfolio.failed)} | skipped {len(portfolio.skipped)} | {requests} AEVO requests'
+    )
+    aggregate = time.perf_counter()
+    exposures = portfolio.by_asset()
+    print(f'Per-asset aggregation: {(time.perf_counter() - aggregate) * 1000:.2f} ms')
+
+    expected = expected_totals(mock_aevo)
+    mismatches = []
+    for exposure in exposures:
+        net, pnl = expected.pop(exposure.asset, (0.0, 0.0))
+        print(f'  {exposure.asset:5} net {exposure.net_size:+14.4f} | PNL {exposure.unrealized_pnl:+14.2f}$ | '
+              f'{exposure.positions} positions')
+        if abs(exposure.net_size - net) > 1e-6 * max(1.0, abs(net)) or abs(exposure.unrealized_pnl - pnl) > 1e-3:
+            mismatches.append(exposure.asset)
+    mismatches.extend(expected)
+    if mismatches or portfolio.failed or portfolio.skipped:
+        print(f'Snapshot does not match the mock: {", ".join(mismatches) or "failed or skipped wallets"}')
+        return 1
+    return 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--wallets', type=int, default=10000)
+    parser.add_argument('--max-positions', type=int, default=2, help='Positions per wallet, from 0 up to this')
+    parser.add_argument('--concurrency', type=int, default=100, help='Wallets read at the same time')
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+    parser.add_argument('--aevo-latency', type=float, default=0.0, help='Mean AEVO response delay, seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with 429/503')
+    parser.add_argument('--rate-limits', action='store_true', help='Keep RATE_LIMITS from config.py')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    logger.remove()
+    logger.add(sys.stderr, level=os.environ.get('LOG_LEVEL', 'WARNING'))
+    sys.exit(asyncio.run(main(parse_args())))
@@ -0,0 +1,125 @@
+"""
+Cold start benchmark: spawns a fresh interpreter that opens one position through main.run_fleet
+against the mock AEVO and JSON-RPC servers and measures the time from spawning the process to the
+order being acknowledged. The API key is registered by a warm-up run, as it would be stored by an
+earlier session.
+
+Run from the project root:
+    python -m benchmarks.startup --runs 5 --aevo-latency 0.1
+"""
+from collections import defaultdict
+import statistics
+import argparse
+import tempfile
+import asyncio
+import json
+import time
+import sys
+import os
+
+from eth_account import Account
+
+from benchmarks.mock_aevo import MockAevo
+from benchmarks.mock_rpc import MockRpc
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = '''
+import asyncio
+import json
+import os
+
+import config
+
+for name, value in json.loads(os.environ['STARTUP_BENCH_CONFIG']).items():
+    setattr(config, name, value)
+
+from src.startup import startup
+from main import run_fleet
+
+asyncio.run(run_fleet([os.environ['STARTUP_BENCH_KEY']]))
+print(json.dumps(startup.marks))
+'''
+
+
+async def spawn(code: str, env: dict) -> tuple[float, str]:
+    """Runs the code in a new interpreter and returns when it was started and what it printed"""
+    started = time.time()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, '-c', code,
+        cwd=PROJECT_DIR,
+        env=env,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await process.communicate()
+    if process.returncode != 0:
+        raise RuntimeError(stderr.decode()[-2000:])
+    return started, stdout.decode()
+
+
+async def main(args: argparse.Namespace) -> int:
+    mock_aevo = MockAevo(latency=args.aevo_latency)
+    aevo_url = await mock_aevo.start()
+    mock_rpc = MockRpc()
+    rpc_url = await mock_rpc.start()
+    settings = {
+        'AEVO_API': aevo_url,
+        'AEVO_WS': mock_aevo.ws_url,
+        'RPC': rpc_url,
+        'API_KEYS_FILE': os.path.join(tempfile.mkdtemp(), 'api_keys.json'),
+        # The children run in the project directory, they must not resume the operator's journal
+        'JOURNAL_FILE': os.path.join(tempfile.mkdtemp(), 'journal.sqlite3'),
+        'OPEN_POSITIONS': True,
+        'CLOSE_POSITIONS': False,
+        'DEPOSIT': False,
+        'WITHDRAW': False,
+    }
+    env = {
+        **os.environ,
+        'STARTUP_BENCH_CONFIG': json.dumps(settings),
+        'STARTUP_BENCH_KEY': Account.create().key.hex(),
+    }
+
+    try:
+        started, _ = await spawn('import config', env)
+        interpreter = time.time() - started
+        await spawn(CHILD, env)
+
+        first_order, total, milestones = [], [], defaultdict(list)
+        for _ in range(args.runs):
+            orders_before = len(mock_aevo.order_times)
+            started, output = await spawn(CHILD, env)
+            total.append(time.time() - started)
+            for name, seconds in json.loads(output.strip().splitlines()[-1]).items():
+                milestones[name].append(seconds)
+            if len(mock_aevo.order_times) == orders_before:
+                raise RuntimeError('The run finished without sending an order')
+            first_order.append(mock_aevo.order_times[orders_before] - started)
+    finally:
+        await mock_aevo.stop()
+        await mock_rpc.stop()
+
+    median = statistics.median(first_order) * 1000
+    print(f'Interpreter + config import: {interpreter * 1000:.0f} ms')
+    print(f'Time to first order:         median {median:.0f} ms | min {min(first_order) * 1000:.0f} ms | '
+          f'max {max(first_order) * 1000:.0f} ms')
+    print(f'Whole run:                   median {statistics.median(total) * 1000:.0f} ms')
+    for name, values in milestones.items():
+        print(f'  {name:26} median {statistics.median(values) * 1000:.0f} ms after main.py started')
+    if args.target_ms is not None and median > args.target_ms:
+        print(f'Time to first order is above the {args.target_ms:.0f} ms target')
+        return 1
+    return 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--aevo-latency', type=float, default=0.1, help='Mean AEVO response delay, seconds')
+    parser.add_argument('--target-ms', type=float, help='Fail when the median time to first order is above this')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main(parse_args())))
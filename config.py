@@ -3,6 +3,8 @@ DEPOSIT = False
 DEPOSIT_AMOUNT = 10
 USE_PERCENTAGE = True
 DEPOSIT_PERCENTAGE = 1
+BALANCE_POLL_MIN_DELAY = 2  # First balance check interval while waiting for a deposit or a withdrawal
+BALANCE_POLL_MAX_DELAY = 30  # The interval grows up to this many seconds
 # ----------------------------- #
 
 # --- AEVO SETTINGS --- #
@@ -11,6 +13,7 @@ OPEN_POSITIONS = False
 CLOSE_POSITIONS = True
 TOKEN = 'ETH'
 SIDE = 'SELL'  # BUY / SELL
+CLOSE_TIMEOUT = 60  # Seconds closing is retried while part of a position is still open
 # --------------------- #
 
 # --- STAKING USDC ON AEVO --- #
@@ -33,6 +36,85 @@ WITHDRAW_PERCENTAGE = 0.5
 # --------------------------- #
 
 RPC = 'https://arbitrum.llamarpc.com'
+FEE_TTL = 1  # Seconds a sampled base/priority fee is shared between wallets
+BALANCE_CACHE_TTL = 1  # Seconds a wallet balance read through Multicall3 is reused
+MULTICALL_BATCH_SIZE = 300  # Balances read by one Multicall3 call
+AEVO_API = 'https://api.aevo.xyz'
+AEVO_WS = 'wss://ws.aevo.xyz'
+
+# --- HTTP SETTINGS --- #
+HTTP_POOL_SIZE = 100  # Max open connections shared by all wallets
+HTTP_LIMIT_PER_HOST = 50  # Max open connections to a single host
+HTTP_PREWARM_CONNECTIONS = 5  # Connections opened to AEVO before the first wallet starts
+MARKETS_TTL = 600  # Seconds between background refreshes of AEVO markets
+ACCOUNT_SNAPSHOT_TTL = 3  # Seconds /account and /portfolio of a wallet are reused between its own calls
+HTTP_MAX_RETRIES = 5  # Retries after 429 (any request) or 5xx (GET / DELETE only)
+# --------------------- #
+
+# --- RATE LIMIT SETTINGS --- #
+RATE_LIMITS = {  # Endpoint: (requests per second, burst), shared by all wallets
+    '/orders': (10, 20),
+    '/account': (10, 20),
+    '/portfolio': (10, 20),
+    '/register': (2, 5),
+    '/api-key': (5, 10),
+    'default': (20, 40),
+}
+# --------------------------- #
+
+# --- PRICE FEED SETTINGS --- #
+USE_PRICE_FEED = True  # Size orders from the WebSocket index price instead of a REST request
+PRICE_MAX_AGE = 10  # Seconds after which a price from the feed is considered stale
+PRICE_FEED_IDLE_TIMEOUT = 30  # Reconnect if the feed sends nothing for this many seconds
+# --------------------------- #
+
+# --- ORDER BOOK SETTINGS --- #
+USE_ORDER_BOOK = True  # Limit market orders to the price their size reaches in the WebSocket order book
+ORDER_SLIPPAGE = 0.01  # Share the limit price may go beyond that price (0.01 - 1%)
+ORDER_BOOK_TIMEOUT = 5  # Seconds an order waits for the first snapshot of its book before going without a limit
+# --------------------------- #
+
+# --- RUNNER SETTINGS --- #
+MAX_CONCURRENT_WALLETS = 10  # How many wallets are processed at the same time
+WALLET_TIMEOUT = 1800  # Seconds before a single wallet run is cancelled (None - no limit)
+STAGE_CONCURRENCY = {  # Stage: wallets it works on at the same time (missing - MAX_CONCURRENT_WALLETS)
+    'register': 10,
+    'deposit': 10,  # On-chain, mostly waits for the bridge
+    'stake': 10,
+    'withdraw_staking': 10,
+    'open': 10,
+    'close': 10,
+    'withdraw': 10,  # Waits for USDC to arrive on Arbitrum
+    'delete_keys': 10,
+}
+STAGE_STATUS_INTERVAL = 30  # Seconds between reports of queued and running wallets per stage (None - disabled)
+SNAPSHOT_CONCURRENCY = 100  # Wallets read at the same time by main.py --snapshot
+# ----------------------- #
+
+# --- SIGNING SETTINGS --- #
+SIGNING_PROCESSES = None  # Processes that sign orders of all wallets in batches (None - one per CPU core, 1 - use SIGNING_THREADS)
+SIGNING_THREADS = 4  # Threads that sign for running wallets outside of the event loop
+# ------------------------ #
+
+# --- METRICS SETTINGS --- #
+METRICS_PORT = None  # Serve Prometheus metrics on http://127.0.0.1:PORT/metrics (None - disabled)
+# -------------------------- #
+
+# --- API KEY SETTINGS --- #
+API_KEYS_FILE = 'api_keys.json'  # Encrypted cache of registered API keys
+API_KEY_LIFETIME = 604800  # Seconds a newly registered API key stays valid (7 days)
+API_KEY_REFRESH_MARGIN = 3600  # Register a new key when the stored one expires sooner than this
+API_KEY_DELETE_CONCURRENCY = 10  # Keys of one wallet deleted at the same time, RATE_LIMITS['/api-key'] caps the rate
+# ------------------------ #
+
+# --- JOURNAL SETTINGS --- #
+JOURNAL_FILE = 'journal.sqlite3'  # Progress of every wallet, an interrupted run resumes from it (None - disabled)
+# ------------------------ #
+
+# --- ARMED CLOSE SETTINGS --- #
+ARMED_REFRESH = 30  # Seconds after which positions are read and armed close orders signed again
+ARMED_CONCURRENCY = 100  # Wallets armed at the same time by main.py --armed
+# ---------------------------- #
 
 
 ################
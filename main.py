@@ -1,29 +1,74 @@
-from typing import List
-import asyncio
+# Imported first, so the startup report counts from here
+from src.startup import startup
 
+from importlib import import_module
+import argparse
 from asyncio import (
-    create_task,
+    to_thread,
     gather,
+    sleep,
     run,
 )
 
-from src.aevo.aevo import Aevo
+from typing import (
+    TYPE_CHECKING,
+    Awaitable,
+    Callable,
+    Iterable,
+    Optional,
+    List,
+)
+
+from src.bot.runner import (
+    WalletResult,
+    log_summary,
+    Pipeline,
+)
+from src.aevo.session import (
+    prewarm_session,
+    close_session,
+)
+from src.client.signing import shutdown_signing_executor
+from src.aevo.rate_limit import rate_limiter
+from src.aevo.orderbook import order_books
+from src.aevo.markets import instruments
+from src.aevo.feed import price_feed
+from src.data import (
+    iter_private_keys,
+    WALLETS_FILE,
+)
+from src.bot.journal import journal
+from src.metrics import metrics
 
-from src.data import private_keys
+from loguru import logger
 
 from config import (
+    MAX_CONCURRENT_WALLETS,
+    STAGE_STATUS_INTERVAL,
+    SNAPSHOT_CONCURRENCY,
+    ARMED_CONCURRENCY,
+    STAGE_CONCURRENCY,
     DEPOSIT_PERCENTAGE,
     CLOSE_POSITIONS,
+    WALLET_TIMEOUT,
     USE_PERCENTAGE,
     OPEN_POSITIONS,
+    USE_ORDER_BOOK,
+    USE_PRICE_FEED,
     DEPOSIT_AMOUNT,
+    METRICS_PORT,
     TOKEN,
 )
 
+if TYPE_CHECKING:
+    from src.bot.portfolio import FleetPortfolio
+    from src.aevo.aevo import Aevo
+
 
-async def process_tasks(private_key: str) -> List[asyncio.Task]:
-    tasks = []
-    trader = Aevo(
+def create_trader(private_key: str) -> 'Aevo':
+    from src.aevo.aevo import Aevo
+
+    return Aevo(
         private_key=private_key,
         open_positions=OPEN_POSITIONS,
         close_positions=CLOSE_POSITIONS,
@@ -32,19 +77,151 @@ async def process_tasks(private_key: str) -> List[asyncio.Task]:
         use_percentage=USE_PERCENTAGE,
         deposit_percentage=DEPOSIT_PERCENTAGE
     )
-    task = create_task(trader.run())
-    tasks.append(task)
-    await task
-    return tasks
 
 
-async def main() -> None:
-    tasks = []
-    for private_key in private_keys:
-        tasks.extend(await process_tasks(private_key))
+async def run_fleet(
+        keys: Iterable[str],
+        trader_factory: Callable[[str], 'Aevo'] = create_trader,
+        fresh: bool = False
+) -> List[WalletResult]:
+    journal.open(fresh)
+    if OPEN_POSITIONS and USE_PRICE_FEED:
+        price_feed.subscribe([TOKEN])
+        price_feed.start()
+    if USE_ORDER_BOOK and (OPEN_POSITIONS or CLOSE_POSITIONS):
+        order_books.subscribe([TOKEN])
+        order_books.start()
+
+    async def timed(name: str, awaitable) -> None:
+        await awaitable
+        startup.mark(name)
+
+    # web3 and eth_account take about a second to import, the connections are warmed up in the meantime
+    imported, *_ = await gather(
+        timed('imports', to_thread(import_module, 'src.aevo.aevo')),
+        timed('session', prewarm_session()),
+        timed('markets', instruments.load()),
+        timed('price', price_feed.wait_for_index_price(TOKEN, timeout=5) if price_feed.assets else sleep(0)),
+        timed('order book', order_books.wait_for_book(TOKEN, timeout=5) if order_books.assets else sleep(0)),
+        return_exceptions=True
+    )
+    if isinstance(imported, Exception):
+        raise imported
+    instruments.start()
+    from src.bot.trading_bot import STAGES
+
+    pipeline = Pipeline(STAGES, STAGE_CONCURRENCY, max_in_flight=MAX_CONCURRENT_WALLETS, timeout=WALLET_TIMEOUT)
+    try:
+        results = await pipeline.run(keys, trader_factory, report_interval=STAGE_STATUS_INTERVAL)
+        # A run with failed wallets stays open, the next start retries them from where they stopped
+        if all(result.success for result in results):
+            journal.finish_run()
+        return results
+    finally:
+        await journal.close()
+        await instruments.stop()
+        await price_feed.stop()
+        await order_books.stop()
+        await close_session()
+        shutdown_signing_executor()
+
+
+async def snapshot_fleet(
+        keys: Iterable[str],
+        path: str,
+        trader_factory: Callable[[str], 'Aevo'] = create_trader
+) -> 'FleetPortfolio':
+    from src.bot.portfolio import collect_portfolio
+
+    imported, _ = await gather(
+        to_thread(import_module, 'src.aevo.aevo'),
+        prewarm_session(),
+        return_exceptions=True
+    )
+    if isinstance(imported, Exception):
+        raise imported
+    try:
+        portfolio = await collect_portfolio(keys, trader_factory, SNAPSHOT_CONCURRENCY)
+    finally:
+        await close_session()
+        shutdown_signing_executor()
+    portfolio.log_report()
+    portfolio.export(path)
+    return portfolio
+
+
+async def run_armed(
+        keys: Iterable[str],
+        trader_factory: Callable[[str], 'Aevo'] = create_trader,
+        trigger: Optional[Callable[[], Awaitable[float]]] = None
+) -> List[float]:
+    """Keeps close orders of every wallet signed and fires them when triggered, returns trigger to ack times"""
+    from src.bot.armed import (
+        wait_for_trigger,
+        arm_fleet,
+        flatten,
+    )
+
+    imported, *_ = await gather(
+        to_thread(import_module, 'src.aevo.aevo'),
+        prewarm_session(),
+        instruments.load(),
+        return_exceptions=True
+    )
+    if isinstance(imported, Exception):
+        raise imported
+    instruments.start()
+    if USE_ORDER_BOOK:
+        order_books.start()
+    wallets = []
+    try:
+        wallets = await arm_fleet(keys, trader_factory, ARMED_CONCURRENCY)
+        logger.info('Press Enter or send SIGUSR1 to close every position')
+        triggered = await (trigger or wait_for_trigger)()
+        return await flatten(wallets, triggered)
+    finally:
+        await gather(*[wallet.stop() for wallet in wallets])
+        await instruments.stop()
+        await order_books.stop()
+        await close_session()
+        shutdown_signing_executor()
+
+
+async def main(args: argparse.Namespace) -> None:
+    if METRICS_PORT is not None:
+        metrics.start(METRICS_PORT)
+    if args.shard_count > 1:
+        logger.info(f'Running shard {args.shard_index} of {args.shard_count} from {args.wallets}')
+    keys = iter_private_keys(args.wallets, args.shard_index, args.shard_count)
+    if args.snapshot is not None:
+        await snapshot_fleet(keys, args.snapshot)
+        return
+    if args.armed:
+        await run_armed(keys)
+        return
+    results = await run_fleet(keys, fresh=args.fresh)
+    startup.log_report()
+    log_summary(results)
+    rate_limiter.log_stats()
+
 
-    await gather(*tasks)
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Aevo trading tool')
+    parser.add_argument('--wallets', default=WALLETS_FILE, help='File with one private key per line')
+    parser.add_argument('--shard-index', type=int, default=0, help='Shard of the wallet file run by this host')
+    parser.add_argument('--shard-count', type=int, default=1, help='Number of hosts sharing the wallet file')
+    parser.add_argument('--fresh', action='store_true', help='Start a new run instead of resuming an unfinished one')
+    parser.add_argument('--armed', action='store_true',
+                        help='Only keep close orders signed and close every position when triggered')
+    parser.add_argument('--snapshot', metavar='PATH',
+                        help='Only save balances and positions of every wallet to PATH (.csv or .parquet)')
+    args = parser.parse_args()
+    if not 0 <= args.shard_index < args.shard_count:
+        parser.error('--shard-index must be between 0 and --shard-count - 1')
+    if args.snapshot is not None and not args.snapshot.lower().endswith(('.csv', '.parquet')):
+        parser.error('--snapshot must end with .csv or .parquet')
+    return args
 
 
 if __name__ == '__main__':
-    run(main())
+    run(main(parse_args()))
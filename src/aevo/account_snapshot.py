@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+from typing import (
+    Optional,
+    Dict,
+    Any,
+)
+
+from src.aevo.credentials import ApiKeyRejected
+from config import ACCOUNT_SNAPSHOT_TTL
+from src.aevo.session import (
+    AevoRequestError,
+    aevo_request,
+)
+from src.aevo.models import (
+    Portfolio,
+    Account,
+)
+
+ACCOUNT = '/account'
+PORTFOLIO = '/portfolio'
+MODELS = {ACCOUNT: Account.from_json, PORTFOLIO: Portfolio.from_json}
+
+
+class AccountSnapshot:
+    """
+    Short-lived copy of /account and /portfolio of one wallet. Concurrent readers share a single
+    in-flight request, orders and transfers of the wallet drop the copy
+    """
+
+    def __init__(self, ttl: float = ACCOUNT_SNAPSHOT_TTL) -> None:
+        self.ttl = ttl
+        # endpoint -> (fetched at, status, model of the body)
+        self.entries: Dict[str, tuple[float, int, Any]] = {}
+        self._loading: Dict[str, asyncio.Task] = {}
+        self._version = 0
+
+    def _cached(self, endpoint: str) -> Optional[tuple[int, Any]]:
+        entry = self.entries.get(endpoint)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            return None
+        return entry[1], entry[2]
+
+    def invalidate(self) -> None:
+        """Called after anything that changes the account, later reads go to AEVO"""
+        self._version += 1
+        self.entries.clear()
+        # Requests sent before the change still answer their own waiters, but nobody new joins them
+        self._loading.clear()
+
+    async def get(self, endpoint: str, headers: Dict[str, str]) -> tuple[int, Any]:
+        cached = self._cached(endpoint)
+        if cached is not None:
+            return cached
+
+        task = self._loading.get(endpoint)
+        if task is None:
+            task = asyncio.create_task(self._fetch(endpoint, dict(headers)))
+            self._loading[endpoint] = task
+        return await asyncio.shield(task)
+
+    async def _fetch(self, endpoint: str, headers: Dict[str, str]) -> tuple[int, Any]:
+        version = self._version
+        try:
+            status, response_text = await aevo_request('GET', endpoint, headers=headers, model=MODELS[endpoint])
+        finally:
+            if self._loading.get(endpoint) is asyncio.current_task():
+                del self._loading[endpoint]
+        # Errors are not kept, neither is a response that may predate an invalidation
+        if status == 200 and version == self._version:
+            self.entries[endpoint] = (time.monotonic(), status, response_text)
+        return status, response_text
+
+    async def _model(self, endpoint: str, headers: Dict[str, str]) -> Any:
+        status, body = await self.get(endpoint, headers)
+        if status in (401, 403):
+            raise ApiKeyRejected(body)
+        if status != 200:
+            raise AevoRequestError(endpoint, status, body)
+        return body
+
+    async def account(self, headers: Dict[str, str]) -> Account:
+        return await self._model(ACCOUNT, headers)
+
+    async def portfolio(self, headers: Dict[str, str]) -> Portfolio:
+        return await self._model(PORTFOLIO, headers)
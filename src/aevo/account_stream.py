@@ -0,0 +1,57 @@
+import asyncio
+
+from typing import Optional
+
+from src.aevo.stream import WebSocketStream
+from config import AEVO_WS
+
+# Private channels that change the account balance
+ACCOUNT_CHANNELS = ['account', 'positions', 'fills']
+
+
+class AccountStream(WebSocketStream):
+    """
+    Authenticated connection of one API key. Every waiter of the wallet shares it and is woken up
+    as soon as AEVO pushes an account update
+    """
+
+    name = 'Account stream'
+
+    def __init__(self, api_key: str, api_secret: str, url: str = AEVO_WS) -> None:
+        super().__init__(url)
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.balance: Optional[float] = None
+        self.version = 0
+
+    async def _on_connect(self, websocket) -> None:
+        await self._send(websocket, 'auth', {"key": self.api_key, "secret": self.api_secret})
+        await self._send(websocket, 'subscribe', ACCOUNT_CHANNELS)
+        if self.reconnects:
+            # Updates sent while the stream was down are lost, waiters read the account again
+            self.version += 1
+            await self._notify()
+
+    async def _handle(self, message: dict) -> bool:
+        if message.get('channel') not in ACCOUNT_CHANNELS:
+            return False
+        data = message.get('data')
+        if isinstance(data, dict) and 'balance' in data:
+            self.balance = float(data['balance'])
+        self.version += 1
+        return True
+
+    async def wait_for_update(self, timeout: float, version: Optional[int] = None) -> bool:
+        """Waits until the account changes after `version` (default - now), returns False on timeout"""
+        if version is None:
+            version = self.version
+
+        async def wait() -> None:
+            async with self._updated:
+                await self._updated.wait_for(lambda: self.version != version)
+
+        try:
+            await asyncio.wait_for(wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
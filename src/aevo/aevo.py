@@ -1,13 +1,19 @@
-from aiohttp import ClientSession
-from asyncio import sleep
+from asyncio import (
+    Semaphore,
+    gather,
+    sleep,
+)
 import random
+import math
 import time
 
 from typing import (
     Awaitable,
+    Callable,
     Optional,
     Dict,
     List,
+    Any,
 )
 
 from eth_account.datastructures import SignedMessage
@@ -15,8 +21,31 @@ from web3.contract import Contract
 from loguru import logger
 
 from src.client.utils import approve_token
+from src.client.signing import (
+    get_batch_signer,
+    run_signing,
+)
+from src.client.balances import balance_reader
+from src.client.nonce import nonce_manager
+from src.client.fees import fee_oracle
+from src.aevo.session import aevo_request
+from src.aevo.markets import instruments
+from src.aevo.orderbook import order_books
+from src.aevo.feed import price_feed
+from src.startup import startup
+from src.metrics import metrics
 from src.bot.trading_bot import Trader
-from config import LEVERAGE
+from src.bot.armed import ArmedOrder
+from src.aevo.models import (
+    Position,
+    OrderAck,
+)
+from config import (
+    API_KEY_DELETE_CONCURRENCY,
+    ORDER_BOOK_TIMEOUT,
+    USE_ORDER_BOOK,
+    LEVERAGE,
+)
 
 from src.bot.utils.data_exctractor import (
     sign_staking_withdraw,
@@ -28,7 +57,7 @@ from src.bot.utils.data_exctractor import (
 from src.data import (
     USDC_CONTRACT,
     AEVO_CONTRACT,
-    AEVO_ABI,
+    load_abi,
 )
 
 
@@ -51,43 +80,36 @@ class Aevo(Trader):
     def contract(
             self,
             contract_address: str = AEVO_CONTRACT,
-            abi: str = AEVO_ABI,
     ) -> Contract:
-        return self.web3.eth.contract(address=contract_address, abi=abi)
+        return self.web3.eth.contract(address=contract_address, abi=load_abi('aevo_abi'))
 
     @staticmethod
     async def __get_instrument_id(token: str) -> tuple[int, int]:
-        async with ClientSession(headers={"accept": "application/json"}) as session:
-            response = await session.get(f'https://api.aevo.xyz/markets?asset={token}&instrument_type=PERPETUAL')
-            response_text = await response.json()
-        asset = response_text[0]
-        instrument_id = int(asset['instrument_id'])
-        price_step = int(float(asset['amount_step']) * 10 ** 6)
-        return instrument_id, price_step
+        instrument = await instruments.get(token)
+        return instrument.instrument_id, instrument.amount_step
 
-    @staticmethod
-    async def get_api_keys(headers: Dict[str, str]) -> List[str]:
-        async with ClientSession(headers=headers) as session:
-            response = await session.get('https://api.aevo.xyz/account')
-            response_text = await response.json()
-        api_keys = [api_key['api_key'] for api_key in response_text['api_keys']]
-        return api_keys
+    async def get_api_keys(
+            self,
+            headers: Dict[str, str]
+    ) -> List[str]:
+        account = await self.account_snapshot.account(headers)
+        return account.api_keys
 
     async def balance(
             self,
             headers: Dict[str, str]
     ) -> float:
-        async with ClientSession(headers=headers) as session:
-            response = await session.get('https://api.aevo.xyz/portfolio')
-            response_text = await response.json()
-
-        return float(response_text['balance'])
+        portfolio = await self.account_snapshot.portfolio(headers)
+        return portfolio.balance
 
-    async def deposit(self) -> None:
+    async def deposit(
+            self,
+            before_send: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> Optional[str]:
         eth_balance = await self.get_wallet_balance('ETH')
         if eth_balance == 0:
             logger.error(f'Your ETH balance is 0. [{self.wallet_address}]')
-            return
+            return None
 
         while True:
             usdc_balance = await self.get_wallet_balance('USDC')
@@ -106,28 +128,41 @@ class Aevo(Trader):
         await approve_token(amount, self.private_key, USDC_CONTRACT,
                             self.contract.address, self.wallet_address, self.web3)
 
-        tx = await self.contract.functions.depositToAppChain(
-            self.wallet_address,
-            amount,
-            1000000,
-            self.web3.to_checksum_address('0x69Adf49285c25d9f840c577A0e3cb134caF944D3')
-        ).build_transaction({
-            'from': self.wallet_address,
-            'value': self.web3.to_wei(random.uniform(0.0017, 0.0018), 'ether'),
-            'nonce': await self.web3.eth.get_transaction_count(self.wallet_address),
-            'gas': 0
-        })
-
-        tx.update({'maxFeePerGas': await self.web3.eth.gas_price})
-        tx.update({'maxPriorityFeePerGas': await self.web3.eth.gas_price})
-        gas_limit = await self.web3.eth.estimate_gas(tx)
-        fee = await self.__get_deposit_fee(gas_limit)
-        tx.update({'value': int(fee * 1.1)})
-        tx.update({'gas': gas_limit})
-        tx_hash = await self.sign_transaction(tx)
+        async with nonce_manager.reserve(self.web3, self.wallet_address) as nonce:
+            fees = await fee_oracle.fees(self.web3)
+            tx = await self.contract.functions.depositToAppChain(
+                self.wallet_address,
+                amount,
+                1000000,
+                self.web3.to_checksum_address('0x69Adf49285c25d9f840c577A0e3cb134caF944D3')
+            ).build_transaction({
+                'chainId': await fee_oracle.chain_id(self.web3),
+                'from': self.wallet_address,
+                'value': self.web3.to_wei(random.uniform(0.0017, 0.0018), 'ether'),
+                'nonce': nonce,
+                'gas': 0,
+                'maxFeePerGas': fees.max_fee_per_gas,
+                'maxPriorityFeePerGas': fees.priority_fee,
+            })
+
+            gas_limit = await self.web3.eth.estimate_gas(tx)
+            fee = await self.__get_deposit_fee(gas_limit)
+            tx.update({'value': int(fee * 1.1)})
+            tx.update({'gas': gas_limit})
+            tx_hash = await self.sign_transaction(tx, before_send)
         logger.success(
             f'Successfully deposited {amount / 10 ** 6} USDC tokens | TX: https://arbiscan.io/tx/{tx_hash}'
         )
+        return tx_hash
+
+    @staticmethod
+    async def __submit_order(headers: Dict[str, str], payload: Dict[str, Any]) -> tuple[int, Any]:
+        start = time.perf_counter()
+        status, response_text = await aevo_request('POST', '/orders', headers=headers, json=payload, model=OrderAck.from_json)
+        metrics.order_acknowledged(time.perf_counter() - start, status == 200)
+        if status == 200:
+            startup.mark('first order')
+        return status, response_text
 
     async def __get_deposit_fee(self, msg_gas_limit: int) -> Awaitable[int]:
         return await self.contract.functions.getMinFees(
@@ -135,23 +170,51 @@ class Aevo(Trader):
             msg_gas_limit
         ).call()
 
-    async def close_position(
+    async def __limit_price(
             self,
-            headers: Dict[str, str],
-            close_side: str,
-            orders_amount: float,
-            unrealized_pnl: float,
-            ticker: str
-    ) -> None:
-        is_buy = True if close_side == 'BUY' else False
-        limit_price = 115792089237316195423570985008687907853269984665640564039457584007913129639935 if close_side == 'BUY' else 0
-        instrument_id, price_step = await self.__get_instrument_id(ticker)
+            asset: str,
+            is_buy: bool,
+            amount: int
+    ) -> Optional[int]:
+        """Limit price from the local order book, None when the order has to go without one"""
+        if not USE_ORDER_BOOK:
+            return None
+        # A book subscribed only now, or rebuilt after a reconnect, is waited for instead of skipped
+        order_books.subscribe([asset])
+        order_books.start()
+        if order_books.book(asset) is None:
+            await order_books.wait_for_book(asset, ORDER_BOOK_TIMEOUT)
+        price = order_books.limit_price(asset, is_buy, amount / 10 ** 6)
+        if price is None:
+            logger.warning(f'{asset} order book is out of sync or too thin for {amount / 10 ** 6}, '
+                           f'sending the order without a price limit | [{self.wallet_address}]')
+            return None
+        price_step = (await instruments.get(asset)).price_step or 1
+        # Rounded away from the book, so the tick never makes the limit tighter than the impact price
+        steps = price * 10 ** 6 / price_step
+        return int((math.ceil(steps) if is_buy else math.floor(steps)) * price_step)
+
+    async def __signed_order(
+            self,
+            is_buy: bool,
+            amount: int,
+            instrument_id: int,
+            limit_price: Optional[int] = None
+    ) -> Dict[str, Any]:
+        protected = limit_price is not None
+        if not protected:
+            limit_price = 115792089237316195423570985008687907853269984665640564039457584007913129639935 if is_buy else 0
         salt = random.randint(0, 10 ** 10)
         timestamp = time.time()
-        amount = int(orders_amount * 10 ** 6)
-
-        signature = sign_order(self.wallet_address, self.private_key, is_buy, amount, limit_price, salt,
-                               timestamp, instrument_id)
+        batch_signer = get_batch_signer()
+        if batch_signer.enabled:
+            # Orders of all wallets signed in the same loop iteration go to the process pool together
+            signature = await batch_signer.submit(('order', self.private_key, (
+                self.wallet_address, is_buy, amount, limit_price, salt, timestamp, instrument_id
+            )))
+        else:
+            signature = await run_signing(sign_order, self.wallet_address, self.private_key, is_buy, amount,
+                                          limit_price, salt, timestamp, instrument_id)
         payload = {
             "instrument": instrument_id,
             "maker": self.wallet_address,
@@ -162,11 +225,41 @@ class Aevo(Trader):
             "signature": signature,
             "timestamp": int(timestamp)
         }
-        async with ClientSession(headers=headers) as session:
-            response = await session.post('https://api.aevo.xyz/orders', json=payload)
-            response_text = await response.json()
+        if protected:
+            # Whatever the book cannot fill within the limit is cancelled instead of resting
+            payload["time_in_force"] = "IOC"
+        return payload
+
+    async def __close_order(
+            self,
+            close_side: str,
+            orders_amount: float,
+            ticker: str,
+            protect: bool = True
+    ) -> Dict[str, Any]:
+        is_buy = True if close_side == 'BUY' else False
+        instrument_id, price_step = await self.__get_instrument_id(ticker)
+        # Rounded, as truncating a size like 0.29 * 10 ** 6 would leave a dust position open
+        amount = round(orders_amount * 10 ** 6)
+        limit_price = await self.__limit_price(ticker, is_buy, amount) if protect else None
+        payload = await self.__signed_order(is_buy, amount, instrument_id, limit_price)
+        # A close that lands after the position is already gone must not open the opposite one
+        payload["reduce_only"] = True
+        return payload
+
+    async def close_position(
+            self,
+            headers: Dict[str, str],
+            close_side: str,
+            orders_amount: float,
+            unrealized_pnl: float,
+            ticker: str
+    ) -> None:
+        payload = await self.__close_order(close_side, orders_amount, ticker)
+        status, response_text = await self.__submit_order(headers, payload)
+        self.account_snapshot.invalidate()
 
-        if response.status != 200:
+        if status != 200:
             logger.error(f'Something went wrong: {response_text}')
             return
         logger.success(f'Successfully closed {ticker} position. Total PNL: {unrealized_pnl}$')
@@ -178,57 +271,41 @@ class Aevo(Trader):
             headers: Dict[str, str],
             token: str = 'ETH',
             unrealized_pnl: float = None
-    ) -> None:
+    ) -> Optional[str]:
         is_buy = True if side == 'BUY' else False
-        limit_price = 115792089237316195423570985008687907853269984665640564039457584007913129639935 if side == 'BUY' else 0
-        async with ClientSession(headers={"accept": "application/json"}) as session:
-            response = await session.get(f'https://api.aevo.xyz/index?asset={token}')
-            response_text = await response.json()
+        price = price_feed.index_price(token)
+        if price is None:
+            status, response_text = await aevo_request('GET', f'/index?asset={token}')
+            price = float(response_text['price'])
         instrument_id, price_step = await self.__get_instrument_id(token)
-        price = float(response_text['price'])
         token_amount = balance / price
-        salt = random.randint(0, 10 ** 10)
-        timestamp = time.time()
         leverage = LEVERAGE
         amount = int(token_amount * leverage * 10 ** 6)
         amount = int(price_step * round(amount / price_step))
 
-        signature = sign_order(self.wallet_address, self.private_key, is_buy, amount, limit_price, salt,
-                               timestamp, instrument_id)
-        payload = {
-            "instrument": instrument_id,
-            "maker": self.wallet_address,
-            "is_buy": is_buy,
-            "amount": str(amount),
-            "limit_price": str(limit_price),
-            "salt": str(salt),
-            "signature": signature,
-            "timestamp": int(timestamp)
-        }
-        async with ClientSession(headers=headers) as session:
-            response = await session.post('https://api.aevo.xyz/orders', json=payload)
-            response_text = await response.json()
+        limit_price = await self.__limit_price(token, is_buy, amount)
+        payload = await self.__signed_order(is_buy, amount, instrument_id, limit_price)
+        status, response_text = await self.__submit_order(headers, payload)
+        self.account_snapshot.invalidate()
 
-        if response.status != 200:
+        if status != 200:
             logger.error(f'Something went wrong: {response_text}')
-            return
-
-        eth_amount = response_text['amount']
-        avg_price = response_text['avg_price']
+            return None
 
         logger.success(
-            f'Successfully opened {"LONG" if is_buy is True else "SHORT"} position for {eth_amount} {token} with {leverage} LEVERAGE. AVG Price: {avg_price} | [{self.wallet_address}]')
+            f'Successfully opened {"LONG" if is_buy is True else "SHORT"} position for {response_text.amount} {token} with {leverage} LEVERAGE. AVG Price: {response_text.avg_price} | [{self.wallet_address}]')
+        return response_text.order_id
 
     async def stake_usdc(
             self,
             headers: Dict[str, str],
             amount: float
-    ) -> None:
+    ) -> bool:
         stake_amount = int(amount * 10 ** 6)
         collateral = '0x643aaB1618c600229785A5E06E4b2d13946F7a1A'
         to = '0xceB3d89ed0fBF2acEBFf36E2FB23DACb79BaF9e7'
         salt = random.randint(0, 10 ** 10)
-        signature = sign_staking(self.web3, self.private_key, collateral, to, stake_amount, salt)
+        signature = await run_signing(sign_staking, self.web3, self.private_key, collateral, to, stake_amount, salt)
         payload = {
             'account': self.wallet_address,
             'collateral': collateral,
@@ -238,37 +315,32 @@ class Aevo(Trader):
             'signature': signature,
             'label': 'YV_DEPOSIT',
         }
-        async with ClientSession(headers=headers) as session:
-            response = await session.post('https://api.aevo.xyz/transfer', json=payload)
-            response_text = await response.json()
-        if response.status != 200:
+        status, response_text = await aevo_request('POST', '/transfer', headers=headers, json=payload)
+        self.account_snapshot.invalidate()
+        if status != 200:
             logger.error(f'Something went wrong: {response_text}')
-            return
+            return False
         logger.success(f'Successfully staked {stake_amount / 10 ** 6} USDC | [{self.wallet_address}]')
+        return True
 
     async def get_staking_balance(
             self,
             headers: Dict[str, str]
     ) -> float:
-        async with ClientSession(headers=headers) as session:
-            response = await session.get('https://api.aevo.xyz/account')
-            response_text = await response.json()
-        collaterals = response_text['collaterals']
-        for collateral in collaterals:
-            if collateral['collateral_asset'] == 'aeUSD':
-                staked_balance = float(collateral['balance'])
-                return staked_balance
+        account = await self.account_snapshot.account(headers)
+        return account.staked_balance
 
     async def withdraw_staking(
             self,
             headers: Dict[str, str],
             amount: float
-    ) -> None:
+    ) -> bool:
         collateral = '0xceB3d89ed0fBF2acEBFf36E2FB23DACb79BaF9e7'
         to = '0xceB3d89ed0fBF2acEBFf36E2FB23DACb79BaF9e7'
         salt = random.randint(0, 10 ** 10)
         withdraw_amount = int(amount * 10 ** 6)
-        signature = sign_staking_withdraw(self.web3, self.private_key, collateral, to, withdraw_amount, salt)
+        signature = await run_signing(sign_staking_withdraw, self.web3, self.private_key, collateral, to,
+                                      withdraw_amount, salt)
         payload = {
             'account': self.wallet_address,
             'collateral': collateral,
@@ -278,20 +350,18 @@ class Aevo(Trader):
             'signature': signature,
             'label': 'YV_WITHDRAW',
         }
-        async with ClientSession(headers=headers) as session:
-            response = await session.post('https://api.aevo.xyz/transfer', json=payload)
-            response_text = await response.json()
-        if response.status != 200:
+        status, response_text = await aevo_request('POST', '/transfer', headers=headers, json=payload)
+        self.account_snapshot.invalidate()
+        if status != 200:
             logger.error(f'Something went wrong: {response_text}')
-            return
+            return False
         logger.success(f'Successfully withdrawn {withdraw_amount / 10 ** 6} USDC | [{self.wallet_address}]')
+        return True
 
     async def withdraw_from_aevo(
             self,
-            amount: float,
-            evm_balance: int
-    ) -> None:
-        balance_before_withdraw = evm_balance
+            amount: float
+    ) -> bool:
         salt = random.randint(0, 10 ** 10)
         amount = int(amount * 10 ** 6)
         socket_fees = random.randint(4326304606198636, 4326309606198636)
@@ -299,8 +369,8 @@ class Aevo(Trader):
         collateral = '0x643aaB1618c600229785A5E06E4b2d13946F7a1A'
         to = '0xE3EF8bEE5c378D4D3DB6FEC96518e49AE2D2b957'
         socket_connector = '0x73019b64e31e699fFd27d54E91D686313C14191C'
-        signature = sign_withdraw(self.web3, collateral, to, amount, salt,
-                                  self.private_key, socket_fees, socket_msg_gas_limit, socket_connector)
+        signature = await run_signing(sign_withdraw, self.web3, collateral, to, amount, salt,
+                                      self.private_key, socket_fees, socket_msg_gas_limit, socket_connector)
         payload = {
             "account": self.wallet_address,
             "amount": str(amount),
@@ -313,66 +383,167 @@ class Aevo(Trader):
             "to": self.web3.to_checksum_address(to),
         }
 
-        async with ClientSession(headers={"accept": "application/json"}) as session:
-            response = await session.post('https://api.aevo.xyz/withdraw', json=payload)
-            response_text = await response.json()
+        status, response_text = await aevo_request('POST', '/withdraw', json=payload)
+        self.account_snapshot.invalidate()
+        # The wallet balance read before the withdrawal is what wait_for_withdraw compares against
+        balance_reader.invalidate(self.wallet_address)
 
-        if response.status != 200:
+        if status != 200:
             logger.error(f'Something went wrong: {response_text}')
-            return
+            return False
 
         logger.success(f'Successfully withdrawn {amount / 10 ** 6} USDC')
-        await self.wait_for_withdraw(balance_before_withdraw, 'USDC')
+        return True
+
+    async def __delete_api_key(
+            self,
+            headers: Dict[str, str],
+            api_key: str
+    ) -> bool:
+        payload = {
+            "api_key": api_key
+        }
+        status, response_text = await aevo_request('DELETE', '/api-key', headers=headers, json=payload)
+        if status != 200:
+            logger.error(f'Failed to delete API KEY {api_key} | {response_text} | [{self.wallet_address}]')
+            return False
+        logger.debug(f'Deleted API KEY: {api_key} | [{self.wallet_address}]')
+        return True
 
     async def delete_api_keys(
             self,
             headers: Dict[str, str]
-    ) -> None:
+    ) -> bool:
+        start = time.perf_counter()
+        active_key = headers['AEVO-KEY']
         api_keys = await self.get_api_keys(headers)
-        api_keys.remove(headers['AEVO-KEY'])
-        api_keys.append(headers['AEVO-KEY'])
-        for api_key in api_keys:
-            payload = {
-                "api_key": api_key
-            }
-            async with ClientSession(headers=headers) as session:
-                response = await session.delete('https://api.aevo.xyz/api-key', json=payload)
-                response_text = await response.json()
-            if response.status == 200:
-                logger.success(f'Successfully deleted API KEY: {api_key}')
+        other_keys = [api_key for api_key in api_keys if api_key != active_key]
+        # The shared '/api-key' rate limit decides how fast keys go, the semaphore only bounds open requests
+        semaphore = Semaphore(API_KEY_DELETE_CONCURRENCY)
+
+        async def delete(api_key: str) -> bool:
+            async with semaphore:
+                return await self.__delete_api_key(headers, api_key)
+
+        results = await gather(*[delete(api_key) for api_key in other_keys], return_exceptions=True)
+        for api_key, result in zip(other_keys, results):
+            if isinstance(result, Exception):
+                logger.error(f'Failed to delete API KEY {api_key} | {result!r} | [{self.wallet_address}]')
+        deleted = sum(result is True for result in results)
+        failed = len(other_keys) - deleted
+
+        # The active key signs every request above, so it goes last and only when nothing is left to retry
+        if failed:
+            logger.warning(f'Keeping the active API KEY, {failed} keys were not deleted | [{self.wallet_address}]')
+        elif active_key in api_keys:
+            if await self.__delete_api_key(headers, active_key):
+                deleted += 1
             else:
-                logger.error(f'Something went wrong | {response_text}')
-            await sleep(1)
-        logger.success(f'Successfully deleted {len(api_keys)} API KEYS')
+                failed += 1
+        self.account_snapshot.invalidate()
+
+        elapsed = time.perf_counter() - start
+        if failed:
+            logger.error(f'Deleted {deleted} of {len(api_keys)} API KEYS in {elapsed:.1f}s, {failed} failed | [{self.wallet_address}]')
+            return False
+        logger.success(f'Successfully deleted {deleted} API KEYS in {elapsed:.1f}s | [{self.wallet_address}]')
+        return True
+
+    async def get_all_positions(
+            self,
+            headers: Dict[str, str]
+    ) -> List[Position]:
+        account = await self.account_snapshot.account(headers)
+        return account.positions
 
     async def get_positions(
             self,
             headers: Dict[str, str]
     ) -> tuple[float, float, int, Optional[str], str]:
-        async with ClientSession(headers=headers) as session:
-            response = await session.get('https://api.aevo.xyz/account')
-            response_text = await response.json()
-        positions = response_text['positions']
+        positions = await self.get_all_positions(headers)
         if not positions:
             return 0, 0, 0, None, None
-        positions_count = len(positions)
-        amount = float(positions[0]['amount'])
-        unrealized_pnl = float(positions[0]['unrealized_pnl'])
-        ticker = positions[0]['asset']
-        side = positions[0]['side']
-        return amount, unrealized_pnl, positions_count, ticker, side
+        position = positions[0]
+        return position.amount, position.unrealized_pnl, len(positions), position.asset, position.side
+
+    async def close_all_positions(
+            self,
+            headers: Dict[str, str]
+    ) -> int:
+        positions = await self.get_all_positions(headers)
+        logger.debug(f'Found {len(positions)} positions. | [{self.wallet_address}]')
+        if positions:
+            if USE_ORDER_BOOK:
+                order_books.subscribe(position.asset for position in positions)
+            results = await gather(*[
+                self.close_position(
+                    headers,
+                    position.close_side,
+                    position.amount,
+                    position.unrealized_pnl,
+                    position.asset
+                ) for position in positions
+            ], return_exceptions=True)
+            for position, result in zip(positions, results):
+                if isinstance(result, Exception):
+                    logger.error(f'Failed to close {position.asset} position | {result!r} | [{self.wallet_address}]')
+            positions = await self.get_all_positions(headers)
+
+        if positions:
+            logger.error(f'{len(positions)} positions are still open | [{self.wallet_address}]')
+        else:
+            logger.success(f'Closed all positions | [{self.wallet_address}]')
+        return len(positions)
+
+    async def arm_close_orders(
+            self,
+            positions: List[Position]
+    ) -> List[ArmedOrder]:
+        """Signs orders that close the positions at full size, fire_close_orders sends them later"""
+        payloads = await gather(*[
+            # Armed orders go without a price limit, a book read when they were signed is stale by the trigger
+            self.__close_order(position.close_side, position.amount, position.asset, protect=False)
+            for position in positions
+        ])
+        signed_at = time.monotonic()
+        return [
+            ArmedOrder(position.asset, position.amount, position.unrealized_pnl, payload, signed_at)
+            for position, payload in zip(positions, payloads)
+        ]
+
+    async def fire_close_orders(
+            self,
+            headers: Dict[str, str],
+            orders: List[ArmedOrder],
+            triggered: float
+    ) -> List[Optional[float]]:
+        """Sends armed orders at once, returns seconds from the trigger to each ack (None - rejected)"""
+        async def fire(order: ArmedOrder) -> Optional[float]:
+            status, response_text = await self.__submit_order(headers, order.payload)
+            acked = time.perf_counter() - triggered
+            if status != 200:
+                logger.error(f'Armed close of {order.asset} was rejected: {response_text} | [{self.wallet_address}]')
+                return None
+            logger.success(f'Closed {order.asset} position in {acked * 1000:.0f} ms from the trigger. '
+                           f'Total PNL: {order.unrealized_pnl}$ | [{self.wallet_address}]')
+            return acked
+
+        try:
+            return await gather(*[fire(order) for order in orders])
+        finally:
+            self.account_snapshot.invalidate()
 
     async def register(
             self,
             signing_key: str,
             account_signature: SignedMessage,
-            signing_key_signature: str
+            signing_key_signature: str,
+            expiry: int
     ) -> tuple[str, str]:
-        url = "https://api.aevo.xyz/register"
         payload = {
             "account": self.wallet_address,
             "account_signature": account_signature,
-            "expiry": int(time.time() + 10000),
+            "expiry": expiry,
             "signing_key": signing_key,
             "signing_key_signature": signing_key_signature
         }
@@ -380,9 +551,7 @@ class Aevo(Trader):
             "accept": "application/json",
             "content-type": "application/json"
         }
-        async with ClientSession(headers=headers) as session:
-            response = await session.post(url=url, json=payload)
-            response_text = await response.json()
+        status, response_text = await aevo_request('POST', '/register', headers=headers, json=payload)
         api_key = response_text['api_key']
         api_secret = response_text['api_secret']
         return api_key, api_secret
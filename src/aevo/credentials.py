@@ -0,0 +1,142 @@
+from dataclasses import (
+    dataclass,
+    asdict,
+)
+import threading
+import asyncio
+import json
+import time
+import os
+
+from typing import (
+    Optional,
+    Dict,
+)
+
+from Crypto.Cipher import AES
+from eth_utils import keccak
+from loguru import logger
+
+from config import (
+    API_KEY_REFRESH_MARGIN,
+    API_KEYS_FILE,
+)
+
+
+class ApiKeyRejected(Exception):
+    """Raised when AEVO does not accept the API key"""
+
+
+@dataclass
+class ApiCredentials:
+    api_key: str
+    api_secret: str
+    expiry: int
+
+    def is_valid(self, margin: float = API_KEY_REFRESH_MARGIN) -> bool:
+        return self.expiry - margin > time.time()
+
+
+def _encryption_key(private_key: str) -> bytes:
+    # Every record is encrypted with a key derived from its own wallet,
+    # so the file is useless without wallets.txt
+    return keccak(b'aevo-api-key-store' + bytes.fromhex(private_key.removeprefix('0x')))
+
+
+class ApiKeyStore:
+    """
+    On-disk cache of AEVO API keys, encrypted at rest and keyed by wallet address. Changes made while
+    the file is being written are saved together by the next write, off the event loop
+    """
+
+    def __init__(self, path: str = API_KEYS_FILE) -> None:
+        self.path = path
+        self._records: Optional[Dict[str, Dict[str, str]]] = None
+        self._lock = threading.Lock()
+        self._saved: Optional[asyncio.Future] = None
+        self._save_task: Optional[asyncio.Task] = None
+
+    @property
+    def records(self) -> Dict[str, Dict[str, str]]:
+        if self._records is None:
+            try:
+                with open(self.path) as file:
+                    self._records = json.load(file)
+            except FileNotFoundError:
+                self._records = {}
+            except (OSError, ValueError) as ex:
+                logger.warning(f'Failed to read {self.path}, starting with an empty key store | {ex!r}')
+                self._records = {}
+        return self._records
+
+    def get(self, wallet_address: str, private_key: str) -> Optional[ApiCredentials]:
+        record = self.records.get(wallet_address.lower())
+        if record is None:
+            return None
+        try:
+            cipher = AES.new(_encryption_key(private_key), AES.MODE_GCM, nonce=bytes.fromhex(record['nonce']))
+            data = cipher.decrypt_and_verify(bytes.fromhex(record['ciphertext']), bytes.fromhex(record['tag']))
+            credentials = ApiCredentials(**json.loads(data))
+        except (KeyError, ValueError, TypeError):
+            logger.warning(f'Stored API key cannot be decrypted | [{wallet_address}]')
+            return None
+        if not credentials.is_valid():
+            return None
+        return credentials
+
+    @staticmethod
+    def _encrypt(private_key: str, credentials: ApiCredentials) -> Dict[str, str]:
+        cipher = AES.new(_encryption_key(private_key), AES.MODE_GCM)
+        ciphertext, tag = cipher.encrypt_and_digest(json.dumps(asdict(credentials)).encode())
+        return {
+            'nonce': cipher.nonce.hex(),
+            'ciphertext': ciphertext.hex(),
+            'tag': tag.hex(),
+        }
+
+    async def put(self, wallet_address: str, private_key: str, credentials: ApiCredentials) -> None:
+        """Returns once the key is on disk"""
+        record = self._encrypt(private_key, credentials)
+        with self._lock:
+            self.records[wallet_address.lower()] = record
+        await self._save_soon()
+
+    async def delete(self, wallet_address: str) -> None:
+        with self._lock:
+            deleted = self.records.pop(wallet_address.lower(), None) is not None
+        if deleted:
+            await self._save_soon()
+
+    async def _save_soon(self) -> None:
+        if self._saved is None:
+            self._saved = asyncio.get_running_loop().create_future()
+        saved = self._saved
+        if self._save_task is None:
+            self._save_task = asyncio.create_task(self._save_pending())
+        await asyncio.shield(saved)
+
+    async def _save_pending(self) -> None:
+        try:
+            while self._saved is not None:
+                saved, self._saved = self._saved, None
+                with self._lock:
+                    records = dict(self.records)
+                try:
+                    await asyncio.to_thread(self._save, records)
+                except Exception as ex:
+                    logger.error(f'Failed to write {self.path} | {ex!r}')
+                    saved.set_exception(ex)
+                else:
+                    saved.set_result(None)
+        finally:
+            self._save_task = None
+
+    def _save(self, records: Dict[str, Dict[str, str]]) -> None:
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump(records, file)
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, self.path)
+
+
+api_key_store = ApiKeyStore()
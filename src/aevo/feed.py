@@ -0,0 +1,98 @@
+from dataclasses import dataclass
+import asyncio
+import time
+
+from typing import (
+    Iterable,
+    Optional,
+    Dict,
+    Set,
+)
+
+from src.aevo.stream import WebSocketStream
+from config import (
+    PRICE_FEED_IDLE_TIMEOUT,
+    PRICE_MAX_AGE,
+    AEVO_WS,
+)
+
+
+@dataclass
+class PriceTick:
+    price: float
+    received_at: float
+
+
+class PriceFeed(WebSocketStream):
+    """Keeps the latest index and mark prices pushed by the AEVO WebSocket, shared by all wallets"""
+
+    name = 'Price feed'
+
+    def __init__(
+            self,
+            url: str = AEVO_WS,
+            max_age: float = PRICE_MAX_AGE,
+            idle_timeout: float = PRICE_FEED_IDLE_TIMEOUT
+    ) -> None:
+        super().__init__(url, idle_timeout)
+        self.max_age = max_age
+        self.assets: Set[str] = set()
+        self.prices: Dict[str, PriceTick] = {}
+
+    @staticmethod
+    def channels(assets: Iterable[str]) -> list[str]:
+        return [channel for asset in sorted(assets) for channel in (f'index:{asset}', f'ticker:{asset}-PERP')]
+
+    def subscribe(self, assets: Iterable[str]) -> None:
+        new_assets = {asset.upper() for asset in assets} - self.assets
+        if not new_assets:
+            return
+        self.assets |= new_assets
+        self._send_soon('subscribe', self.channels(new_assets))
+
+    async def _on_connect(self, websocket) -> None:
+        await self._send(websocket, 'subscribe', self.channels(self.assets))
+
+    def _get(self, key: str) -> Optional[float]:
+        tick = self.prices.get(key)
+        if tick is None or time.monotonic() - tick.received_at > self.max_age:
+            return None
+        return tick.price
+
+    def index_price(self, asset: str) -> Optional[float]:
+        """Returns the latest index price, or None when it is missing or stale"""
+        return self._get(f'index:{asset.upper()}')
+
+    def mark_price(self, asset: str) -> Optional[float]:
+        """Returns the latest mark price, or None when it is missing or stale"""
+        return self._get(f'mark:{asset.upper()}')
+
+    async def wait_for_index_price(self, asset: str, timeout: float) -> Optional[float]:
+        async def wait() -> float:
+            async with self._updated:
+                await self._updated.wait_for(lambda: self.index_price(asset) is not None)
+                return self.index_price(asset)
+
+        try:
+            return await asyncio.wait_for(wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def _handle(self, message: dict) -> bool:
+        channel = message.get('channel', '')
+        data = message.get('data')
+        if not data:
+            return False
+        now = time.monotonic()
+        if channel.startswith('index:'):
+            self.prices[f'index:{channel[6:]}'] = PriceTick(float(data['price']), now)
+        elif channel.startswith('ticker:'):
+            for ticker in data.get('tickers', []):
+                asset = ticker['instrument_name'].split('-')[0]
+                self.prices[f'mark:{asset}'] = PriceTick(float(ticker['mark']['price']), now)
+        else:
+            return False
+        return True
+
+
+price_feed = PriceFeed()
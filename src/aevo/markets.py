@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+from typing import (
+    Optional,
+    Dict,
+)
+
+from loguru import logger
+
+from src.aevo.session import (
+    AevoRequestError,
+    aevo_request,
+)
+from src.aevo.models import Market
+from config import MARKETS_TTL
+
+
+class InstrumentRegistry:
+    """Process-wide cache of PERPETUAL markets, shared by all wallets"""
+
+    def __init__(self, ttl: float = MARKETS_TTL) -> None:
+        self.ttl = ttl
+        self.instruments: Dict[str, Market] = {}
+        self.loaded_at = 0.0
+        self._loading: Optional[asyncio.Task] = None
+        self._refresher: Optional[asyncio.Task] = None
+
+    @property
+    def is_stale(self) -> bool:
+        return time.monotonic() - self.loaded_at > self.ttl
+
+    async def _fetch(self) -> None:
+        status, markets = await aevo_request(
+            'GET', '/markets?instrument_type=PERPETUAL', model=lambda body: [Market.from_json(market) for market in body]
+        )
+        if status != 200:
+            # The cached markets stay in place, callers keep using them until a load succeeds
+            raise AevoRequestError('/markets', status, markets)
+        instruments = {market.asset.upper(): market for market in markets}
+        self.instruments = instruments
+        self.loaded_at = time.monotonic()
+        logger.debug(f'Loaded {len(instruments)} PERPETUAL markets')
+
+    def load(self) -> asyncio.Task:
+        # Concurrent callers share the same in-flight request
+        if self._loading is None or self._loading.done():
+            self._loading = asyncio.create_task(self._fetch())
+            self._loading.add_done_callback(self._log_failure)
+        return self._loading
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f'Failed to load markets | {task.exception()!r}')
+
+    async def get(self, asset: str) -> Market:
+        asset = asset.upper()
+        instrument = self.instruments.get(asset)
+        if instrument is not None:
+            if self.is_stale:
+                self.load()
+            return instrument
+
+        await self.load()
+        instrument = self.instruments.get(asset)
+        if instrument is None:
+            raise KeyError(f'Unknown PERPETUAL market: {asset}')
+        return instrument
+
+    async def _refresh_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.ttl)
+            await asyncio.gather(self.load(), return_exceptions=True)
+
+    def start(self) -> None:
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.create_task(self._refresh_forever())
+
+    async def stop(self) -> None:
+        if self._refresher is not None:
+            self._refresher.cancel()
+            await asyncio.gather(self._refresher, return_exceptions=True)
+            self._refresher = None
+
+
+instruments = InstrumentRegistry()
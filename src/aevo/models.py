@@ -0,0 +1,98 @@
+from dataclasses import dataclass
+
+from typing import (
+    Optional,
+    Dict,
+    List,
+    Any,
+)
+
+# AEVO sends numbers as strings, models keep only the fields the tool reads and drop the decoded dicts
+
+
+@dataclass(slots=True)
+class Position:
+    asset: str
+    side: str
+    amount: float
+    avg_entry_price: float
+    unrealized_pnl: float
+    maintenance_margin: float
+
+    @property
+    def close_side(self) -> str:
+        """Side of the order that closes the position"""
+        return 'BUY' if self.side.upper() == 'SELL' else 'SELL'
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> 'Position':
+        return cls(
+            data['asset'],
+            data['side'],
+            float(data['amount']),
+            float(data.get('avg_entry_price') or 0),
+            float(data.get('unrealized_pnl') or 0),
+            float(data.get('maintenance_margin') or 0),
+        )
+
+
+@dataclass(slots=True)
+class Account:
+    api_keys: List[str]
+    positions: List[Position]
+    staked_balance: Optional[float]
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> 'Account':
+        staked_balance = next(
+            (float(collateral['balance']) for collateral in data.get('collaterals') or ()
+             if collateral['collateral_asset'] == 'aeUSD'),
+            None
+        )
+        return cls(
+            [api_key['api_key'] for api_key in data.get('api_keys') or ()],
+            [Position.from_json(position) for position in data.get('positions') or ()],
+            staked_balance,
+        )
+
+
+@dataclass(slots=True)
+class Portfolio:
+    balance: float
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> 'Portfolio':
+        return cls(float(data['balance']))
+
+
+@dataclass(frozen=True, slots=True)
+class Market:
+    asset: str
+    instrument_id: int
+    amount_step: int
+    price_step: int
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> 'Market':
+        return cls(
+            asset=data.get('underlying_asset') or data['instrument_name'].split('-')[0],
+            instrument_id=int(data['instrument_id']),
+            amount_step=int(float(data['amount_step']) * 10 ** 6),
+            price_step=round(float(data.get('price_step') or 0) * 10 ** 6),
+        )
+
+
+@dataclass(slots=True)
+class OrderAck:
+    order_id: Optional[str]
+    amount: float
+    avg_price: Optional[float]
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> 'OrderAck':
+        avg_price = data.get('avg_price')
+        return cls(
+            data.get('order_id'),
+            float(data.get('amount') or 0),
+            float(avg_price) if avg_price is not None else None,
+        )
@@ -0,0 +1,277 @@
+from bisect import (
+    bisect_right,
+    bisect_left,
+)
+from array import array
+import asyncio
+
+from typing import (
+    Iterable,
+    Optional,
+    Dict,
+    Set,
+)
+
+from src.aevo.stream import WebSocketStream
+from config import (
+    ORDER_SLIPPAGE,
+    AEVO_WS,
+)
+
+
+class BookSide:
+    """
+    Price levels of one side in sorted arrays, best level first, with Fenwick trees of size, notional and
+    level count over them, so a size change and every depth query cost O(log n). Emptied levels keep their slot with
+    zero size, as prices on a tick grid come back, only a price not seen before shifts the slots and
+    rebuilds the trees on the next query
+    """
+
+    def __init__(self, descending: bool) -> None:
+        self.descending = descending
+        # Bid prices are stored negated, so both sides ascend away from the best level
+        self.keys = array('d')
+        self.sizes = array('d')
+        self.levels = 0
+        # 1-based trees, node i holds the sum of the last (i & -i) slots up to slot i - 1
+        self._size_tree = array('d', [0.0])
+        self._notional_tree = array('d', [0.0])
+        # Counts are exact, so the best level is found even where float sizes leave a residue in emptied slots
+        self._count_tree = array('q', [0])
+        self._stale = False
+
+    def __len__(self) -> int:
+        return self.levels
+
+    def _key(self, price: float) -> float:
+        return -price if self.descending else price
+
+    def _price(self, index: int) -> float:
+        return abs(self.keys[index])
+
+    def clear(self) -> None:
+        del self.keys[:]
+        del self.sizes[:]
+        self.levels = 0
+        self._stale = True
+
+    def set(self, price: float, size: float) -> None:
+        """Sets the size of a level, zero removes it"""
+        key = self._key(price)
+        size = max(size, 0.0)
+        index = bisect_left(self.keys, key)
+        if index < len(self.keys) and self.keys[index] == key:
+            previous = self.sizes[index]
+            if size == previous:
+                return
+            self.sizes[index] = size
+            self.levels += (size > 0) - (previous > 0)
+            if not self._stale:
+                self._add(index, size - previous, abs(key), (size > 0) - (previous > 0))
+            return
+        if not size:
+            return
+        self.keys.insert(index, key)
+        self.sizes.insert(index, size)
+        self.levels += 1
+        self._stale = True
+        # Prices the market left behind are dropped once empty slots outnumber the levels
+        if len(self.keys) > 2 * self.levels + 64:
+            self._compact()
+
+    def _compact(self) -> None:
+        levels = [(key, size) for key, size in zip(self.keys, self.sizes) if size > 0]
+        self.keys = array('d', (key for key, _ in levels))
+        self.sizes = array('d', (size for _, size in levels))
+
+    def _add(self, index: int, size: float, price: float, levels: int) -> None:
+        size_tree, notional_tree, count_tree = self._size_tree, self._notional_tree, self._count_tree
+        notional = size * price
+        node = index + 1
+        while node < len(size_tree):
+            size_tree[node] += size
+            notional_tree[node] += notional
+            if levels:
+                count_tree[node] += levels
+            node += node & -node
+
+    def _trees(self) -> tuple[array, array, array]:
+        if self._stale:
+            size_tree = array('d', [0.0])
+            size_tree.extend(self.sizes)
+            notional_tree = array('d', [0.0])
+            notional_tree.extend(abs(key) * size for key, size in zip(self.keys, self.sizes))
+            count_tree = array('q', [0])
+            count_tree.extend(size > 0 for size in self.sizes)
+            count = len(self.sizes)
+            for node in range(1, count + 1):
+                parent = node + (node & -node)
+                if parent <= count:
+                    size_tree[parent] += size_tree[node]
+                    notional_tree[parent] += notional_tree[node]
+                    count_tree[parent] += count_tree[node]
+            self._size_tree, self._notional_tree, self._count_tree = size_tree, notional_tree, count_tree
+            self._stale = False
+        return self._size_tree, self._notional_tree, self._count_tree
+
+    def _reach(self, size: float) -> tuple[int, float, float]:
+        """First slot where the running size reaches `size`, with the size and notional of the slots before it"""
+        size_tree, notional_tree, _ = self._trees()
+        count = len(size_tree) - 1
+        node, filled, notional = 0, 0.0, 0.0
+        step = 1 << count.bit_length() >> 1
+        while step:
+            following = node + step
+            if following <= count and filled + size_tree[following] < size:
+                node = following
+                filled += size_tree[following]
+                notional += notional_tree[following]
+            step >>= 1
+        return node, filled, notional
+
+    @property
+    def best(self) -> Optional[float]:
+        # Skips the subtrees without a level, the walk ends on the first slot that has one
+        count_tree = self._trees()[2]
+        count = len(count_tree) - 1
+        node = 0
+        step = 1 << count.bit_length() >> 1
+        while step:
+            following = node + step
+            if following <= count and not count_tree[following]:
+                node = following
+            step >>= 1
+        return self._price(node) if node < count else None
+
+    def fillable(self, limit_price: float) -> float:
+        """Size resting at the limit price or better"""
+        size_tree = self._trees()[0]
+        node = bisect_right(self.keys, self._key(limit_price))
+        total = 0.0
+        while node:
+            total += size_tree[node]
+            node &= node - 1
+        return total
+
+    def impact_price(self, size: float) -> Optional[float]:
+        """Price of the deepest level a market order of this size reaches, None when the side is too thin"""
+        if size <= 0:
+            return self.best
+        index = self._reach(size)[0]
+        return self._price(index) if index < len(self.keys) else None
+
+    def average_price(self, size: float) -> Optional[float]:
+        """Average fill price of a market order of this size, None when the side is too thin"""
+        if size <= 0:
+            return None
+        index, filled, notional = self._reach(size)
+        if index >= len(self.keys):
+            return None
+        return (notional + (size - filled) * self._price(index)) / size
+
+
+class OrderBook:
+    """L2 book of one instrument built from an AEVO snapshot and the updates that follow it"""
+
+    def __init__(self) -> None:
+        self.bids = BookSide(descending=True)
+        self.asks = BookSide(descending=False)
+        self.last_updated = 0
+        self.has_snapshot = False
+
+    def apply(self, data: dict) -> None:
+        last_updated = int(data.get('last_updated') or 0)
+        if data.get('type') == 'snapshot':
+            self.bids.clear()
+            self.asks.clear()
+            self.has_snapshot = True
+        elif last_updated and last_updated < self.last_updated:
+            return
+        for side, levels in ((self.bids, data.get('bids')), (self.asks, data.get('asks'))):
+            for price, size, *_ in levels or ():
+                side.set(float(price), float(size))
+        self.last_updated = max(self.last_updated, last_updated)
+
+    def side(self, is_buy: bool) -> BookSide:
+        """The side an order takes liquidity from"""
+        return self.asks if is_buy else self.bids
+
+
+class OrderBookFeed(WebSocketStream):
+    """Keeps L2 books of PERPETUAL markets from the AEVO orderbook channels, shared by all wallets"""
+
+    name = 'Order book feed'
+
+    def __init__(
+            self,
+            url: str = AEVO_WS,
+            slippage: float = ORDER_SLIPPAGE,
+            idle_timeout: Optional[float] = None
+    ) -> None:
+        # Quiet books send nothing for long stretches, so by default only pings decide that the connection is dead
+        super().__init__(url, idle_timeout)
+        self.slippage = slippage
+        self.assets: Set[str] = set()
+        self.books: Dict[str, OrderBook] = {}
+
+    @staticmethod
+    def channels(assets: Iterable[str]) -> list[str]:
+        return [f'orderbook:{asset}-PERP' for asset in sorted(assets)]
+
+    def subscribe(self, assets: Iterable[str]) -> None:
+        new_assets = {asset.upper() for asset in assets} - self.assets
+        if not new_assets:
+            return
+        self.assets |= new_assets
+        self._send_soon('subscribe', self.channels(new_assets))
+
+    async def _on_connect(self, websocket) -> None:
+        # Updates missed while disconnected make the old books wrong, they are rebuilt from new snapshots
+        self.books.clear()
+        await self._send(websocket, 'subscribe', self.channels(self.assets))
+
+    def book(self, asset: str) -> Optional[OrderBook]:
+        """Returns the book while it is in sync with the exchange, None otherwise"""
+        book = self.books.get(asset.upper())
+        if book is None or not book.has_snapshot or not self.connected.is_set():
+            return None
+        return book
+
+    def limit_price(self, asset: str, is_buy: bool, size: float) -> Optional[float]:
+        """
+        Price a market order of this size reaches in the book, moved by the allowed slippage.
+        None when the book is not in sync or too thin for the size
+        """
+        book = self.book(asset)
+        if book is None:
+            return None
+        price = book.side(is_buy).impact_price(size)
+        if price is None:
+            return None
+        return price * (1 + self.slippage) if is_buy else price * (1 - self.slippage)
+
+    async def wait_for_book(self, asset: str, timeout: float) -> Optional[OrderBook]:
+        async def wait() -> OrderBook:
+            async with self._updated:
+                await self._updated.wait_for(lambda: self.book(asset) is not None)
+                return self.book(asset)
+
+        try:
+            return await asyncio.wait_for(wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def _handle(self, message: dict) -> bool:
+        channel = message.get('channel', '')
+        data = message.get('data')
+        if not channel.startswith('orderbook:') or not data:
+            return False
+        asset = channel[len('orderbook:'):].split('-')[0]
+        book = self.books.get(asset)
+        if book is None:
+            book = self.books[asset] = OrderBook()
+        book.apply(data)
+        return True
+
+
+order_books = OrderBookFeed()
@@ -0,0 +1,98 @@
+from collections import defaultdict
+import random
+import asyncio
+import time
+
+from typing import (
+    Optional,
+    Dict,
+)
+
+from loguru import logger
+
+from config import RATE_LIMITS
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> float:
+        """Takes one token, returns how long the caller had to wait"""
+        waited = 0.0
+        while True:
+            now = time.monotonic()
+            self._refill(now)
+            if now >= self.paused_until and self.tokens >= 1:
+                self.tokens -= 1
+                return waited
+            delay = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            waited += delay
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class RateLimiter:
+    """Token bucket per AEVO endpoint, shared by every wallet of the process"""
+
+    def __init__(self, limits: Dict[str, tuple[float, float]] = RATE_LIMITS) -> None:
+        self.limits = limits
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.counters: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+
+    def bucket(self, endpoint: str) -> TokenBucket:
+        bucket = self.buckets.get(endpoint)
+        if bucket is None:
+            rate, capacity = self.limits.get(endpoint, self.limits['default'])
+            bucket = self.buckets[endpoint] = TokenBucket(rate, capacity)
+        return bucket
+
+    async def acquire(self, endpoint: str) -> None:
+        waited = await self.bucket(endpoint).acquire()
+        counters = self.counters[endpoint]
+        counters['requests'] += 1
+        if waited:
+            counters['throttled'] += 1
+            counters['wait_seconds'] += waited
+
+    def backoff(
+            self,
+            endpoint: str,
+            status: Optional[int],
+            attempt: int,
+            retry_after: Optional[str] = None
+    ) -> float:
+        """Counts a failed attempt and returns how long to wait before the next one"""
+        counters = self.counters[endpoint]
+        counters['retries'] += 1
+        counters[f'status_{status or "error"}'] += 1
+        delay = min(0.5 * 2 ** attempt, 30) * random.uniform(0.5, 1.5)
+        if retry_after is not None:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        if status == 429:
+            # Everyone calling this endpoint backs off, not only the wallet that got the 429
+            self.bucket(endpoint).pause(delay)
+        return delay
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {endpoint: dict(counters) for endpoint, counters in self.counters.items()}
+
+    def log_stats(self) -> None:
+        for endpoint, counters in sorted(self.stats().items()):
+            logger.info(f'{endpoint} | ' + ', '.join(f'{name}: {value:g}' for name, value in sorted(counters.items())))
+
+
+rate_limiter = RateLimiter()
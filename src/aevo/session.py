@@ -0,0 +1,135 @@
+import asyncio
+
+from typing import (
+    Callable,
+    Optional,
+    Dict,
+    Any,
+)
+
+from aiohttp import (
+    ClientConnectionError,
+    ClientTimeout,
+    ClientSession,
+    TCPConnector,
+)
+from loguru import logger
+import orjson
+
+from src.aevo.rate_limit import rate_limiter
+from src.metrics import metrics
+from config import (
+    HTTP_PREWARM_CONNECTIONS,
+    HTTP_LIMIT_PER_HOST,
+    HTTP_MAX_RETRIES,
+    HTTP_POOL_SIZE,
+    AEVO_API,
+)
+
+# Retrying these after a 5xx or a dropped connection cannot create a second order or transfer
+IDEMPOTENT_METHODS = {'GET', 'DELETE'}
+
+
+class AevoRequestError(Exception):
+    """Raised when AEVO answers with a status the caller cannot work with"""
+
+    def __init__(self, endpoint: str, status: int, body: Any) -> None:
+        super().__init__(f'{endpoint} returned {status}: {body}')
+        self.endpoint = endpoint
+        self.status = status
+        self.body = body
+
+_session: Optional[ClientSession] = None
+_session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_session() -> ClientSession:
+    """Returns the process-wide pooled session, creating it on first use"""
+    global _session, _session_loop
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or _session_loop is not loop:
+        connector = TCPConnector(
+            limit=HTTP_POOL_SIZE,
+            limit_per_host=HTTP_LIMIT_PER_HOST,
+            ttl_dns_cache=300,
+            use_dns_cache=True,
+            keepalive_timeout=60,
+        )
+        _session = ClientSession(
+            connector=connector,
+            timeout=ClientTimeout(total=30),
+            headers={"accept": "application/json"},
+        )
+        _session_loop = loop
+    return _session
+
+
+async def aevo_request(
+        method: str,
+        path: str,
+        headers: Optional[Dict[str, str]] = None,
+        json: Any = None,
+        model: Optional[Callable[[Any], Any]] = None
+) -> tuple[int, Any]:
+    """
+    Sends a rate limited request to the AEVO API and returns the status and the decoded body.
+    A 200 body is passed through `model` when one is given, error bodies are returned as decoded.
+    429 is retried for every method, 5xx and connection errors only for idempotent ones
+    """
+    endpoint = path.split('?')[0]
+    retryable_errors = method in IDEMPOTENT_METHODS
+    data = None
+    if json is not None:
+        data = orjson.dumps(json)
+        headers = {**(headers or {}), 'content-type': 'application/json'}
+    for attempt in range(HTTP_MAX_RETRIES + 1):
+        await rate_limiter.acquire(endpoint)
+        try:
+            with metrics.request('aevo', method, endpoint):
+                async with get_session().request(method, f'{AEVO_API}{path}', headers=headers, data=data) as response:
+                    status = response.status
+                    retry_after = response.headers.get('Retry-After')
+                    body = await response.read()
+        except (ClientConnectionError, asyncio.TimeoutError):
+            if not retryable_errors or attempt == HTTP_MAX_RETRIES:
+                raise
+            await asyncio.sleep(rate_limiter.backoff(endpoint, None, attempt))
+            continue
+
+        try:
+            response_text = orjson.loads(body) if body.strip() else None
+        except orjson.JSONDecodeError:
+            response_text = body.decode(errors='replace')
+        if status == 200 and model is not None:
+            response_text = model(response_text)
+
+        if status >= 400:
+            metrics.request_failed('aevo', endpoint, status)
+        retryable = status == 429 or (status >= 500 and retryable_errors)
+        if not retryable or attempt == HTTP_MAX_RETRIES:
+            return status, response_text
+        delay = rate_limiter.backoff(endpoint, status, attempt, retry_after)
+        logger.debug(f'{method} {endpoint} returned {status}, retrying in {delay:.1f}s')
+        await asyncio.sleep(delay)
+
+
+async def prewarm_session(connections: int = HTTP_PREWARM_CONNECTIONS) -> None:
+    """Opens keep-alive connections to the Aevo API before the first order is sent"""
+    session = get_session()
+
+    async def touch() -> None:
+        async with session.get(f'{AEVO_API}/time') as response:
+            await response.read()
+
+    results = await asyncio.gather(*[touch() for _ in range(connections)], return_exceptions=True)
+    failed = [result for result in results if isinstance(result, Exception)]
+    if failed:
+        logger.warning(f'Failed to pre-warm {len(failed)}/{connections} connections | {failed[0]!r}')
+
+
+async def close_session() -> None:
+    global _session, _session_loop
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+    _session_loop = None
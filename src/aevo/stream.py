@@ -0,0 +1,98 @@
+import random
+import asyncio
+
+from typing import (
+    Optional,
+    Any,
+    Set,
+)
+
+from websockets import connect
+from loguru import logger
+import orjson
+
+
+class WebSocketStream:
+    """Base for AEVO WebSocket subscribers: keeps one connection alive and reconnects with jittered backoff"""
+
+    name = 'WebSocket stream'
+
+    def __init__(self, url: str, idle_timeout: Optional[float] = None) -> None:
+        self.url = url
+        self.idle_timeout = idle_timeout
+        self.connected = asyncio.Event()
+        self.reconnects = 0
+        self._updated = asyncio.Condition()
+        self._websocket = None
+        self._task: Optional[asyncio.Task] = None
+        self._sends: Set[asyncio.Task] = set()
+
+    @staticmethod
+    async def _send(websocket, op: str, data: Any) -> None:
+        await websocket.send(orjson.dumps({"op": op, "data": data}).decode())
+
+    def _send_soon(self, op: str, data: Any) -> None:
+        """
+        Sends on the open connection without waiting for it. Without one, or when the send fails,
+        the next connection picks the change up in _on_connect
+        """
+        if self._websocket is None:
+            return
+        task = asyncio.create_task(self._send(self._websocket, op, data))
+        self._sends.add(task)
+        task.add_done_callback(self._sent)
+
+    def _sent(self, task: asyncio.Task) -> None:
+        self._sends.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f'{self.name} failed to send a message | {task.exception()!r}')
+
+    async def _on_connect(self, websocket) -> None:
+        """Authenticates and subscribes a fresh connection"""
+
+    async def _handle(self, message: dict) -> bool:
+        """Applies a message, returns True when waiters should be woken up"""
+        return False
+
+    async def _notify(self) -> None:
+        async with self._updated:
+            self._updated.notify_all()
+
+    async def _run(self) -> None:
+        delay = 1
+        while True:
+            try:
+                async with connect(self.url, ping_interval=20, ping_timeout=20) as websocket:
+                    self._websocket = websocket
+                    await self._on_connect(websocket)
+                    self.connected.set()
+                    delay = 1
+                    while True:
+                        # A silent connection is treated as dead, even if pings still pass
+                        message = await asyncio.wait_for(websocket.recv(), self.idle_timeout)
+                        if await self._handle(orjson.loads(message)):
+                            await self._notify()
+            except asyncio.CancelledError:
+                raise
+            except Exception as ex:
+                logger.warning(f'{self.name} disconnected, reconnecting in {delay}s | {ex!r}')
+            finally:
+                self._websocket = None
+                self.connected.clear()
+            self.reconnects += 1
+            await asyncio.sleep(delay + random.uniform(0, delay / 2))
+            delay = min(delay * 2, 30)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            # wait_for can swallow a cancellation that lands together with a message, so repeat it
+            while not self._task.done():
+                self._task.cancel()
+                await asyncio.wait({self._task}, timeout=1)
+            self._task = None
+        for task in list(self._sends):
+            task.cancel()
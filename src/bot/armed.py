@@ -0,0 +1,192 @@
+from dataclasses import dataclass
+import statistics
+import asyncio
+import signal
+import time
+import sys
+
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Iterable,
+    Optional,
+    Dict,
+    List,
+    Any,
+)
+
+from loguru import logger
+
+from src.aevo.account_stream import AccountStream
+from src.aevo.orderbook import order_books
+from src.aevo.models import Position
+from src.bot.runner import short_key
+from config import (
+    USE_ORDER_BOOK,
+    ARMED_REFRESH,
+)
+
+if TYPE_CHECKING:
+    from src.aevo.aevo import Aevo
+
+
+@dataclass
+class ArmedOrder:
+    asset: str
+    amount: float
+    unrealized_pnl: float
+    payload: Dict[str, Any]
+    signed_at: float
+
+
+class ArmedWallet:
+    """
+    Positions of one wallet and signed orders that close them. Positions are read and the orders signed again
+    when the account stream reports a change and every `refresh` seconds, which also picks up changes the
+    stream missed and gives the orders a fresh salt and timestamp
+    """
+
+    def __init__(self, trader: 'Aevo', refresh: float = ARMED_REFRESH) -> None:
+        self.trader = trader
+        self.refresh = refresh
+        self.positions: List[Position] = []
+        self.orders: List[ArmedOrder] = []
+        self.version = 0
+        self.stream = AccountStream(trader.api_key, trader.api_secret)
+        self._task: Optional[asyncio.Task] = None
+
+    async def arm(self) -> None:
+        # Changes that arrive while the positions are read trigger the next reload
+        self.version = self.stream.version
+        self.positions = await self.trader.get_all_positions(self.trader.headers)
+        if USE_ORDER_BOOK:
+            # Books of held assets are kept ready for the closes that follow the armed orders
+            order_books.subscribe(position.asset for position in self.positions)
+        self.orders = await self.trader.arm_close_orders(self.positions)
+
+    async def _keep_armed(self) -> None:
+        delay = self.refresh
+        while True:
+            await self.stream.wait_for_update(delay, self.version)
+            self.trader.account_snapshot.invalidate()
+            try:
+                await self.arm()
+            except Exception as ex:
+                logger.warning(f'Failed to re-arm close orders | {ex!r} | [{self.trader.wallet_address}]')
+                delay = min(self.refresh, 5)
+            else:
+                delay = self.refresh
+
+    async def start(self) -> None:
+        """Subscribes to account updates and signs the first orders"""
+        self.stream.start()
+        await self.arm()
+        self._task = asyncio.create_task(self._keep_armed())
+
+    async def fire(self, triggered: float) -> List[Optional[float]]:
+        # Re-arming from here on could only race with the orders being sent
+        if self._task is not None:
+            self._task.cancel()
+        return await self.trader.fire_close_orders(self.trader.headers, self.orders, triggered)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.stream.stop()
+
+
+async def arm_fleet(
+        keys: Iterable[str],
+        trader_factory: Callable[[str], 'Aevo'],
+        concurrency: int
+) -> List[ArmedWallet]:
+    """Authorizes every wallet and arms its close orders, wallets that fail are left out"""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    wallets: List[ArmedWallet] = []
+
+    async def arm(private_key: str) -> None:
+        async with semaphore:
+            wallet = None
+            try:
+                trader = trader_factory(private_key)
+                await trader.authorize()
+                wallet = ArmedWallet(trader)
+                await wallet.start()
+            except Exception as ex:
+                logger.error(f'Failed to arm {short_key(private_key)} | {ex!r}')
+                if wallet is not None:
+                    await wallet.stop()
+                return
+            wallets.append(wallet)
+
+    try:
+        await asyncio.gather(*[arm(private_key) for private_key in keys])
+    except BaseException:
+        await asyncio.gather(*[wallet.stop() for wallet in wallets])
+        raise
+    orders = sum(len(wallet.orders) for wallet in wallets)
+    logger.info(f'Armed {orders} close orders on {len(wallets)} wallets')
+    return wallets
+
+
+async def wait_for_trigger() -> float:
+    """Waits for Enter on stdin or SIGUSR1, returns time.perf_counter() of the moment it came"""
+    loop = asyncio.get_running_loop()
+    triggered = loop.create_future()
+
+    def trigger() -> None:
+        if not triggered.done():
+            triggered.set_result(time.perf_counter())
+
+    def read_stdin() -> None:
+        # Nothing is left to read at EOF, so only SIGUSR1 can trigger after it
+        if sys.stdin.readline():
+            trigger()
+        else:
+            loop.remove_reader(sys.stdin.fileno())
+
+    loop.add_signal_handler(signal.SIGUSR1, trigger)
+    reading = sys.stdin is not None
+    if reading:
+        try:
+            loop.add_reader(sys.stdin.fileno(), read_stdin)
+        except OSError:
+            # Regular files cannot be polled
+            reading = False
+    try:
+        return await triggered
+    finally:
+        loop.remove_signal_handler(signal.SIGUSR1)
+        if reading:
+            loop.remove_reader(sys.stdin.fileno())
+
+
+async def flatten(wallets: List[ArmedWallet], triggered: float) -> List[float]:
+    """Fires every armed order, then closes whatever the armed orders missed the usual way"""
+    results = await asyncio.gather(*[wallet.fire(triggered) for wallet in wallets], return_exceptions=True)
+    latencies, rejected = [], 0
+    for wallet, result in zip(wallets, results):
+        if isinstance(result, Exception):
+            logger.error(f'Failed to fire armed close orders | {result!r} | [{wallet.trader.wallet_address}]')
+            continue
+        latencies.extend(latency for latency in result if latency is not None)
+        rejected += sum(latency is None for latency in result)
+    if latencies:
+        latencies.sort()
+        logger.info(
+            f'Fired {len(latencies) + rejected} armed close orders, {rejected} rejected | trigger to ack: '
+            f'p50 {statistics.median(latencies) * 1000:.1f} ms | '
+            f'p95 {latencies[int(0.95 * (len(latencies) - 1))] * 1000:.1f} ms | max {latencies[-1] * 1000:.1f} ms'
+        )
+
+    # Positions opened or changed after the last re-arm are closed here
+    remaining = await asyncio.gather(
+        *[wallet.trader.close_all_positions(wallet.trader.headers) for wallet in wallets], return_exceptions=True
+    )
+    left = sum(result for result in remaining if not isinstance(result, Exception))
+    failed = sum(isinstance(result, Exception) for result in remaining)
+    if left or failed:
+        logger.error(f'{left} positions are still open, {failed} wallets could not be checked')
+    return latencies
@@ -0,0 +1,174 @@
+from dataclasses import (
+    dataclass,
+    field,
+)
+import sqlite3
+import asyncio
+import json
+import time
+
+from typing import (
+    Optional,
+    Dict,
+    List,
+    Any,
+)
+
+from loguru import logger
+
+from config import JOURNAL_FILE
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS stages (
+    run_id INTEGER NOT NULL,
+    wallet TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    status TEXT NOT NULL,
+    detail TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (run_id, wallet, stage)
+);
+'''
+
+# Stage statuses: the irreversible part (a transaction, a withdrawal) was sent, or the whole stage is over
+SENT = 'sent'
+DONE = 'done'
+
+
+@dataclass
+class StageRecord:
+    status: str
+    detail: Dict[str, Any] = field(default_factory=dict)
+
+
+class WalletProgress:
+    """Journal entries of one wallet in the current run"""
+
+    def __init__(self, journal: 'Journal', wallet: str, records: Dict[str, StageRecord]) -> None:
+        self.journal = journal
+        self.wallet = wallet
+        self.records = records
+
+    def get(self, stage: str) -> Optional[StageRecord]:
+        return self.records.get(stage)
+
+    def is_done(self, stage: str) -> bool:
+        record = self.records.get(stage)
+        return record is not None and record.status == DONE
+
+    async def record(self, stage: str, status: str, **detail: Any) -> None:
+        """Returns once the entry is on disk"""
+        self.records[stage] = StageRecord(status, detail)
+        await self.journal.record(self.wallet, stage, status, detail)
+
+
+class Journal:
+    """
+    Durable progress of every wallet in SQLite (WAL mode). Entries written while a commit is in flight
+    are committed together by the next one, so one transaction serves all wallets that finished a stage
+    """
+
+    def __init__(self, path: Optional[str] = JOURNAL_FILE) -> None:
+        self.path = path
+        self.run_id: Optional[int] = None
+        self._writer: Optional[sqlite3.Connection] = None
+        self._reader: Optional[sqlite3.Connection] = None
+        self._pending: List[tuple] = []
+        self._committed: Optional[asyncio.Future] = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.run_id is not None
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        # A crash of the process cannot lose a WAL commit with NORMAL, only a power loss can
+        connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    def open(self, fresh: bool = False) -> None:
+        """Resumes the last unfinished run, or starts a new one"""
+        if self.path is None or self.enabled:
+            return
+        self._writer = self._connect()
+        self._writer.executescript(SCHEMA)
+        self._reader = self._connect()
+        if fresh:
+            self._writer.execute('UPDATE runs SET finished_at = ? WHERE finished_at IS NULL', (time.time(),))
+        row = self._writer.execute('SELECT id FROM runs WHERE finished_at IS NULL ORDER BY id DESC LIMIT 1').fetchone()
+        if row is not None:
+            self.run_id = row[0]
+            wallets = self._reader.execute(
+                'SELECT COUNT(DISTINCT wallet) FROM stages WHERE run_id = ?', (self.run_id,)
+            ).fetchone()[0]
+            logger.info(f'Resuming run {self.run_id} from {self.path}, {wallets} wallets have progress')
+        else:
+            self.run_id = self._writer.execute('INSERT INTO runs (started_at) VALUES (?)', (time.time(),)).lastrowid
+
+    def progress(self, wallet: str) -> WalletProgress:
+        records = {}
+        if self.enabled:
+            rows = self._reader.execute(
+                'SELECT stage, status, detail FROM stages WHERE run_id = ? AND wallet = ?', (self.run_id, wallet)
+            )
+            records = {stage: StageRecord(status, json.loads(detail)) for stage, status, detail in rows}
+        return WalletProgress(self, wallet, records)
+
+    async def record(self, wallet: str, stage: str, status: str, detail: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        self._pending.append((self.run_id, wallet, stage, status, json.dumps(detail), time.time()))
+        if self._committed is None:
+            self._committed = asyncio.get_running_loop().create_future()
+        committed = self._committed
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush())
+        await asyncio.shield(committed)
+
+    def _write(self, rows: List[tuple]) -> None:
+        with self._writer:
+            self._writer.execute('BEGIN')
+            self._writer.executemany(
+                'INSERT OR REPLACE INTO stages (run_id, wallet, stage, status, detail, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                rows
+            )
+
+    async def _flush(self) -> None:
+        try:
+            while self._pending:
+                rows, self._pending = self._pending, []
+                committed, self._committed = self._committed, None
+                try:
+                    await asyncio.to_thread(self._write, rows)
+                except Exception as ex:
+                    logger.error(f'Failed to write {len(rows)} journal entries | {ex!r}')
+                    committed.set_exception(ex)
+                else:
+                    committed.set_result(None)
+        finally:
+            self._flush_task = None
+
+    def finish_run(self) -> None:
+        """Marks the run as complete, the next start begins a new one"""
+        if self.enabled:
+            self._writer.execute('UPDATE runs SET finished_at = ? WHERE id = ?', (time.time(), self.run_id))
+
+    async def close(self) -> None:
+        if self._flush_task is not None:
+            await self._flush_task
+        for connection in (self._writer, self._reader):
+            if connection is not None:
+                connection.close()
+        self._writer = self._reader = None
+        self.run_id = None
+
+
+journal = Journal()
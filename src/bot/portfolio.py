@@ -0,0 +1,226 @@
+from dataclasses import dataclass
+import asyncio
+import csv
+import os
+
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Iterable,
+    Optional,
+    Dict,
+    List,
+)
+
+from loguru import logger
+import numpy as np
+
+from src.aevo.credentials import (
+    ApiKeyRejected,
+    api_key_store,
+)
+from src.aevo.models import (
+    Portfolio,
+    Position,
+    Account,
+)
+from src.bot.runner import short_key
+
+if TYPE_CHECKING:
+    from src.bot.trading_bot import Trader
+
+
+@dataclass
+class WalletAccount:
+    wallet_address: str
+    balance: float
+    positions: List[Position]
+
+
+@dataclass
+class AssetExposure:
+    asset: str
+    positions: int
+    net_size: float
+    gross_size: float
+    net_notional: float
+    unrealized_pnl: float
+    margin: float
+
+
+async def _pull(trader: 'Trader') -> tuple[Account, Portfolio]:
+    return await asyncio.gather(
+        trader.account_snapshot.account(trader.headers),
+        trader.account_snapshot.portfolio(trader.headers),
+    )
+
+
+async def fetch_account(trader: 'Trader') -> Optional[WalletAccount]:
+    """
+    Pulls /account and /portfolio of one wallet at the same time with its stored API key,
+    None when the wallet has no usable key. Snapshots only read, they never register keys
+    """
+    if api_key_store.get(trader.wallet_address, trader.private_key) is None:
+        logger.warning(f'No stored API key, skipping | [{trader.wallet_address}]')
+        return None
+    await trader.authorize()
+    try:
+        account, portfolio = await _pull(trader)
+    except ApiKeyRejected:
+        logger.warning(f'Stored API key was rejected, skipping | [{trader.wallet_address}]')
+        return None
+    return WalletAccount(trader.wallet_address, portfolio.balance, account.positions)
+
+
+class FleetPortfolio:
+    """Balances and positions of many wallets as NumPy columns, positions have one row each"""
+
+    def __init__(self, accounts: List[WalletAccount], failed: List[str], skipped: List[str]) -> None:
+        self.failed = failed
+        self.skipped = skipped
+        self.wallets = np.array([account.wallet_address for account in accounts], dtype=object)
+        self.balances = np.fromiter((account.balance for account in accounts), dtype=np.float64, count=len(accounts))
+        self.position_counts = np.fromiter(
+            (len(account.positions) for account in accounts), dtype=np.int64, count=len(accounts)
+        )
+
+        positions = [position for account in accounts for position in account.positions]
+        count = len(positions)
+        # Row i of every position column belongs to wallets[wallet_index[i]]
+        self.wallet_index = np.repeat(np.arange(len(accounts)), self.position_counts)
+        self.asset = np.array([position.asset for position in positions], dtype=str)
+        self.side = np.fromiter(
+            (1 if position.side.lower() in ('buy', 'long') else -1 for position in positions),
+            dtype=np.int8, count=count
+        )
+        self.size = np.fromiter((position.amount for position in positions), dtype=np.float64, count=count)
+        self.entry = np.fromiter((position.avg_entry_price for position in positions), dtype=np.float64, count=count)
+        self.unrealized_pnl = np.fromiter(
+            (position.unrealized_pnl for position in positions), dtype=np.float64, count=count
+        )
+        self.margin = np.fromiter((position.maintenance_margin for position in positions), dtype=np.float64, count=count)
+
+    @property
+    def total_balance(self) -> float:
+        return float(self.balances.sum())
+
+    @property
+    def total_unrealized_pnl(self) -> float:
+        return float(self.unrealized_pnl.sum())
+
+    def by_asset(self) -> List[AssetExposure]:
+        if not len(self.asset):
+            return []
+        assets, inverse = np.unique(self.asset, return_inverse=True)
+        signed_size = self.side * self.size
+
+        def per_asset(weights: Optional[np.ndarray] = None) -> np.ndarray:
+            return np.bincount(inverse, weights=weights, minlength=len(assets))
+
+        columns = zip(
+            per_asset(),
+            per_asset(signed_size),
+            per_asset(self.size),
+            per_asset(signed_size * self.entry),
+            per_asset(self.unrealized_pnl),
+            per_asset(self.margin),
+        )
+        return [
+            AssetExposure(str(asset), int(positions), float(net), float(gross), float(notional), float(pnl), float(margin))
+            for asset, (positions, net, gross, notional, pnl, margin) in zip(assets, columns)
+        ]
+
+    def position_columns(self) -> Dict[str, np.ndarray]:
+        return {
+            'wallet': self.wallets[self.wallet_index],
+            'asset': self.asset,
+            'side': np.where(self.side > 0, 'buy', 'sell'),
+            'size': self.size,
+            'entry': self.entry,
+            'unrealized_pnl': self.unrealized_pnl,
+            'margin': self.margin,
+        }
+
+    def wallet_columns(self) -> Dict[str, np.ndarray]:
+        return {'wallet': self.wallets, 'balance': self.balances, 'positions': self.position_counts}
+
+    def log_report(self) -> None:
+        logger.info(
+            f'Snapshot of {len(self.wallets)} wallets | {len(self.asset)} positions | '
+            f'balance {self.total_balance:.2f} USDC | unrealized PNL {self.total_unrealized_pnl:.2f}$'
+        )
+        for exposure in self.by_asset():
+            logger.info(
+                f'{exposure.asset}: net {exposure.net_size:+.4f} (gross {exposure.gross_size:.4f}) | '
+                f'net notional {exposure.net_notional:+.2f}$ | PNL {exposure.unrealized_pnl:+.2f}$ | '
+                f'margin {exposure.margin:.2f}$ | {exposure.positions} positions'
+            )
+        if self.skipped:
+            logger.warning(
+                f'{len(self.skipped)} wallets have no usable stored API key and were skipped: '
+                f'{", ".join(self.skipped[:10])}'
+            )
+        if self.failed:
+            logger.error(f'{len(self.failed)} wallets could not be read: {", ".join(self.failed[:10])}')
+
+    def export(self, path: str) -> List[str]:
+        """
+        Writes positions to the path and wallet balances next to it as <name>_wallets<ext>,
+        the format is picked by the extension: .csv or .parquet
+        """
+        name, extension = os.path.splitext(path)
+        writer = {'.csv': _write_csv, '.parquet': _write_parquet}.get(extension.lower())
+        if writer is None:
+            raise ValueError(f'Unsupported snapshot format: {path}, use .csv or .parquet')
+        paths = [path, f'{name}_wallets{extension}']
+        writer(paths[0], self.position_columns())
+        writer(paths[1], self.wallet_columns())
+        logger.success(f'Snapshot saved to {" and ".join(paths)}')
+        return paths
+
+
+def _write_csv(path: str, columns: Dict[str, np.ndarray]) -> None:
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(columns)
+        writer.writerows(zip(*(column.tolist() for column in columns.values())))
+
+
+def _write_parquet(path: str, columns: Dict[str, np.ndarray]) -> None:
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError('pyarrow is not installed, it is needed for Parquet snapshots') from None
+    table = pyarrow.table({
+        name: column.astype(str) if column.dtype == object else column for name, column in columns.items()
+    })
+    pyarrow.parquet.write_table(table, path)
+
+
+async def collect_portfolio(
+        keys: Iterable[str],
+        trader_factory: Callable[[str], 'Trader'],
+        concurrency: int
+) -> FleetPortfolio:
+    """Reads every wallet with `concurrency` workers pulling keys from the shared iterator"""
+    keys = iter(keys)
+    accounts: List[WalletAccount] = []
+    failed: List[str] = []
+    skipped: List[str] = []
+
+    async def worker() -> None:
+        for private_key in keys:
+            try:
+                account = await fetch_account(trader_factory(private_key))
+            except Exception as ex:
+                logger.error(f'Failed to read {short_key(private_key)} | {ex!r}')
+                failed.append(short_key(private_key))
+                continue
+            if account is None:
+                skipped.append(short_key(private_key))
+            else:
+                accounts.append(account)
+
+    await asyncio.gather(*[worker() for _ in range(max(1, concurrency))])
+    return FleetPortfolio(accounts, failed, skipped)
@@ -0,0 +1,193 @@
+from dataclasses import dataclass
+import asyncio
+import time
+
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Iterable,
+    Optional,
+    Dict,
+    List,
+)
+
+from loguru import logger
+
+from src.metrics import metrics
+
+if TYPE_CHECKING:
+    from src.bot.trading_bot import (
+        Trader,
+        Stage,
+    )
+
+
+@dataclass
+class WalletResult:
+    wallet_address: str
+    success: bool
+    duration: float
+    error: Optional[str] = None
+
+
+def short_key(private_key: str) -> str:
+    return f'{private_key[:6]}...{private_key[-4:]}'
+
+
+@dataclass
+class WalletJob:
+    trader: 'Trader'
+    started: float
+    deadline: Optional[float]
+
+
+class Pipeline:
+    """
+    Moves wallets through the stages in order. Every stage has its own queue and worker pool, so one
+    wallet can wait for a deposit while others open positions. At most `max_in_flight` wallets are
+    between the first and the last stage, keys are pulled from the iterator only when one finishes
+    """
+
+    def __init__(
+            self,
+            stages: List['Stage'],
+            concurrency: Dict[str, int],
+            max_in_flight: int = 10,
+            timeout: Optional[float] = None
+    ) -> None:
+        self.stages = stages
+        self.concurrency = {stage.name: max(1, concurrency.get(stage.name, max_in_flight)) for stage in stages}
+        self.timeout = timeout
+        self.queues: Dict[str, asyncio.Queue] = {stage.name: asyncio.Queue() for stage in stages}
+        self.running: Dict[str, int] = {stage.name: 0 for stage in stages}
+        self.results: List[WalletResult] = []
+        self._slots = asyncio.Semaphore(max(1, max_in_flight))
+        self._active = 0
+        self._fed = False
+        self._done = asyncio.Event()
+
+    def _forward(self, job: WalletJob, index: int) -> None:
+        """Queues the wallet for the next stage it has enabled, or completes it"""
+        for next_index in range(index, len(self.stages)):
+            stage = self.stages[next_index]
+            if stage.enabled(job.trader):
+                # Queuing goes last, anything that raises before it leaves the job with the caller
+                queue = self.queues[stage.name]
+                metrics.stage_queued(stage.name, queue.qsize() + 1)
+                queue.put_nowait(job)
+                return
+        self._complete(WalletResult(job.trader.wallet_address, True, time.perf_counter() - job.started))
+
+    def _complete(self, result: WalletResult) -> None:
+        self.results.append(result)
+        self._active -= 1
+        self._slots.release()
+        if self._fed and self._active == 0:
+            self._done.set()
+
+    def _fail(self, job: WalletJob, error: Exception) -> None:
+        duration = time.perf_counter() - job.started
+        wallet_address = job.trader.wallet_address
+        if isinstance(error, asyncio.TimeoutError):
+            logger.error(f'Timed out after {duration:.1f}s | [{wallet_address}]')
+            self._complete(WalletResult(wallet_address, False, duration, 'timeout'))
+        else:
+            logger.error(f'Something went wrong | {error!r} | [{wallet_address}]')
+            self._complete(WalletResult(wallet_address, False, duration, repr(error)))
+
+    async def _worker(self, index: int) -> None:
+        stage = self.stages[index]
+        queue = self.queues[stage.name]
+        while True:
+            job = await queue.get()
+            metrics.stage_queued(stage.name, queue.qsize())
+            self.running[stage.name] += 1
+            # Every job is either queued for the next stage or completed, or its slot would never be released
+            handed_over = False
+            try:
+                remaining = None if job.deadline is None else job.deadline - time.perf_counter()
+                with metrics.stage(stage.name):
+                    proceed = await asyncio.wait_for(stage.run(job.trader), timeout=remaining)
+                if proceed:
+                    self._forward(job, index + 1)
+                else:
+                    self._complete(WalletResult(job.trader.wallet_address, True, time.perf_counter() - job.started))
+                handed_over = True
+            except Exception as ex:
+                handed_over = True
+                self._fail(job, ex)
+            finally:
+                self.running[stage.name] -= 1
+                if not handed_over:
+                    self._complete(WalletResult(
+                        job.trader.wallet_address, False, time.perf_counter() - job.started, 'cancelled'
+                    ))
+
+    async def _feed(self, private_keys: Iterable[str], trader_factory: Callable[[str], 'Trader']) -> None:
+        for private_key in private_keys:
+            await self._slots.acquire()
+            self._active += 1
+            started = time.perf_counter()
+            try:
+                trader = trader_factory(private_key)
+            except Exception as ex:
+                logger.error(f'Something went wrong | {ex!r} | [{short_key(private_key)}]')
+                self._complete(WalletResult(short_key(private_key), False, 0.0, repr(ex)))
+                continue
+            deadline = None if self.timeout is None else started + self.timeout
+            job = WalletJob(trader, started, deadline)
+            try:
+                self._forward(job, 0)
+            except Exception as ex:
+                self._fail(job, ex)
+        self._fed = True
+        if self._active == 0:
+            self._done.set()
+
+    def status(self) -> str:
+        return ' | '.join(
+            f'{name} {self.queues[name].qsize()} queued, {self.running[name]}/{self.concurrency[name]} running'
+            for name in self.running if self.queues[name].qsize() or self.running[name]
+        )
+
+    async def _report(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            logger.info(f'Stages: {self.status() or "idle"} | {len(self.results)} wallets done')
+
+    async def run(
+            self,
+            private_keys: Iterable[str],
+            trader_factory: Callable[[str], 'Trader'],
+            report_interval: Optional[float] = None
+    ) -> List[WalletResult]:
+        tasks = [
+            asyncio.create_task(self._worker(index))
+            for index, stage in enumerate(self.stages)
+            for _ in range(self.concurrency[stage.name])
+        ]
+        if report_interval:
+            tasks.append(asyncio.create_task(self._report(report_interval)))
+        feeder = asyncio.create_task(self._feed(private_keys, trader_factory))
+        try:
+            await feeder
+            await self._done.wait()
+        finally:
+            feeder.cancel()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(feeder, *tasks, return_exceptions=True)
+        return self.results
+
+
+def log_summary(results: List[WalletResult]) -> None:
+    succeeded = [result for result in results if result.success]
+    failed = [result for result in results if not result.success]
+    for result in results:
+        status = 'OK' if result.success else f'FAILED ({result.error})'
+        logger.info(f'{result.wallet_address} | {status} | {result.duration:.1f}s')
+    total_duration = sum(result.duration for result in results)
+    logger.success(
+        f'Processed {len(results)} wallets: {len(succeeded)} succeeded, {len(failed)} failed. '
+        f'Total wallet time: {total_duration:.1f}s'
+    )
@@ -1,7 +1,11 @@
-from asyncio import sleep
+from dataclasses import dataclass
 import random
+import asyncio
+import time
 
 from typing import (
+    Awaitable,
+    Callable,
     Optional,
     Dict,
     List,
@@ -16,12 +20,31 @@ from eth_account.datastructures import SignedMessage
 from loguru import logger
 
 from src.bot.utils.data_exctractor import get_signatures
+from src.client.signing import run_signing
 from src.client.user import User
+from src.metrics import metrics
+
+from src.bot.journal import (
+    journal,
+    SENT,
+    DONE,
+)
+
+from src.aevo.account_snapshot import AccountSnapshot
+from src.aevo.account_stream import AccountStream
+from src.aevo.credentials import (
+    ApiKeyRejected,
+    ApiCredentials,
+    api_key_store,
+)
 
 from config import (
     USE_PERCENTAGE_WITHDRAW_STAKE,
     WITHDRAW_STAKING_PERCENTAGE,
     WITHDRAW_STAKING_AMOUNT,
+    BALANCE_POLL_MIN_DELAY,
+    BALANCE_POLL_MAX_DELAY,
+    API_KEY_LIFETIME,
     USE_PERCENTAGE_STAKE,
     WITHDRAW_ALL_STAKING,
     WITHDRAW_PERCENTAGE,
@@ -29,6 +52,7 @@ from config import (
     STAKE_PERCENTAGE,
     delete_api_keys,
     STAKE_AMOUNT,
+    CLOSE_TIMEOUT,
     WITHDRAW_ALL,
     WITHDRAW,
     DEPOSIT,
@@ -63,91 +87,189 @@ class Trader(User, ABC):
         self.withdraw = WITHDRAW
         self.withdraw_percentage = WITHDRAW_PERCENTAGE
         self.withdraw_all = WITHDRAW_ALL
+        self.aevo_balance = None
+        self.account_snapshot = AccountSnapshot()
 
         super().__init__(private_key)
+        self.progress = journal.progress(self.wallet_address)
 
-    async def run(self) -> None:
-        signing_key, account_signature, signing_key_signature = get_signatures(
-            self.web3,
-            self.wallet_address,
-            self.account
-        )
-
-        api_key, api_secret = await self.register(signing_key, account_signature, signing_key_signature)
-        self.api_key = api_key
-        self.api_secret = api_secret
+    async def authorize(self, use_cache: bool = True) -> None:
+        credentials = api_key_store.get(self.wallet_address, self.private_key) if use_cache else None
+        if credentials is None:
+            expiry = int(time.time() + API_KEY_LIFETIME)
+            signing_key, account_signature, signing_key_signature = await run_signing(
+                get_signatures,
+                self.web3,
+                self.wallet_address,
+                self.account,
+                expiry
+            )
+            api_key, api_secret = await self.register(signing_key, account_signature, signing_key_signature, expiry)
+            credentials = ApiCredentials(api_key, api_secret, expiry)
+            await api_key_store.put(self.wallet_address, self.private_key, credentials)
+        else:
+            logger.debug(f'Using stored API key | [{self.wallet_address}]')
+
+        self.api_key = credentials.api_key
+        self.api_secret = credentials.api_secret
         self.headers.update({"AEVO-KEY": self.api_key, "AEVO-SECRET": self.api_secret})
-        aevo_balance = await self.balance(self.headers)
+        self.account_snapshot.invalidate()
+
+    async def wait_for_balance(
+            self,
+            account_stream: AccountStream,
+            balance_before: float
+    ) -> float:
+        # Account updates wake the waiter up at once, polling backs off in case the stream is silent
+        delay = BALANCE_POLL_MIN_DELAY
+        while True:
+            if account_stream.balance is not None and account_stream.balance > balance_before:
+                return account_stream.balance
+            balance = await self.balance(self.headers)
+            if balance > balance_before:
+                return balance
+            await account_stream.wait_for_update(delay * random.uniform(0.8, 1.2))
+            self.account_snapshot.invalidate()
+            delay = min(delay * 1.5, BALANCE_POLL_MAX_DELAY)
 
-        if DEPOSIT:
+    async def run(self) -> None:
+        """Runs the enabled stages one after another, the fleet runner pipelines them across wallets instead"""
+        for stage in STAGES:
+            if stage.enabled(self):
+                with metrics.stage(stage.name):
+                    if not await stage.run(self):
+                        return
+
+    # Stages return False when the wallet has nothing left to do. Stages finished before a crash
+    # are skipped, stages that sent a transaction before it only wait for the result
+
+    async def stage_register(self) -> bool:
+        await self.authorize()
+        try:
+            self.aevo_balance = await self.balance(self.headers)
+        except ApiKeyRejected:
+            logger.warning(f'Stored API key was rejected, registering a new one | [{self.wallet_address}]')
+            await api_key_store.delete(self.wallet_address)
+            await self.authorize(use_cache=False)
+            self.aevo_balance = await self.balance(self.headers)
+        return True
+
+    async def stage_deposit(self) -> bool:
+        progress = self.progress
+        sent = progress.get('deposit')
+        if sent is not None:
+            tx_hash = sent.detail['tx_hash']
+            if not await self.transaction_exists(tx_hash):
+                logger.warning(f'Deposit {tx_hash} never reached the chain, sending a new one | [{self.wallet_address}]')
+                sent = None
+            elif not await self.transaction_succeeded(tx_hash):
+                logger.warning(f'Deposit {tx_hash} reverted, sending a new one | [{self.wallet_address}]')
+                sent = None
+        if sent is None:
             balance_before_deposit = await self.balance(self.headers)
-            await self.deposit()
+        else:
+            balance_before_deposit = sent.detail['balance_before']
+            logger.info(f'Deposit {sent.detail["tx_hash"]} was sent before the restart | [{self.wallet_address}]')
+        account_stream = AccountStream(self.api_key, self.api_secret)
+        account_stream.start()
+        try:
+            if sent is None:
+                async def journal_deposit(tx_hash: str) -> None:
+                    await progress.record('deposit', SENT, tx_hash=tx_hash, balance_before=balance_before_deposit)
+
+                await self.deposit(before_send=journal_deposit)
+                sent = progress.get('deposit')
+                # USDC of a reverted deposit never arrives, the balance would be polled forever
+                if sent is not None and not await self.transaction_succeeded(sent.detail['tx_hash']):
+                    raise RuntimeError(f'Deposit {sent.detail["tx_hash"]} reverted')
             logger.debug(f'Waiting for USDC on AEVO...')
-            while True:
-                aevo_balance = await self.balance(self.headers)
-                if aevo_balance > balance_before_deposit:
-                    logger.info(f'Balance: {aevo_balance} USDC')
-                    break
-                await sleep(30)
-
-        if STAKE:
-            stake_amount = STAKE_AMOUNT
-            if USE_PERCENTAGE_STAKE:
-                staking_percentage = STAKE_PERCENTAGE
-                stake_amount = aevo_balance * staking_percentage
-            await self.stake_usdc(self.headers, stake_amount)
-
-        if WITHDRAW_STAKING:
-            staked_balance = await self.get_staking_balance(self.headers)
-            if staked_balance == 0:
-                logger.error(f'Your staked balance is 0 | [{self.wallet_address}]')
-                return
-
-            withdraw_amount = WITHDRAW_STAKING_AMOUNT
-            if WITHDRAW_ALL_STAKING:
-                withdraw_amount = staked_balance
-
-            if USE_PERCENTAGE_WITHDRAW_STAKE:
-                withdraw_percentage = WITHDRAW_STAKING_PERCENTAGE
-                withdraw_amount = staked_balance * withdraw_percentage
-            await self.withdraw_staking(self.headers, withdraw_amount)
-
-        if self.open_positions:
-            token = TOKEN
-            await self.open_position(aevo_balance, SIDE, self.headers, token=token)
-
-        if self.close_positions:
-            while True:
-                orders_amount, unrealized_pnl, positions_count, ticker, side = await self.get_positions(self.headers)
-                logger.debug(f'Found {positions_count} positions.')
-                if positions_count == 0:
-                    logger.success(f'Closed all positions | [{self.wallet_address}]')
-                    break
-                close_side = 'BUY' if side.upper() == 'SELL' else 'SELL'
-                await self.close_position(self.headers, close_side, orders_amount, unrealized_pnl, ticker)
-                logger.info(f'Sleeping 10 seconds...')
-                await sleep(10)
-        if self.withdraw:
+            self.aevo_balance = await self.wait_for_balance(account_stream, balance_before_deposit)
+            logger.info(f'Balance: {self.aevo_balance} USDC')
+        finally:
+            await account_stream.stop()
+        if sent is not None:
+            await progress.record('deposit', DONE, **sent.detail)
+        return True
+
+    async def stage_stake(self) -> bool:
+        stake_amount = STAKE_AMOUNT
+        if USE_PERCENTAGE_STAKE:
+            staking_percentage = STAKE_PERCENTAGE
+            stake_amount = self.aevo_balance * staking_percentage
+        if await self.stake_usdc(self.headers, stake_amount):
+            await self.progress.record('stake', DONE, amount=stake_amount)
+        return True
+
+    async def stage_withdraw_staking(self) -> bool:
+        staked_balance = await self.get_staking_balance(self.headers)
+        if staked_balance == 0:
+            logger.error(f'Your staked balance is 0 | [{self.wallet_address}]')
+            return False
+
+        withdraw_amount = WITHDRAW_STAKING_AMOUNT
+        if WITHDRAW_ALL_STAKING:
+            withdraw_amount = staked_balance
+
+        if USE_PERCENTAGE_WITHDRAW_STAKE:
+            withdraw_percentage = WITHDRAW_STAKING_PERCENTAGE
+            withdraw_amount = staked_balance * withdraw_percentage
+        if await self.withdraw_staking(self.headers, withdraw_amount):
+            await self.progress.record('withdraw_staking', DONE, amount=withdraw_amount)
+        return True
+
+    async def stage_open(self) -> bool:
+        token = TOKEN
+        order_id = await self.open_position(self.aevo_balance, SIDE, self.headers, token=token)
+        if order_id is not None:
+            await self.progress.record('open', DONE, order_id=order_id)
+        return True
+
+    async def stage_close(self) -> bool:
+        # IOC limits can fill a part of a position, the rest is closed again until the deadline
+        deadline = time.monotonic() + CLOSE_TIMEOUT
+        while await self.close_all_positions(self.headers):
+            if time.monotonic() > deadline:
+                # Withdrawing with a position still open would leave it without margin
+                raise RuntimeError(f'Positions are still open after {CLOSE_TIMEOUT}s of closing')
+            await asyncio.sleep(1)
+        await self.progress.record('close', DONE)
+        return True
+
+    async def stage_withdraw(self) -> bool:
+        sent = self.progress.get('withdraw')
+        if sent is None:
             balance = await self.balance(self.headers)
             if balance == 0:
                 logger.error(f'Your AEVO balance is 0 | [{self.wallet_address}]')
-                return
+                return False
             if self.withdraw_all:
                 amount = balance
             else:
                 amount = int(balance * self.withdraw_percentage)
             evm_balance = await self.get_wallet_balance()
-            await self.withdraw_from_aevo(amount, evm_balance)
+            if not await self.withdraw_from_aevo(amount):
+                return True
+            await self.progress.record('withdraw', SENT, amount=amount, balance_before=evm_balance)
+            sent = self.progress.get('withdraw')
+        await self.wait_for_withdraw(sent.detail['balance_before'], 'USDC')
+        await self.progress.record('withdraw', DONE, **sent.detail)
+        return True
 
-        if delete_api_keys:
-            await self.delete_api_keys(self.headers)
+    async def stage_delete_keys(self) -> bool:
+        # The stage stays open in the journal, a resumed run repeats only the key cleanup
+        if not await self.delete_api_keys(self.headers):
+            raise RuntimeError('Some API keys were not deleted')
+        await api_key_store.delete(self.wallet_address)
+        await self.progress.record('delete_keys', DONE)
+        return True
 
     @abstractmethod
     async def register(
             self,
             signing_key: str,
             account_signature: SignedMessage,
-            signing_key_signature: str
+            signing_key_signature: str,
+            expiry: int
     ) -> tuple[str, str]:
         """Creates API Key and API Secret"""
 
@@ -158,6 +280,13 @@ class Trader(User, ABC):
     ) -> tuple[float, float, int, Optional[str], str]:
         """Gets all current orders"""
 
+    @abstractmethod
+    async def close_all_positions(
+            self,
+            headers: Dict[str, str]
+    ) -> int:
+        """Closes all positions at once, returns how many are still open"""
+
     @abstractmethod
     async def get_staking_balance(
             self,
@@ -170,7 +299,7 @@ class Trader(User, ABC):
             self,
             headers: Dict[str, str],
             amount: float
-    ) -> None:
+    ) -> bool:
         """Staking USDC on AEVO"""
 
     @abstractmethod
@@ -178,7 +307,7 @@ class Trader(User, ABC):
             self,
             headers: Dict[str, str],
             amount: float
-    ) -> None:
+    ) -> bool:
         """Withdraws from staking"""
 
     @abstractmethod
@@ -189,8 +318,8 @@ class Trader(User, ABC):
             headers: Dict[str, str],
             token: str = 'ETH',
             unrealized_pnl: float = None
-    ) -> None:
-        """Opens position"""
+    ) -> Optional[str]:
+        """Opens position, returns the order id"""
 
     @abstractmethod
     async def close_position(
@@ -211,20 +340,46 @@ class Trader(User, ABC):
         """Gets balance"""
 
     @abstractmethod
-    async def deposit(self) -> None:
-        """Deposits to AEVO"""
+    async def deposit(
+            self,
+            before_send: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> Optional[str]:
+        """Deposits to AEVO, returns the transaction hash"""
 
     @abstractmethod
     async def delete_api_keys(
             self,
             headers: Dict[str, str]
-    ) -> None:
-        """Deletes API Keys"""
+    ) -> bool:
+        """Deletes API Keys, the active one last, returns False when some are left"""
 
     @abstractmethod
     async def withdraw_from_aevo(
             self,
-            amount: float,
-            evm_balance: int
-    ) -> None:
-        """Withdraws to metamask"""
+            amount: float
+    ) -> bool:
+        """Requests a withdrawal to metamask"""
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    run: Callable[[Trader], Awaitable[bool]]
+    enabled: Callable[[Trader], bool]
+
+
+def _pending(name: str, enabled: Callable[[Trader], bool]) -> Callable[[Trader], bool]:
+    return lambda trader: enabled(trader) and not trader.progress.is_done(name)
+
+
+# Every wallet passes these in order, each stage gets its own worker pool in the fleet runner
+STAGES = [
+    Stage('register', Trader.stage_register, lambda trader: True),
+    Stage('deposit', Trader.stage_deposit, _pending('deposit', lambda trader: DEPOSIT)),
+    Stage('stake', Trader.stage_stake, _pending('stake', lambda trader: STAKE)),
+    Stage('withdraw_staking', Trader.stage_withdraw_staking, _pending('withdraw_staking', lambda trader: WITHDRAW_STAKING)),
+    Stage('open', Trader.stage_open, _pending('open', lambda trader: trader.open_positions)),
+    Stage('close', Trader.stage_close, _pending('close', lambda trader: trader.close_positions)),
+    Stage('withdraw', Trader.stage_withdraw, _pending('withdraw', lambda trader: trader.withdraw)),
+    Stage('delete_keys', Trader.stage_delete_keys, _pending('delete_keys', lambda trader: delete_api_keys)),
+]
@@ -1,23 +1,22 @@
-import time
-
 from eth_account.messages import encode_structured_data
 from eth_account.datastructures import SignedMessage
 from eth_account import Account
 from eth_abi import encode
 from web3 import AsyncWeb3
 
-from eip712_structs import (
-    make_domain,
-    Address,
-)
+from eip712_structs import Address
 
-from src.aevo.order import Order
+from src.bot.utils.order_signer import (
+    hash_order,
+    sign_hash,
+)
 
 
 def get_signatures(
         web3: AsyncWeb3,
         wallet_address: str,
-        account: Account
+        account: Account,
+        expiry: int
 ) -> tuple[str, SignedMessage, str]:
     new_acc = web3.eth.account.create()
     signing_key = new_acc.address
@@ -42,7 +41,7 @@ def get_signatures(
     }
     register_values = {
         "key": signing_key,
-        "expiry": int(time.time() + 10000)
+        "expiry": expiry
     }
     register_structured_data = {
         "types": register_types,
@@ -203,17 +202,14 @@ def sign_order(
         salt: int,
         timestamp: float,
         instrument_id: int
-) -> SignedMessage:
-    order_struct = Order(
-        maker=wallet_address,
-        isBuy=is_buy,
-        limitPrice=int(limit_price),
-        amount=int(amount),
-        salt=salt,
-        instrument=instrument_id,
-        timestamp=int(timestamp)
+) -> str:
+    message_hash = hash_order(
+        wallet_address,
+        is_buy,
+        int(limit_price),
+        int(amount),
+        salt,
+        instrument_id,
+        int(timestamp)
     )
-
-    domain = make_domain(name='Aevo Mainnet', version='1', chainId=1)
-    signable_bytes = AsyncWeb3.keccak(order_struct.signable_bytes(domain=domain))
-    return Account._sign_hash(signable_bytes, private_key).signature.hex()
+    return sign_hash(message_hash, private_key)
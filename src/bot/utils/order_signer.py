@@ -0,0 +1,87 @@
+from functools import lru_cache
+import threading
+
+from eth_hash.auto import keccak
+from eth_keys import keys
+
+ORDER_TYPE = (
+    b'Order(address maker,bool isBuy,uint256 limitPrice,uint256 amount,'
+    b'uint256 salt,uint256 instrument,uint256 timestamp)'
+)
+DOMAIN_TYPE = b'EIP712Domain(string name,string version,uint256 chainId)'
+
+ORDER_TYPE_HASH = keccak(ORDER_TYPE)
+
+
+def domain_separator(name: str, version: str, chain_id: int) -> bytes:
+    return keccak(
+        keccak(DOMAIN_TYPE)
+        + keccak(name.encode())
+        + keccak(version.encode())
+        + chain_id.to_bytes(32, 'big')
+    )
+
+
+AEVO_DOMAIN_SEPARATOR = domain_separator('Aevo Mainnet', '1', 1)
+
+
+class OrderHasher:
+    """Computes the EIP-712 digest of an Order with the type hash and domain separator baked in"""
+
+    def __init__(self, separator: bytes = AEVO_DOMAIN_SEPARATOR) -> None:
+        self._struct = bytearray(32 * 8)
+        self._struct[0:32] = ORDER_TYPE_HASH
+        self._message = bytearray(2 + 32 + 32)
+        self._message[0:2] = b'\x19\x01'
+        self._message[2:34] = separator
+
+    def hash(
+            self,
+            maker: str,
+            is_buy: bool,
+            limit_price: int,
+            amount: int,
+            salt: int,
+            instrument: int,
+            timestamp: int
+    ) -> bytes:
+        struct = self._struct
+        struct[32:64] = int(maker, 16).to_bytes(32, 'big')
+        struct[64:96] = int(is_buy).to_bytes(32, 'big')
+        struct[96:128] = limit_price.to_bytes(32, 'big')
+        struct[128:160] = amount.to_bytes(32, 'big')
+        struct[160:192] = salt.to_bytes(32, 'big')
+        struct[192:224] = instrument.to_bytes(32, 'big')
+        struct[224:256] = timestamp.to_bytes(32, 'big')
+        self._message[34:66] = keccak(struct)
+        return keccak(self._message)
+
+
+# Buffers are reused between calls, so every thread gets its own hasher
+_local = threading.local()
+
+
+def hash_order(
+        maker: str,
+        is_buy: bool,
+        limit_price: int,
+        amount: int,
+        salt: int,
+        instrument: int,
+        timestamp: int
+) -> bytes:
+    hasher = getattr(_local, 'hasher', None)
+    if hasher is None:
+        hasher = _local.hasher = OrderHasher()
+    return hasher.hash(maker, is_buy, limit_price, amount, salt, instrument, timestamp)
+
+
+@lru_cache(maxsize=10_000)
+def load_private_key(private_key: str) -> keys.PrivateKey:
+    # Building a PrivateKey derives the public key, which costs as much as a signature
+    return keys.PrivateKey(bytes.fromhex(private_key.removeprefix('0x')))
+
+
+def sign_hash(message_hash: bytes, private_key: str) -> str:
+    v, r, s = load_private_key(private_key).sign_msg_hash(message_hash).vrs
+    return '0x' + (r.to_bytes(32, 'big') + s.to_bytes(32, 'big') + (v + 27).to_bytes(1, 'big')).hex()
@@ -0,0 +1,197 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import asyncio
+import os
+
+from typing import (
+    Optional,
+    Sequence,
+    Callable,
+    Dict,
+    List,
+    Set,
+    Any,
+)
+
+from eth_account import Account
+from web3 import AsyncWeb3
+
+from src.bot.utils.data_exctractor import (
+    sign_staking_withdraw,
+    get_signatures,
+    sign_withdraw,
+    sign_staking,
+    sign_order,
+)
+from config import SIGNING_PROCESSES
+
+# (kind, private key, payload) - the payload holds the arguments of the matching sign_* helper
+# without web3 and the private key, e.g. ('order', key, (maker, is_buy, amount, limit_price, salt, timestamp, instrument))
+SigningJob = tuple[str, str, tuple]
+
+# Signing never touches the provider, so workers use a web3 instance without one
+_web3 = AsyncWeb3()
+
+
+def _sign_order(
+        private_key: str,
+        maker: str,
+        is_buy: bool,
+        amount: int,
+        limit_price: int,
+        salt: int,
+        timestamp: float,
+        instrument_id: int
+) -> str:
+    return sign_order(maker, private_key, is_buy, amount, limit_price, salt, timestamp, instrument_id)
+
+
+def _sign_withdraw(
+        private_key: str,
+        collateral: str,
+        to: str,
+        amount: int,
+        salt: int,
+        socket_fees: int,
+        socket_msg_gas_limit: int,
+        socket_connector: str
+) -> str:
+    return sign_withdraw(_web3, collateral, to, amount, salt, private_key,
+                         socket_fees, socket_msg_gas_limit, socket_connector)
+
+
+def _sign_staking(private_key: str, collateral: str, to: str, amount: int, salt: int) -> str:
+    return sign_staking(_web3, private_key, collateral, to, amount, salt)
+
+
+def _sign_staking_withdraw(private_key: str, collateral: str, to: str, amount: int, salt: int) -> str:
+    return sign_staking_withdraw(_web3, private_key, collateral, to, amount, salt)
+
+
+def _sign_register(private_key: str, expiry: int) -> tuple[str, str, str]:
+    account = Account.from_key(private_key)
+    return get_signatures(_web3, account.address, account, expiry)
+
+
+SIGNERS: Dict[str, Callable[..., Any]] = {
+    'order': _sign_order,
+    'withdraw': _sign_withdraw,
+    'staking': _sign_staking,
+    'staking_withdraw': _sign_staking_withdraw,
+    'register': _sign_register,
+}
+
+
+def sign_job(job: SigningJob) -> Any:
+    kind, private_key, payload = job
+    return SIGNERS[kind](private_key, *payload)
+
+
+def sign_chunk(jobs: Sequence[SigningJob]) -> List[Any]:
+    """A job that fails leaves its exception in place of the result, the rest of the chunk is still signed"""
+    results = []
+    for job in jobs:
+        try:
+            results.append(sign_job(job))
+        except Exception as ex:
+            results.append(ex)
+    return results
+
+
+def _raise_failed(results: List[Any]) -> List[Any]:
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+    return results
+
+
+class BatchSigner:
+    """
+    Signs vectors of jobs on a process pool, results come back in the order of the jobs.
+    Jobs submitted one by one in the same loop iteration are signed as one vector
+    """
+
+    def __init__(
+            self,
+            processes: Optional[int] = SIGNING_PROCESSES,
+            chunk_size: int = 64
+    ) -> None:
+        self.processes = processes or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending: List[tuple[SigningJob, asyncio.Future]] = []
+        self._batches: Set[asyncio.Task] = set()
+
+    @property
+    def enabled(self) -> bool:
+        # With one process, pickling only adds to the cost of signing in a thread
+        return self.processes > 1
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.processes)
+        return self._pool
+
+    def _chunks(self, jobs: Sequence[SigningJob]) -> List[Sequence[SigningJob]]:
+        # Small enough to keep every process busy, big enough to amortise pickling
+        size = max(1, min(self.chunk_size, -(-len(jobs) // self.processes)))
+        return [jobs[index:index + size] for index in range(0, len(jobs), size)]
+
+    def sign(self, jobs: Sequence[SigningJob]) -> List[Any]:
+        results = []
+        for chunk in self.pool.map(sign_chunk, self._chunks(jobs)):
+            results.extend(chunk)
+        return _raise_failed(results)
+
+    async def _sign_all(self, jobs: Sequence[SigningJob]) -> List[Any]:
+        loop = asyncio.get_running_loop()
+        chunks = await asyncio.gather(*[
+            loop.run_in_executor(self.pool, sign_chunk, chunk) for chunk in self._chunks(jobs)
+        ])
+        return [result for chunk in chunks for result in chunk]
+
+    async def sign_async(self, jobs: Sequence[SigningJob]) -> List[Any]:
+        return _raise_failed(await self._sign_all(jobs))
+
+    async def submit(self, job: SigningJob) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if not self._pending:
+            loop.call_soon(self._dispatch)
+        self._pending.append((job, future))
+        return await future
+
+    def _dispatch(self) -> None:
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        task = asyncio.create_task(self._sign_all([job for job, _ in pending]))
+        self._batches.add(task)
+        task.add_done_callback(partial(self._resolve, pending))
+
+    def _resolve(self, pending: List[tuple[SigningJob, asyncio.Future]], task: asyncio.Task) -> None:
+        self._batches.discard(task)
+        for index, (_, future) in enumerate(pending):
+            if future.done():
+                continue
+            if task.cancelled():
+                future.cancel()
+            elif task.exception() is not None:
+                # Only a broken pool fails the whole batch, a failed job fails its own future below
+                future.set_exception(task.exception())
+            elif isinstance(task.result()[index], Exception):
+                future.set_exception(task.result()[index])
+            else:
+                future.set_result(task.result()[index])
+
+    def close(self) -> None:
+        # Callers of unfinished batches see a cancellation instead of an error from the closed pool
+        for _, future in self._pending:
+            future.cancel()
+        self._pending = []
+        for task in list(self._batches):
+            task.cancel()
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
@@ -0,0 +1,164 @@
+import asyncio
+import time
+
+from typing import (
+    Iterable,
+    Optional,
+    Dict,
+    List,
+)
+
+from eth_abi import (
+    decode,
+    encode,
+)
+from web3 import AsyncWeb3
+from loguru import logger
+
+from src.data import (
+    MULTICALL3_CONTRACT,
+    USDC_CONTRACT,
+    load_abi,
+)
+from config import (
+    MULTICALL_BATCH_SIZE,
+    BALANCE_CACHE_TTL,
+)
+
+AGGREGATE3_SELECTOR = bytes.fromhex('82ad56cb')
+GET_ETH_BALANCE_SELECTOR = bytes.fromhex('4d2301cc')
+GET_BLOCK_NUMBER_SELECTOR = bytes.fromhex('42cbb15c')
+BALANCE_OF_SELECTOR = bytes.fromhex('70a08231')
+
+# (token address or None for ETH, wallet address)
+BalanceKey = tuple[Optional[str], str]
+
+
+class BalanceReader:
+    """
+    Reads ETH and token balances of many wallets with Multicall3. Requests of concurrently running
+    wallets are collected for a moment and sent together, results are shared by every User.
+    A balance is reused until any read sees a newer block, or for `ttl` seconds at most
+    """
+
+    def __init__(
+            self,
+            batch_size: int = MULTICALL_BATCH_SIZE,
+            ttl: float = BALANCE_CACHE_TTL,
+            batch_window: float = 0.005,
+            default_tokens: Iterable[Optional[str]] = (None, USDC_CONTRACT)
+    ) -> None:
+        self.batch_size = batch_size
+        self.ttl = ttl
+        self.batch_window = batch_window
+        self.default_tokens = [AsyncWeb3.to_checksum_address(token) if token else None for token in default_tokens]
+        self.block_number: Optional[int] = None
+        # key -> (balance, block number it was read at, read at)
+        self.balances: Dict[BalanceKey, tuple[int, Optional[int], float]] = {}
+        self._pending: Dict[BalanceKey, asyncio.Future] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _key(address: str, token: Optional[str]) -> BalanceKey:
+        return (AsyncWeb3.to_checksum_address(token) if token else None), AsyncWeb3.to_checksum_address(address)
+
+    def _cached(self, key: BalanceKey) -> Optional[int]:
+        entry = self.balances.get(key)
+        if entry is None or time.monotonic() - entry[2] > self.ttl:
+            return None
+        balance, block_number, _ = entry
+        if block_number is not None and self.block_number is not None and block_number < self.block_number:
+            return None
+        return balance
+
+    def invalidate(self, address: str) -> None:
+        address = AsyncWeb3.to_checksum_address(address)
+        for key in [key for key in self.balances if key[1] == address]:
+            del self.balances[key]
+
+    async def get(self, web3: AsyncWeb3, address: str, token: Optional[str] = None) -> int:
+        key = self._key(address, token)
+        balance = self._cached(key)
+        if balance is not None:
+            return balance
+
+        loop = asyncio.get_running_loop()
+        # The other default tokens of the wallet are almost free inside the same call
+        for pending_key in [key] + [(default, key[1]) for default in self.default_tokens]:
+            if pending_key not in self._pending and self._cached(pending_key) is None:
+                self._pending[pending_key] = loop.create_future()
+        future = self._pending[key]
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush(web3))
+        return await asyncio.shield(future)
+
+    async def _flush(self, web3: AsyncWeb3) -> None:
+        await asyncio.sleep(self.batch_window)
+        # Requests arriving while this batch is in flight start the next one
+        pending, self._pending = self._pending, {}
+        self._flush_task = None
+        try:
+            balances = await self.fetch(web3, list(pending))
+        except Exception as ex:
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(ex)
+                    # Prefetched balances nobody waits for must not log "exception was never retrieved"
+                    future.exception()
+            return
+        for key, future in pending.items():
+            if not future.done():
+                future.set_result(balances[key])
+
+    async def fetch(self, web3: AsyncWeb3, keys: List[BalanceKey]) -> Dict[BalanceKey, int]:
+        chunks = [keys[index:index + self.batch_size] for index in range(0, len(keys), self.batch_size)]
+        try:
+            results = await asyncio.gather(*[self._multicall(web3, chunk) for chunk in chunks])
+        except Exception as ex:
+            logger.warning(f'Multicall failed, reading {len(keys)} balances one by one | {ex!r}')
+            # Single reads do not report their block, they are kept for the TTL only
+            results = [(None, await self._read_one_by_one(web3, keys))]
+
+        balances = {}
+        now = time.monotonic()
+        for block_number, chunk_balances in results:
+            for key, balance in chunk_balances.items():
+                self.balances[key] = (balance, block_number, now)
+                balances[key] = balance
+        return balances
+
+    async def prefetch(self, web3: AsyncWeb3, addresses: Iterable[str]) -> None:
+        keys = [(token, AsyncWeb3.to_checksum_address(address)) for address in addresses for token in self.default_tokens]
+        await self.fetch(web3, keys)
+
+    async def _multicall(self, web3: AsyncWeb3, keys: List[BalanceKey]) -> tuple[int, Dict[BalanceKey, int]]:
+        calls = [(MULTICALL3_CONTRACT, False, GET_BLOCK_NUMBER_SELECTOR)]
+        for token, address in keys:
+            address_argument = encode(['address'], [address])
+            if token is None:
+                calls.append((MULTICALL3_CONTRACT, False, GET_ETH_BALANCE_SELECTOR + address_argument))
+            else:
+                calls.append((token, False, BALANCE_OF_SELECTOR + address_argument))
+
+        data = AGGREGATE3_SELECTOR + encode(['(address,bool,bytes)[]'], [calls])
+        response = await web3.eth.call({'to': MULTICALL3_CONTRACT, 'data': data})
+        (results,) = decode(['(bool,bytes)[]'], response)
+
+        block_number = int.from_bytes(results[0][1], 'big')
+        if self.block_number is None or block_number > self.block_number:
+            self.block_number = block_number
+        return block_number, {key: int.from_bytes(return_data, 'big') for key, (_, return_data) in zip(keys, results[1:])}
+
+    @staticmethod
+    async def _read_one_by_one(web3: AsyncWeb3, keys: List[BalanceKey]) -> Dict[BalanceKey, int]:
+        async def read(token: Optional[str], address: str) -> int:
+            if token is None:
+                return await web3.eth.get_balance(address)
+            contract = web3.eth.contract(address=token, abi=load_abi('erc20'))
+            return await contract.functions.balanceOf(address).call()
+
+        balances = await asyncio.gather(*[read(token, address) for token, address in keys])
+        return dict(zip(keys, balances))
+
+
+balance_reader = BalanceReader()
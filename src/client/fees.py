@@ -0,0 +1,58 @@
+from dataclasses import dataclass
+import asyncio
+import time
+
+from typing import Optional
+
+from web3 import AsyncWeb3
+
+from config import FEE_TTL
+
+
+@dataclass(frozen=True)
+class Fees:
+    base_fee: int
+    priority_fee: int
+
+    @property
+    def max_fee_per_gas(self) -> int:
+        return 2 * self.base_fee + self.priority_fee
+
+    @property
+    def gas_price(self) -> int:
+        return self.base_fee + self.priority_fee
+
+
+class FeeOracle:
+    """Shares one fee sample per block and the chain id between all wallets"""
+
+    def __init__(self, ttl: float = FEE_TTL) -> None:
+        self.ttl = ttl
+        self._chain_id: Optional[int] = None
+        self._fees: Optional[Fees] = None
+        self._sampled_at = 0.0
+        self._sampling: Optional[asyncio.Task] = None
+
+    async def chain_id(self, web3: AsyncWeb3) -> int:
+        if self._chain_id is None:
+            self._chain_id = await web3.eth.chain_id
+        return self._chain_id
+
+    async def _sample(self, web3: AsyncWeb3) -> Fees:
+        # One eth_feeHistory call returns the next block's base fee and the median tip
+        history = await web3.eth.fee_history(1, 'latest', [50])
+        reward = history.get('reward') or [[0]]
+        self._fees = Fees(base_fee=history['baseFeePerGas'][-1], priority_fee=reward[0][0])
+        self._sampled_at = time.monotonic()
+        return self._fees
+
+    async def fees(self, web3: AsyncWeb3) -> Fees:
+        if self._fees is not None and time.monotonic() - self._sampled_at < self.ttl:
+            return self._fees
+        # Concurrent callers wait for the same request
+        if self._sampling is None or self._sampling.done():
+            self._sampling = asyncio.create_task(self._sample(web3))
+        return await asyncio.shield(self._sampling)
+
+
+fee_oracle = FeeOracle()
@@ -0,0 +1,46 @@
+from contextlib import asynccontextmanager
+import asyncio
+
+from typing import (
+    AsyncIterator,
+    Dict,
+)
+
+from web3 import AsyncWeb3
+from loguru import logger
+
+
+class NonceManager:
+    """Hands out nonces locally, reading the chain only for the first transaction of an address"""
+
+    def __init__(self) -> None:
+        self.nonces: Dict[str, int] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _lock(self, address: str) -> asyncio.Lock:
+        return self._locks.setdefault(address.lower(), asyncio.Lock())
+
+    def resync(self, address: str) -> None:
+        self.nonces.pop(address.lower(), None)
+
+    @asynccontextmanager
+    async def reserve(self, web3: AsyncWeb3, address: str) -> AsyncIterator[int]:
+        """
+        Yields the next nonce of the address. Transactions of one address are built one at a time,
+        the nonce is consumed when the block succeeds and re-read from the chain when it fails
+        """
+        async with self._lock(address):
+            key = address.lower()
+            nonce = self.nonces.get(key)
+            if nonce is None:
+                nonce = await web3.eth.get_transaction_count(address, 'pending')
+            try:
+                yield nonce
+            except BaseException:
+                self.resync(address)
+                logger.debug(f'Nonce will be re-read from the chain | [{address}]')
+                raise
+            self.nonces[key] = nonce + 1
+
+
+nonce_manager = NonceManager()
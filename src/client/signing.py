@@ -0,0 +1,52 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import asyncio
+
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Optional,
+    TypeVar,
+)
+
+from config import SIGNING_THREADS
+
+if TYPE_CHECKING:
+    from src.bot.utils.signing_pool import BatchSigner
+
+T = TypeVar('T')
+
+_executor: Optional[ThreadPoolExecutor] = None
+_batch_signer: Optional['BatchSigner'] = None
+
+
+def get_signing_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=SIGNING_THREADS, thread_name_prefix='signer')
+    return _executor
+
+
+async def run_signing(func: Callable[..., T], *args, **kwargs) -> T:
+    """Runs a synchronous signing function without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_signing_executor(), partial(func, *args, **kwargs))
+
+
+def get_batch_signer() -> 'BatchSigner':
+    """Process-wide batch signer, its module pulls in web3 and is imported on first use"""
+    global _batch_signer
+    if _batch_signer is None:
+        from src.bot.utils.signing_pool import BatchSigner
+        _batch_signer = BatchSigner()
+    return _batch_signer
+
+
+def shutdown_signing_executor() -> None:
+    global _executor, _batch_signer
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
+    if _batch_signer is not None:
+        _batch_signer.close()
+        _batch_signer = None
@@ -1,18 +1,33 @@
 from asyncio import sleep
 
+from typing import (
+    Awaitable,
+    Callable,
+    Optional,
+)
+
+from web3.exceptions import TransactionNotFound
 from web3.types import TxParams
 from web3.eth import AsyncEth
 from hexbytes import HexBytes
 from loguru import logger
 
 from web3 import AsyncWeb3
-from config import RPC
+from config import (
+    BALANCE_POLL_MIN_DELAY,
+    BALANCE_POLL_MAX_DELAY,
+    RPC,
+)
 
-from src.data import (
-    USDC_CONTRACT,
-    ERC20_ABI,
+from src.client.balances import balance_reader
+from src.client.signing import run_signing
+from src.metrics import (
+    rpc_metrics_middleware,
+    metrics,
 )
 
+from src.data import USDC_CONTRACT
+
 
 class User:
     def __init__(self, private_key: str) -> None:
@@ -23,32 +38,50 @@ class User:
                 endpoint_uri=RPC,
             ),
             modules={'eth': (AsyncEth,)},
-            middlewares=[]
+            middlewares=[rpc_metrics_middleware] if metrics.enabled else []
         )
         self.account = self.web3.eth.account.from_key(private_key)
         self.wallet_address = self.account.address
 
     async def get_wallet_balance(self, token: str = 'USDC', stable_address: str = USDC_CONTRACT) -> int:
-        if token.lower() != 'eth':
-            contract = self.web3.eth.contract(address=self.web3.to_checksum_address(stable_address),
-                                              abi=ERC20_ABI)
-            balance = await contract.functions.balanceOf(self.wallet_address).call()
-        else:
-            balance = await self.web3.eth.get_balance(self.wallet_address)
+        token_address = None if token.lower() == 'eth' else stable_address
+        return await balance_reader.get(self.web3, self.wallet_address, token_address)
 
-        return balance
-
-    async def sign_transaction(self, tx: TxParams) -> HexBytes:
-        signed_tx = self.web3.eth.account.sign_transaction(tx, self.private_key)
+    async def sign_transaction(
+            self,
+            tx: TxParams,
+            before_send: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> HexBytes:
+        signed_tx = await run_signing(self.web3.eth.account.sign_transaction, tx, self.private_key)
+        if before_send is not None:
+            # The hash is known before broadcasting, so a crash while sending cannot lose the transaction
+            await before_send(self.web3.to_hex(signed_tx.hash))
         raw_tx_hash = await self.web3.eth.send_raw_transaction(signed_tx.rawTransaction)
+        balance_reader.invalidate(self.wallet_address)
         tx_hash = self.web3.to_hex(raw_tx_hash)
         return tx_hash
 
+    async def transaction_exists(self, tx_hash: str) -> bool:
+        """True for pending and mined transactions"""
+        try:
+            await self.web3.eth.get_transaction(tx_hash)
+        except TransactionNotFound:
+            return False
+        return True
+
+    async def transaction_succeeded(self, tx_hash: str, timeout: float = 600) -> bool:
+        """Waits until the transaction is mined, False when it reverted"""
+        receipt = await self.web3.eth.wait_for_transaction_receipt(tx_hash, timeout=timeout)
+        return receipt['status'] == 1
+
     async def wait_for_withdraw(self, balance_before_withdraw: int, token: str) -> None:
         logger.info(f'Waiting for {token.upper()} to arrive on Metamask...')
+        delay = BALANCE_POLL_MIN_DELAY
         while True:
             balance = await self.get_wallet_balance(token)
             if balance > balance_before_withdraw:
                 logger.success(f'{token.upper()} has arrived | [{self.wallet_address}]')
                 break
-            await sleep(20)
+            await sleep(delay)
+            balance_reader.invalidate(self.wallet_address)
+            delay = min(delay * 1.5, BALANCE_POLL_MAX_DELAY)
@@ -9,7 +9,11 @@ from eth_typing import HexStr
 from web3 import AsyncWeb3
 from loguru import logger
 
-from src.data import ERC20_ABI
+from src.client.balances import balance_reader
+from src.client.signing import run_signing
+from src.client.nonce import nonce_manager
+from src.client.fees import fee_oracle
+from src.data import load_abi
 
 
 async def approve_token(
@@ -22,33 +26,35 @@ async def approve_token(
 ) -> Optional[HexStr]:
     try:
         spender = web3.to_checksum_address(spender)
-        contract = load_contract(from_token_address, web3, ERC20_ABI)
+        contract = load_contract(from_token_address, web3, load_abi('erc20'))
         allowance_amount = await check_allowance(web3, from_token_address, address_wallet, spender)
 
         if amount > allowance_amount:
             logger.debug('🛠️ | Approving token...')
-            tx = await contract.functions.approve(
-                spender,
-                int(amount * 2)
-            ).build_transaction(
-                {
-                    'chainId': await web3.eth.chain_id,
-                    'from': address_wallet,
-                    'nonce': await web3.eth.get_transaction_count(address_wallet),
-                    'gasPrice': 0,
-                    'gas': 0,
-                    'value': 0
-                }
-            )
-
-            gas_price = await add_gas_price(web3)
-            tx['gasPrice'] = gas_price
-
-            gas_limit = await add_gas_limit(web3, tx)
-            tx['gas'] = gas_limit
-
-            signed_tx = web3.eth.account.sign_transaction(tx, private_key=private_key)
-            raw_tx_hash = await web3.eth.send_raw_transaction(signed_tx.rawTransaction)
+            async with nonce_manager.reserve(web3, address_wallet) as nonce:
+                tx = await contract.functions.approve(
+                    spender,
+                    int(amount * 2)
+                ).build_transaction(
+                    {
+                        'chainId': await fee_oracle.chain_id(web3),
+                        'from': address_wallet,
+                        'nonce': nonce,
+                        'gasPrice': 0,
+                        'gas': 0,
+                        'value': 0
+                    }
+                )
+
+                gas_price = await add_gas_price(web3)
+                tx['gasPrice'] = gas_price
+
+                gas_limit = await add_gas_limit(web3, tx)
+                tx['gas'] = gas_limit
+
+                signed_tx = await run_signing(web3.eth.account.sign_transaction, tx, private_key=private_key)
+                raw_tx_hash = await web3.eth.send_raw_transaction(signed_tx.rawTransaction)
+            balance_reader.invalidate(address_wallet)
             tx_receipt = await web3.eth.wait_for_transaction_receipt(raw_tx_hash)
             while tx_receipt is None:
                 await sleep(1)
@@ -70,7 +76,7 @@ async def check_allowance(
 ) -> Optional[int]:
     try:
         contract = web3.eth.contract(address=web3.to_checksum_address(from_token_address),
-                                     abi=ERC20_ABI)
+                                     abi=load_abi('erc20'))
         amount_approved = await contract.functions.allowance(address_wallet, spender).call()
         return amount_approved
 
@@ -94,8 +100,8 @@ async def add_gas_price(
         web3: AsyncWeb3
 ) -> Optional[int]:
     try:
-        gas_price = await web3.eth.gas_price
-        gas_price = int(gas_price * uniform(1.01, 1.02))
+        fees = await fee_oracle.fees(web3)
+        gas_price = int(fees.gas_price * uniform(1.01, 1.02))
         return gas_price
     except Exception as ex:
         logger.error(f'Something went wrong | {ex}')
@@ -1,13 +1,71 @@
+from functools import lru_cache
 import json
+import os
+
+from typing import (
+    Iterator,
+    Any,
+    List,
+)
+
+from loguru import logger
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WALLETS_FILE = os.path.join(ROOT_DIR, 'wallets.txt')
 
 AEVO_CONTRACT = '0x80d40e32FAD8bE8da5C6A42B8aF1E181984D137c'
 USDC_CONTRACT = '0xff970a61a04b1ca14834a43f5de4533ebddb5cc8'
+MULTICALL3_CONTRACT = '0xcA11bde05977b3631167028862bE2a173976CA11'
+
+
+@lru_cache(maxsize=None)
+def load_abi(name: str) -> List[dict]:
+    """Parses assets/abi/<name>.json on first use"""
+    with open(os.path.join(ROOT_DIR, 'assets', 'abi', f'{name}.json')) as file:
+        return json.load(file)
+
+
+def wallet_shard(private_key: str, shard_count: int) -> int:
+    """Stable shard of a wallet, taken from the keccak hash of its address"""
+    # Imported here, so runs without sharding never pay for eth_keys
+    from eth_hash.auto import keccak
+    from eth_keys import keys
+
+    address = keys.PrivateKey(bytes.fromhex(private_key.removeprefix('0x'))).public_key.to_canonical_address()
+    return int.from_bytes(keccak(address)[:8], 'big') % shard_count
+
+
+def iter_private_keys(path: str = WALLETS_FILE, shard_index: int = 0, shard_count: int = 1) -> Iterator[str]:
+    """Streams keys from the wallet file line by line, keeping only those of the given shard"""
+    with open(path, 'r') as file:
+        for line_number, line in enumerate(file, start=1):
+            private_key = line.strip()
+            if not private_key:
+                continue
+            if shard_count > 1:
+                try:
+                    shard = wallet_shard(private_key, shard_count)
+                except Exception as ex:
+                    logger.error(f'Skipping line {line_number} of {path}, it is not a private key | {ex!r}')
+                    continue
+                if shard != shard_index:
+                    continue
+            yield private_key
+
+
+def load_private_keys(path: str = WALLETS_FILE) -> List[str]:
+    return list(iter_private_keys(path))
+
 
-with open('assets/abi/aevo_abi.json') as file:
-    AEVO_ABI = json.load(file)
+_LAZY = {
+    'AEVO_ABI': lambda: load_abi('aevo_abi'),
+    'ERC20_ABI': lambda: load_abi('erc20'),
+    'private_keys': load_private_keys,
+}
 
-with open('assets/abi/erc20.json') as file:
-    ERC20_ABI = json.load(file)
 
-with open('wallets.txt', 'r') as file:
-    private_keys = [line.strip() for line in file]
+def __getattr__(name: str) -> Any:
+    # Files are read when a name is first looked up instead of when the module is imported
+    if name in _LAZY:
+        return _LAZY[name]()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
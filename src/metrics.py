@@ -0,0 +1,147 @@
+from contextlib import (
+    contextmanager,
+    nullcontext,
+)
+import time
+
+from typing import (
+    ContextManager,
+    Iterator,
+    Any,
+)
+
+from loguru import logger
+
+# Shared by every disabled call site, so turned off metrics cost one attribute lookup and a branch
+_DISABLED = nullcontext()
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+class Metrics:
+    """Prometheus instrumentation for wallet stages and HTTP / RPC calls, a no-op until started"""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._stage_seconds = None
+        self._stages_in_flight = None
+        self._stage_queue_depth = None
+        self._request_seconds = None
+        self._requests_in_flight = None
+        self._request_errors = None
+        self._order_ack_seconds = None
+
+    def start(self, port: int, host: str = '127.0.0.1') -> bool:
+        """Registers the metrics and serves them on http://host:port/metrics"""
+        if self.enabled:
+            return True
+        try:
+            from prometheus_client import (
+                CollectorRegistry,
+                start_http_server,
+                Histogram,
+                Counter,
+                Gauge,
+            )
+        except ImportError:
+            logger.warning('prometheus_client is not installed, metrics are disabled')
+            return False
+
+        registry = CollectorRegistry()
+        self._stage_seconds = Histogram(
+            'aevo_stage_seconds', 'Time spent in a Trader.run stage', ['stage', 'outcome'],
+            buckets=LATENCY_BUCKETS, registry=registry
+        )
+        self._stages_in_flight = Gauge(
+            'aevo_stages_in_flight', 'Wallets currently in a Trader.run stage', ['stage'], registry=registry
+        )
+        self._stage_queue_depth = Gauge(
+            'aevo_stage_queue_depth', 'Wallets waiting for a free worker of a stage', ['stage'], registry=registry
+        )
+        self._request_seconds = Histogram(
+            'aevo_request_seconds', 'Latency of a single HTTP or RPC call', ['target', 'method', 'endpoint'],
+            buckets=LATENCY_BUCKETS, registry=registry
+        )
+        self._requests_in_flight = Gauge(
+            'aevo_requests_in_flight', 'HTTP or RPC calls waiting for a response', ['target', 'endpoint'],
+            registry=registry
+        )
+        self._request_errors = Counter(
+            'aevo_request_errors_total', 'Failed HTTP or RPC calls by status or exception',
+            ['target', 'endpoint', 'status'], registry=registry
+        )
+        self._order_ack_seconds = Histogram(
+            'aevo_order_ack_seconds', 'Time from submitting an order to its acknowledgement', ['outcome'],
+            buckets=LATENCY_BUCKETS, registry=registry
+        )
+        start_http_server(port, addr=host, registry=registry)
+        self.enabled = True
+        logger.info(f'Serving metrics on http://{host}:{port}/metrics')
+        return True
+
+    def stage(self, name: str) -> ContextManager:
+        """Times a Trader.run stage and counts the wallets inside it"""
+        if not self.enabled:
+            return _DISABLED
+        return self._timed_stage(name)
+
+    @contextmanager
+    def _timed_stage(self, name: str) -> Iterator[None]:
+        in_flight = self._stages_in_flight.labels(name)
+        in_flight.inc()
+        start = time.perf_counter()
+        outcome = 'error'
+        try:
+            yield
+            outcome = 'ok'
+        finally:
+            in_flight.dec()
+            self._stage_seconds.labels(name, outcome).observe(time.perf_counter() - start)
+
+    def stage_queued(self, name: str, depth: int) -> None:
+        if self.enabled:
+            self._stage_queue_depth.labels(name).set(depth)
+
+    def request(self, target: str, method: str, endpoint: str) -> ContextManager:
+        """Times one call, exceptions are counted as errors under their class name"""
+        if not self.enabled:
+            return _DISABLED
+        return self._timed_request(target, method, endpoint)
+
+    @contextmanager
+    def _timed_request(self, target: str, method: str, endpoint: str) -> Iterator[None]:
+        in_flight = self._requests_in_flight.labels(target, endpoint)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as ex:
+            self._request_errors.labels(target, endpoint, type(ex).__name__).inc()
+            raise
+        finally:
+            in_flight.dec()
+            self._request_seconds.labels(target, method, endpoint).observe(time.perf_counter() - start)
+
+    def request_failed(self, target: str, endpoint: str, status: Any) -> None:
+        """Counts a call that got a response, but not a successful one"""
+        if self.enabled:
+            self._request_errors.labels(target, endpoint, str(status)).inc()
+
+    def order_acknowledged(self, seconds: float, accepted: bool) -> None:
+        if self.enabled:
+            self._order_ack_seconds.labels('accepted' if accepted else 'rejected').observe(seconds)
+
+
+async def rpc_metrics_middleware(make_request, web3) -> Any:
+    """web3 middleware that times every JSON-RPC call by method"""
+    async def middleware(method: str, params: Any) -> Any:
+        with metrics.request('rpc', 'POST', method):
+            response = await make_request(method, params)
+        error = response.get('error')
+        if error is not None:
+            metrics.request_failed('rpc', method, error.get('code', 'error') if isinstance(error, dict) else 'error')
+        return response
+    return middleware
+
+
+metrics = Metrics()
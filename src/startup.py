@@ -0,0 +1,25 @@
+import time
+
+from typing import Dict
+
+from loguru import logger
+
+
+class StartupTimer:
+    """Records when startup milestones are first reached, counted from when this module was imported"""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.marks: Dict[str, float] = {}
+
+    def mark(self, name: str) -> None:
+        if name not in self.marks:
+            self.marks[name] = time.perf_counter() - self.started
+
+    def log_report(self) -> None:
+        if self.marks:
+            report = ' | '.join(f'{name} {seconds * 1000:.0f} ms' for name, seconds in self.marks.items())
+            logger.info(f'Startup: {report}')
+
+
+startup = StartupTimer()